@@ -0,0 +1,115 @@
+"""Benchmark the streaming DOCX reader against the previous python-docx path.
+
+Generates DOCX contracts of increasing size (paragraphs plus a payment
+schedule table per page) and reads each with both implementations in a
+fresh process, reporting wall time and peak resident memory. python-docx
+builds the whole lxml tree, so its memory grows with the document; the
+streaming reader keeps only the current paragraph or table row.
+
+Usage: python benchmarks/bench_docx.py [--pages 10 100 500] [--repeat 3]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from docx import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src_layout import install_src_packages  # noqa: E402
+
+install_src_packages()
+
+from src.services.docx_text import iter_docx_lines  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from corpus import fill, format_money, generate_pages  # noqa: E402
+
+
+def legacy_text(file_path):
+    """DOCX text as read before docx_text: python-docx paragraphs only"""
+    doc = Document(file_path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text
+
+
+def streaming_text(file_path):
+    return "".join(iter_docx_lines(file_path))
+
+
+READERS = {'python-docx': legacy_text, 'streaming': streaming_text}
+
+
+def write_contract(path, pages, seed):
+    """Financing contract with a header, a footer and a 12-row payment schedule per page"""
+    rng = random.Random(seed)
+    document = Document()
+    document.sections[0].header.paragraphs[0].text = 'Banco Horizonte S.A. - Contrato de financiamento'
+    document.sections[0].footer.paragraphs[0].text = 'Documento gerado eletronicamente'
+    for number, page in enumerate(generate_pages('financing', pages, rng)):
+        if number:
+            document.add_page_break()
+        for paragraph in page.split('\n'):
+            document.add_paragraph(paragraph)
+        table = document.add_table(rows=13, cols=3)
+        for cell, title in zip(table.rows[0].cells, ('Parcela', 'Vencimento', 'Valor')):
+            cell.text = title
+        for installment, row in enumerate(table.rows[1:], start=number * 12 + 1):
+            row.cells[0].text = str(installment)
+            row.cells[1].text = fill('{date}', rng)
+            row.cells[2].text = format_money(rng.uniform(500, 5000))
+    document.save(path)
+
+
+def measure(reader, file_path, repeat, results):
+    """Runs in a fresh process: best time and peak RSS growth of one reader"""
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = READERS[reader](file_path)
+        timings.append(time.perf_counter() - start)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((min(timings), len(text), (peak - baseline) * 1024))
+
+
+def run_isolated(reader, file_path, repeat):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=measure, args=(reader, file_path, repeat, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_docx_')
+    try:
+        print(f"{'pages':>6} {'size MB':>8} {'reader':>12} {'seconds':>8} {'chars':>10} {'peak RSS MB':>12}")
+        for pages in args.pages:
+            path = os.path.join(workdir, f'contract_{pages}p.docx')
+            write_contract(path, pages, args.seed)
+            size = os.path.getsize(path) / 1e6
+            for reader in READERS:
+                seconds, chars, peak = run_isolated(reader, path, args.repeat)
+                print(f"{pages:>6} {size:>8.1f} {reader:>12} {seconds:>8.3f} {chars:>10} {peak / 1e6:>12.1f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Benchmark DocumentProcessor.process_document on a synthetic contract corpus.
+
+Generates (or reuses) a corpus with benchmarks/corpus.py, processes every
+file, and reports throughput, per-stage timings and peak memory per format
+and page count. Results are written as JSON so runs can be compared with
+--compare. Runs offline; formats that need OCR are skipped when the
+tesseract binary is not installed.
+
+Usage: python benchmarks/bench_processor.py [--pages 1 5] [--repeat 3] [--output results.json]
+                                           [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src_layout import install_src_packages  # noqa: E402
+
+install_src_packages()
+
+from src.services.document_processor import DocumentProcessor  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from corpus import CONTRACT_TYPES, FORMATS, generate_corpus  # noqa: E402
+
+OCR_FORMATS = {'pdf_image', 'png'}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_timed(processor, entry, repeat):
+    """Process a file `repeat` times, returning the wall times and the stats of each run"""
+    runs = []
+    for _ in range(repeat):
+        stats = {}
+        start = time.perf_counter()
+        _, contract_type, _ = processor.process_document(entry['path'], entry['file_type'], stats)
+        stats['wall'] = time.perf_counter() - start
+        stats['classified_as'] = contract_type
+        runs.append(stats)
+    return runs
+
+
+def stage_peaks(processor, entry):
+    """Peak Python heap allocation of each stage, traced separately from the timed runs"""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        text = processor.extract_text_from_file(entry['path'], entry['file_type'])
+        peaks['extract_text'] = tracemalloc.get_traced_memory()[1]
+
+        tracemalloc.reset_peak()
+        classification = processor.classify_contract(text)
+        peaks['classify'] = tracemalloc.get_traced_memory()[1]
+
+        tracemalloc.reset_peak()
+        processor.extract_contract_data(text, classification.contract_type)
+        peaks['extract_fields'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def summarize(entries, runs_by_path, peaks_by_path):
+    """Aggregate the runs per (format, pages) group"""
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[(entry['format'], entry['pages'])].append(entry)
+
+    results = []
+    for (format_name, pages), group in sorted(groups.items()):
+        walls, stage_times, page_total, byte_total, correct, count = [], defaultdict(list), 0, 0, 0, 0
+        for entry in group:
+            for stats in runs_by_path[entry['path']]:
+                walls.append(stats['wall'])
+                for stage, seconds in stats.get('timings', {}).items():
+                    stage_times[stage].append(seconds)
+                page_total += entry['pages'] if FORMATS[format_name][1] else 1
+                byte_total += entry['size']
+                correct += stats['classified_as'] == entry['contract_type']
+                count += 1
+        total_time = sum(walls)
+        peaks = defaultdict(int)
+        for entry in group:
+            for stage, peak in peaks_by_path[entry['path']].items():
+                peaks[stage] = max(peaks[stage], peak)
+
+        results.append({
+            'format': format_name,
+            'pages': pages,
+            'documents': len(group),
+            'runs': count,
+            'seconds_per_document': {
+                'median': statistics.median(walls),
+                'min': min(walls),
+                'max': max(walls),
+            },
+            'documents_per_second': count / total_time,
+            'pages_per_second': page_total / total_time,
+            'megabytes_per_second': byte_total / 1e6 / total_time,
+            'stage_seconds_median': {stage: statistics.median(times) for stage, times in sorted(stage_times.items())},
+            'stage_peak_python_bytes': dict(peaks),
+            'classification_accuracy': correct / count,
+        })
+    return results
+
+
+def compare(results, baseline_path):
+    """Print throughput of this run against a previous results file"""
+    with open(baseline_path) as file:
+        baseline = {(group['format'], group['pages']): group for group in json.load(file)['results']}
+    print(f"\n{'format':<10} {'pages':>5} {'baseline doc/s':>15} {'current doc/s':>14} {'change':>8}")
+    for group in results:
+        old = baseline.get((group['format'], group['pages']))
+        if not old:
+            continue
+        ratio = group['documents_per_second'] / old['documents_per_second']
+        print(f"{group['format']:<10} {group['pages']:>5} {old['documents_per_second']:>15.2f} "
+              f"{group['documents_per_second']:>14.2f} {ratio:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus-dir', help='reuse (or create) the corpus here instead of a temporary directory')
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5])
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--per-type', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--ocr-workers', type=int, default=None)
+    parser.add_argument('--output', default='bench_processor.json')
+    parser.add_argument('--compare', help='previous results file to compare throughput against')
+    args = parser.parse_args()
+
+    formats = list(args.formats)
+    skipped = []
+    if not shutil.which('tesseract'):
+        skipped = [name for name in formats if name in OCR_FORMATS]
+        formats = [name for name in formats if name not in OCR_FORMATS]
+        if skipped:
+            print(f"tesseract not found, skipping {', '.join(skipped)}")
+
+    workdir = None
+    corpus_dir = args.corpus_dir
+    if not corpus_dir:
+        corpus_dir = workdir = tempfile.mkdtemp(prefix='bench_processor_')
+    try:
+        entries = generate_corpus(corpus_dir, args.pages, formats, CONTRACT_TYPES, args.per_type, args.seed)
+        print(f"Corpus: {len(entries)} files in {corpus_dir}")
+
+        processor = DocumentProcessor(ocr_workers=args.ocr_workers)
+        # Warm up lazy state (OCR process pool, regex caches) outside the measurements
+        processor.process_document(entries[0]['path'], entries[0]['file_type'])
+
+        runs_by_path, peaks_by_path = {}, {}
+        for entry in entries:
+            runs_by_path[entry['path']] = run_timed(processor, entry, args.repeat)
+            peaks_by_path[entry['path']] = stage_peaks(processor, entry)
+        processor.ocr_engine.shutdown()
+
+        results = summarize(entries, runs_by_path, peaks_by_path)
+        report = {
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat(),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'tesseract': bool(shutil.which('tesseract')),
+                'args': vars(args),
+                'skipped_formats': skipped,
+                # Includes the OCR worker processes (children)
+                'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+                'max_rss_children_bytes': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+            },
+            'results': results,
+        }
+    finally:
+        if workdir:
+            shutil.rmtree(workdir)
+
+    print(f"\n{'format':<10} {'pages':>5} {'doc/s':>8} {'pages/s':>8} {'median ms':>10} {'accuracy':>9}  stages (median ms)")
+    for group in results:
+        stages = ', '.join(f"{stage} {seconds * 1000:.1f}" for stage, seconds in group['stage_seconds_median'].items())
+        print(f"{group['format']:<10} {group['pages']:>5} {group['documents_per_second']:>8.1f} "
+              f"{group['pages_per_second']:>8.1f} {group['seconds_per_document']['median'] * 1000:>10.1f} "
+              f"{group['classification_accuracy']:>9.0%}  {stages}")
+
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Compare contracts queries before and after the indexed, compressed-text schema.
+
+Builds a SQLite database with the previous layout (no listing indexes,
+extracted_text inline), times the queries behind the API, then upgrades
+a copy with init_database() and times the same queries again.
+
+Usage: python benchmarks/bench_queries.py [--rows 20000] [--text-kb 8] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src_layout import install_src_packages  # noqa: E402
+
+install_src_packages()
+
+from src.models.user import db  # noqa: E402
+from src.services.database import SQLITE_PRAGMAS, init_database  # noqa: E402
+
+# contracts table as created before the schema upgrade
+OLD_SCHEMA = """
+CREATE TABLE contracts (
+    id INTEGER NOT NULL,
+    original_filename VARCHAR(255) NOT NULL,
+    file_path VARCHAR(500) NOT NULL,
+    file_type VARCHAR(10) NOT NULL,
+    file_size INTEGER NOT NULL,
+    content_hash VARCHAR(64),
+    status VARCHAR(20),
+    extracted_text TEXT,
+    contract_type VARCHAR(50),
+    extracted_data_json TEXT,
+    extractor_version VARCHAR(20),
+    created_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_contracts_content_hash ON contracts (content_hash);
+"""
+
+SUMMARY = 'id, original_filename, file_type, file_size, status, contract_type, created_at, updated_at'
+
+QUERIES = {
+    'list first page': f'SELECT {SUMMARY} FROM contracts ORDER BY created_at DESC, id DESC LIMIT 50',
+    'list status=error': f"SELECT {SUMMARY} FROM contracts WHERE status = 'error' "
+                         f"ORDER BY created_at DESC, id DESC LIMIT 50",
+    'list type=insurance': f"SELECT {SUMMARY} FROM contracts WHERE contract_type = 'insurance' "
+                           f"ORDER BY created_at DESC, id DESC LIMIT 50",
+    'count status=processing': "SELECT COUNT(id) FROM contracts WHERE status = 'processing'",
+    'stats group by': 'SELECT status, contract_type, COUNT(id) FROM contracts GROUP BY status, contract_type',
+}
+
+WORDS = ['contrato', 'locação', 'aluguel', 'financiamento', 'parcela', 'seguro', 'cláusula', 'valor',
+         'R$', '1.234,56', 'prazo', 'meses', 'partes', 'obrigações', 'vigência', 'garantia']
+
+
+def populate(path, rows, text_kb, seed=7):
+    """Create the old schema and fill it with synthetic contracts"""
+    rng = random.Random(seed)
+    connection = sqlite3.connect(path)
+    connection.executescript(OLD_SCHEMA)
+    start = datetime(2024, 1, 1)
+    statuses = ['completed'] * 90 + ['error'] * 5 + ['processing'] * 5
+    types = ['financing', 'rental', 'insurance', 'unknown']
+    batch = []
+    for index in range(rows):
+        text = ' '.join(rng.choice(WORDS) for _ in range(text_kb * 120))
+        created_at = start + timedelta(seconds=index * 30)
+        batch.append((
+            f'contrato_{index}.pdf', f'/uploads/{index}.pdf', 'pdf', 100000 + index,
+            rng.choice(statuses), text, rng.choice(types), '{"valores_monetarios": ["R$ 1.234,56"]}',
+            created_at.isoformat(sep=' '), created_at.isoformat(sep=' ')
+        ))
+        if len(batch) == 1000:
+            insert(connection, batch)
+            batch = []
+    if batch:
+        insert(connection, batch)
+    connection.commit()
+    connection.close()
+
+
+def insert(connection, batch):
+    connection.executemany(
+        'INSERT INTO contracts (original_filename, file_path, file_type, file_size, status, extracted_text, '
+        'contract_type, extracted_data_json, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        batch
+    )
+
+
+def upgrade(path):
+    """Run the application's schema upgrade on a database file"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    init_database(app)
+    with app.app_context():
+        db.engine.dispose()
+
+
+def time_queries(path, pragmas, repeat):
+    """Best time per query, with a cold page cache for each run"""
+    results = {}
+    for name, sql in QUERIES.items():
+        timings = []
+        for _ in range(repeat):
+            connection = sqlite3.connect(path)
+            for pragma, value in pragmas.items():
+                connection.execute(f'PRAGMA {pragma} = {value}')
+            start = time.perf_counter()
+            connection.execute(sql).fetchall()
+            timings.append(time.perf_counter() - start)
+            connection.close()
+        results[name] = min(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--text-kb', type=int, default=8, help='approximate extracted text size per contract')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_queries_')
+    try:
+        before_path = os.path.join(workdir, 'before.db')
+        after_path = os.path.join(workdir, 'after.db')
+
+        print(f"Populating {args.rows} contracts...")
+        populate(before_path, args.rows, args.text_kb)
+        shutil.copy(before_path, after_path)
+
+        start = time.perf_counter()
+        upgrade(after_path)
+        print(f"Schema upgrade took {time.perf_counter() - start:.1f}s")
+        sqlite3.connect(after_path).execute('VACUUM')
+
+        before = time_queries(before_path, {}, args.repeat)
+        after = time_queries(after_path, SQLITE_PRAGMAS, args.repeat)
+
+        print(f"\n{'query':<26} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name in QUERIES:
+            print(f"{name:<26} {before[name] * 1000:>10.2f} {after[name] * 1000:>10.2f} "
+                  f"{before[name] / after[name]:>7.1f}x")
+
+        print(f"\nDatabase size: before {os.path.getsize(before_path) / 1e6:.1f} MB, "
+              f"after {os.path.getsize(after_path) / 1e6:.1f} MB")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark the cost of importing the API routes, with lazy and eager extractors.
+
+Each scenario runs in a fresh interpreter, which reports the seconds its
+imports took, its peak resident memory and which heavy libraries ended up
+loaded. 'lazy' is what an API process or a forked worker pays now; 'eager'
+also imports every registered extraction backend and the OCR engine, which
+is what importing the routes cost before the extractor registry.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src_layout import BOOTSTRAP  # noqa: E402
+
+HEAVY_MODULES = ('fitz', 'PIL.Image', 'pytesseract', 'lxml.etree', 'docx')
+
+SCENARIO_CODE = {
+    'lazy': 'import src.routes.contracts',
+    'eager': (
+        'import src.routes.contracts\n'
+        'from src.services.extractors import extractor_registry\n'
+        'for spec in extractor_registry.specs.values():\n'
+        '    extractor_registry.get(next(iter(spec.extensions)))\n'
+        'import src.services.ocr_engine'
+    ),
+}
+
+RUNNER = '''
+import json, resource, sys, time
+start = time.perf_counter()
+exec({code!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': seconds,
+    'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    'heavy': [name for name in {heavy!r} if name in sys.modules],
+}}))
+'''
+
+
+def run_scenario(name):
+    """Import in a fresh interpreter, with this process's import path and the src packages"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+    code = BOOTSTRAP + RUNNER.format(code=SCENARIO_CODE[name], heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scenario':>8} {'seconds':>8} {'peak RSS MB':>12}  heavy modules loaded")
+    for name in SCENARIO_CODE:
+        runs = [run_scenario(name) for _ in range(args.repeat)]
+        seconds = statistics.median(run['seconds'] for run in runs)
+        peak = statistics.median(run['peak_rss'] for run in runs)
+        print(f"{name:>8} {seconds:>8.3f} {peak / 1e6:>12.1f}  {', '.join(runs[0]['heavy']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
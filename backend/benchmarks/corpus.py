@@ -0,0 +1,243 @@
+"""Generate a synthetic corpus of Portuguese contracts for benchmarks.
+
+Every contract type (financing, rental, insurance) is written in every
+supported format: txt, docx, PDF with a text layer, image-only PDF and
+PNG. Output is deterministic for a given seed and needs no network.
+
+Usage: python benchmarks/corpus.py OUTPUT_DIR [--pages 1 5 20] [--per-type 1] [--seed 7]
+"""
+import argparse
+import json
+import os
+import random
+
+import fitz  # PyMuPDF
+from docx import Document
+
+CONTRACT_TYPES = ('financing', 'rental', 'insurance')
+
+# name -> (file extension, multi-page)
+FORMATS = {
+    'txt': ('txt', True),
+    'docx': ('docx', True),
+    'pdf_text': ('pdf', True),
+    'pdf_image': ('pdf', True),
+    'png': ('png', False),
+}
+
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size('a4')
+MARGIN = 56
+FONT_SIZE = 10
+
+# Resolution scanned pages are rasterized at
+SCAN_DPI = 150
+
+NAMES = ['João da Silva', 'Maria Oliveira', 'Carlos Souza', 'Ana Pereira', 'Paulo Santos',
+         'Fernanda Lima', 'Ricardo Alves', 'Juliana Costa', 'Marcos Ribeiro', 'Patrícia Gomes']
+COMPANIES = ['Banco Horizonte S.A.', 'Imobiliária Central Ltda.', 'Seguradora Aliança S.A.',
+             'Crédito Fácil S.A.', 'Residencial Bela Vista Ltda.', 'Proteção Total Seguros S.A.']
+CITIES = ['São Paulo', 'Belo Horizonte', 'Curitiba', 'Porto Alegre', 'Recife', 'Salvador']
+
+BOILERPLATE = [
+    'As partes elegem o foro da comarca de {city} para dirimir quaisquer dúvidas oriundas deste instrumento.',
+    'O presente instrumento obriga as partes, seus herdeiros e sucessores a qualquer título.',
+    'Qualquer tolerância quanto ao descumprimento das cláusulas não constituirá novação ou renúncia.',
+    'As comunicações entre as partes serão feitas por escrito, no endereço indicado no preâmbulo.',
+    'Os valores previstos serão corrigidos anualmente pela variação do índice oficial de inflação.',
+    'E, por estarem assim justas e contratadas, as partes assinam o presente em duas vias de igual teor.',
+]
+
+CLAUSES = {
+    'financing': [
+        'O CREDOR concede ao MUTUÁRIO um financiamento no valor de {money} para aquisição do bem descrito.',
+        'O valor será pago em {count} parcelas mensais de {money2}, vencendo a primeira em {date}.',
+        'Sobre o saldo devedor incidirão juros de {rate}% ao ano, com amortização pelo sistema {system}.',
+        'O Custo Efetivo Total (CET) da operação é de {rate2}% a.a., conforme planilha anexa.',
+        'Em garantia, o bem fica sujeito a alienação fiduciária em favor da instituição financeira.',
+        'O atraso no pagamento de qualquer prestação sujeitará o MUTUÁRIO a multa de {rate3}% e juros de mora.',
+    ],
+    'rental': [
+        'O LOCADOR dá em locação ao LOCATÁRIO o imóvel situado em {city}, pelo aluguel mensal de {money}.',
+        'A título de caução, o LOCATÁRIO deposita a quantia de {money2}, devolvida ao fim da locação.',
+        'O prazo da locação é de {count} meses, com início em {date}.',
+        'Correrão por conta do LOCATÁRIO o IPTU, as despesas de condomínio e o consumo de água e energia.',
+        'Em caso de rescisão antecipada, será devida multa de {rate3}% sobre o valor dos aluguéis restantes.',
+        'A vistoria de entrada integra este contrato; benfeitorias dependem de autorização do LOCADOR.',
+    ],
+    'insurance': [
+        'A SEGURADORA garante ao SEGURADO as coberturas desta apólice mediante o pagamento do prêmio de {money}.',
+        'A cobertura básica para danos ao bem segurado tem limite máximo de {money2} por sinistro.',
+        'Em caso de sinistro, aplica-se franquia de {money3}, deduzida do valor da indenização.',
+        'A vigência do seguro é de {count} meses a partir de {date}, com renovação mediante acordo.',
+        'Estão excluídos da cobertura os riscos decorrentes de dolo ou culpa grave do segurado.',
+        'O beneficiário indicado receberá o ressarcimento em até trinta dias após a regulação do sinistro.',
+    ],
+}
+
+
+def format_money(value: float) -> str:
+    """Brazilian currency format: R$ 1.234,56"""
+    whole, cents = f'{value:,.2f}'.split('.')
+    return f"R$ {whole.replace(',', '.')},{cents}"
+
+
+def format_document_number(rng: random.Random) -> str:
+    digits = ''.join(str(rng.randint(0, 9)) for _ in range(11))
+    return f'{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}'
+
+
+def fill(template: str, rng: random.Random) -> str:
+    """Fill a clause template with random but realistic values"""
+    return template.format(
+        money=format_money(rng.uniform(1000, 500000)),
+        money2=format_money(rng.uniform(500, 20000)),
+        money3=format_money(rng.uniform(500, 5000)),
+        count=rng.choice([12, 24, 30, 36, 48, 60, 120]),
+        date=f'{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2020, 2026)}',
+        rate=f'{rng.randint(5, 30)},{rng.randint(0, 99):02d}',
+        rate2=f'{rng.randint(8, 40)},{rng.randint(0, 99):02d}',
+        rate3=rng.choice(['2', '10', '20']),
+        system=rng.choice(['SAC', 'PRICE']),
+        city=rng.choice(CITIES),
+    )
+
+
+def page_capacity() -> int:
+    """Roughly how many characters fit on one rendered page"""
+    lines = int((PAGE_HEIGHT - 2 * MARGIN) / (FONT_SIZE * 1.2))
+    chars_per_line = int((PAGE_WIDTH - 2 * MARGIN) / (FONT_SIZE * 0.5))
+    return int(lines * chars_per_line * 0.75)
+
+
+def generate_pages(contract_type: str, pages: int, rng: random.Random):
+    """Page texts of one contract: a preamble, then type clauses mixed with boilerplate"""
+    capacity = page_capacity()
+    party, company = rng.choice(NAMES), rng.choice(COMPANIES)
+    preamble = (
+        f'CONTRATO Nº {rng.randint(1000, 99999)}/{rng.randint(2020, 2026)}\n\n'
+        f'Pelo presente instrumento particular, de um lado {company}, e de outro lado {party}, '
+        f'inscrito(a) no CPF sob o nº {format_document_number(rng)}, têm entre si justo e contratado o seguinte.\n'
+    )
+    result = []
+    for number in range(pages):
+        paragraphs = [preamble] if number == 0 else []
+        length = sum(len(p) for p in paragraphs)
+        clause = 1
+        while length < capacity:
+            source = CLAUSES[contract_type] if rng.random() < 0.6 else BOILERPLATE
+            paragraph = f'Cláusula {number + 1}.{clause}. {fill(rng.choice(source), rng)}'
+            if length + len(paragraph) > capacity:
+                break
+            paragraphs.append(paragraph)
+            length += len(paragraph) + 1
+            clause += 1
+        result.append('\n'.join(paragraphs))
+    return result
+
+
+def write_txt(path: str, pages):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\n\n'.join(pages))
+
+
+def write_docx(path: str, pages):
+    document = Document()
+    for number, page in enumerate(pages):
+        if number:
+            document.add_page_break()
+        for paragraph in page.split('\n'):
+            document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def render_pdf(pages) -> fitz.Document:
+    """PDF with one page per page text, using a built-in font"""
+    document = fitz.open()
+    rect = fitz.Rect(MARGIN, MARGIN, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN)
+    for page_text in pages:
+        page = document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        fontsize = FONT_SIZE
+        # insert_textbox writes nothing when the text overflows; shrink until it fits
+        while page.insert_textbox(rect, page_text, fontsize=fontsize, fontname='helv') < 0:
+            fontsize *= 0.9
+    return document
+
+
+def write_text_pdf(path: str, pages):
+    with render_pdf(pages) as document:
+        document.save(path)
+
+
+def write_image_pdf(path: str, pages):
+    """Scanned-style PDF: each page is only a grayscale bitmap, with no text layer"""
+    with render_pdf(pages) as source, fitz.open() as scanned:
+        for page in source:
+            pixmap = page.get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY)
+            target = scanned.new_page(width=page.rect.width, height=page.rect.height)
+            target.insert_image(target.rect, stream=pixmap.tobytes('png'))
+        scanned.save(path, deflate=True)
+
+
+def write_png(path: str, pages):
+    """Photo-style image of the first page"""
+    with render_pdf(pages[:1]) as document:
+        document[0].get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY).save(path)
+
+
+WRITERS = {
+    'txt': write_txt,
+    'docx': write_docx,
+    'pdf_text': write_text_pdf,
+    'pdf_image': write_image_pdf,
+    'png': write_png,
+}
+
+
+def generate_corpus(output_dir: str, page_counts=(1, 5), formats=tuple(FORMATS),
+                    contract_types=CONTRACT_TYPES, per_type: int = 1, seed: int = 7):
+    """Write the corpus and a manifest.json describing each file; returns the manifest entries"""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = []
+    for contract_type in contract_types:
+        for pages in page_counts:
+            for copy in range(per_type):
+                page_texts = generate_pages(contract_type, pages, rng)
+                for format_name in formats:
+                    extension, multi_page = FORMATS[format_name]
+                    if not multi_page and pages > 1:
+                        continue
+                    filename = f'{contract_type}_{pages}p_{copy}_{format_name}.{extension}'
+                    path = os.path.join(output_dir, filename)
+                    WRITERS[format_name](path, page_texts)
+                    manifest.append({
+                        'path': path,
+                        'format': format_name,
+                        'file_type': extension,
+                        'contract_type': contract_type,
+                        'pages': pages,
+                        'size': os.path.getsize(path),
+                    })
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output_dir')
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 5], help='page counts to generate')
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--types', nargs='+', choices=CONTRACT_TYPES, default=list(CONTRACT_TYPES))
+    parser.add_argument('--per-type', type=int, default=1, help='contracts per type and page count')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.output_dir, args.pages, args.formats, args.types, args.per_type, args.seed)
+    total = sum(entry['size'] for entry in manifest)
+    print(f"Wrote {len(manifest)} files ({total / 1e6:.1f} MB) to {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
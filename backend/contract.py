@@ -1,31 +1,72 @@
 from src.models.user import db
+from sqlalchemy.orm import load_only
 from datetime import datetime
 import json
+import zlib
 
 class Contract(db.Model):
     __tablename__ = 'contracts'
+    __table_args__ = (
+        # Listing order, and the filters used together with it
+        db.Index('ix_contracts_created_at_id', 'created_at', 'id'),
+        db.Index('ix_contracts_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_contracts_type_created_at', 'contract_type', 'created_at', 'id'),
+        # Incremental exports (changes since a timestamp)
+        db.Index('ix_contracts_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     original_filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_type = db.Column(db.String(10), nullable=False)
     file_size = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the uploaded file
+    batch_id = db.Column(db.String(36), db.ForeignKey('contract_batches.id'), index=True)
     
-    # Processing status
-    status = db.Column(db.String(20), default='processing')  # processing, completed, error
+    # Processing status: processing, completed, error. Like contract_type, it loads its old value
+    # when set on an expired instance (active_history), so the stats counters see what changed
+    status = db.column_property(db.Column(db.String(20), default='processing'), active_history=True)
     
-    # Extracted content
-    extracted_text = db.Column(db.Text)
-    contract_type = db.Column(db.String(50))  # financing, rental, insurance, unknown
+    # Extracted content (the full text lives compressed in contract_texts)
+    text_record = db.relationship('ContractText', uselist=False, cascade='all, delete-orphan')
+    fields = db.relationship('ContractField', cascade='all, delete-orphan', passive_deletes=True)
+    contract_type = db.column_property(db.Column(db.String(50)), active_history=True)  # financing, rental, insurance, unknown
     extracted_data_json = db.Column(db.Text)  # JSON string of extracted data
+    extractor_version = db.Column(db.String(20))  # DocumentProcessor.EXTRACTOR_VERSION used
+    processing_stats_json = db.Column(db.Text)  # JSON of stage timings and sizes from processing
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Columns used by to_dict(); listings load only these
+    SUMMARY_COLUMNS = (
+        'id', 'original_filename', 'file_type', 'file_size',
+        'status', 'contract_type', 'created_at', 'updated_at'
+    )
+    
     def __repr__(self):
         return f'<Contract {self.id}: {self.original_filename}>'
     
+    @classmethod
+    def summary_query(cls):
+        """Query that loads only the columns used by to_dict()"""
+        return cls.query.options(load_only(*[getattr(cls, name) for name in cls.SUMMARY_COLUMNS]))
+    
+    @property
+    def extracted_text(self):
+        """Full extracted text, loaded from contract_texts on first access"""
+        return self.text_record.get_text() if self.text_record else None
+    
+    @extracted_text.setter
+    def extracted_text(self, text):
+        if text is None:
+            self.text_record = None
+            return
+        if self.text_record is None:
+            self.text_record = ContractText()
+        self.text_record.set_text(text)
+    
     def set_extracted_data(self, data):
         """Set extracted data as JSON string"""
         self.extracted_data_json = json.dumps(data, ensure_ascii=False)
@@ -39,6 +80,14 @@ class Contract(db.Model):
                 return {}
         return {}
     
+    def set_processing_stats(self, stats):
+        """Store the measurements gathered while processing"""
+        self.processing_stats_json = json.dumps(stats)
+    
+    def get_processing_stats(self):
+        """Measurements gathered while processing, or None if not recorded"""
+        return json.loads(self.processing_stats_json) if self.processing_stats_json else None
+    
     def to_dict(self):
         """Convert contract to dictionary for API responses"""
         return {
@@ -52,3 +101,100 @@ class Contract(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+
+class ContractBatch(db.Model):
+    """Group of contracts uploaded together through POST /contracts/batch"""
+    __tablename__ = 'contract_batches'
+    
+    id = db.Column(db.String(36), primary_key=True)  # UUID
+    file_count = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ContractBatch {self.id}: {self.file_count} files>'
+
+
+class ProcessingJob(db.Model):
+    """Durable processing job for a contract, claimed by workers under a time-limited lease"""
+    __tablename__ = 'processing_jobs'
+    __table_args__ = (
+        db.Index('ix_processing_jobs_status_available_at', 'status', 'available_at', 'id'),
+        # Claim order within a lane: lowest rank_at that is due
+        db.Index('ix_processing_jobs_status_lane_rank', 'status', 'lane', 'rank_at'),
+        db.Index('ix_processing_jobs_status_lease', 'status', 'lease_expires_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    contract_id = db.Column(db.Integer, db.ForeignKey('contracts.id', ondelete='CASCADE'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # not claimed before this
+    lane = db.Column(db.String(10), nullable=False, default='fast')  # fast or heavy, see job_cost
+    cost = db.Column(db.Float)  # estimated seconds of processing
+    # available_at pushed back by the cost; ordering by it is shortest-job-first with aging
+    rank_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner = db.Column(db.String(120))  # worker holding the job while running
+    lease_expires_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ProcessingJob {self.id}: contract {self.contract_id} {self.status}>'
+
+
+class ContractField(db.Model):
+    """One extracted value with its typed, normalized form, for aggregation in SQL"""
+    __tablename__ = 'contract_fields'
+    __table_args__ = (
+        # Aggregates and range filters over one field
+        db.Index('ix_contract_fields_key_number', 'key', 'number'),
+        db.Index('ix_contract_fields_key_date', 'key', 'date_value'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    contract_id = db.Column(db.Integer, db.ForeignKey('contracts.id', ondelete='CASCADE'), nullable=False, index=True)
+    key = db.Column(db.String(64), nullable=False)  # extracted_data key, e.g. valor_financiado
+    position = db.Column(db.Integer, nullable=False, default=0)  # index within list fields
+    raw = db.Column(db.String(255), nullable=False)  # value as extracted, e.g. 'R$ 1.234,56'
+    kind = db.Column(db.String(10), nullable=False)  # money, rate, date, number, text
+    number = db.Column(db.Numeric(18, 4))  # BRL amount, count, or rate percent as written
+    rate_monthly = db.Column(db.Float)  # compound-equivalent rates in percent, when the period is known
+    rate_annual = db.Column(db.Float)
+    date_value = db.Column(db.Date)
+    
+    def __repr__(self):
+        return f'<ContractField {self.contract_id}.{self.key}[{self.position}]: {self.raw}>'
+
+
+class ContractText(db.Model):
+    """Extracted text of a contract, kept out of the hot contracts rows and zlib-compressed"""
+    __tablename__ = 'contract_texts'
+    
+    contract_id = db.Column(db.Integer, db.ForeignKey('contracts.id', ondelete='CASCADE'), primary_key=True)
+    compressed_text = db.Column(db.LargeBinary, nullable=False)
+    text_length = db.Column(db.Integer, nullable=False)  # characters before compression
+    
+    def set_text(self, text):
+        """Compress and store text"""
+        self.compressed_text = zlib.compress(text.encode('utf-8'), 6)
+        self.text_length = len(text)
+    
+    def get_text(self):
+        """Decompress the stored text"""
+        return zlib.decompress(self.compressed_text).decode('utf-8')
+
+
+class ContractCounter(db.Model):
+    """Running count of contracts, kept in step with the contracts table.
+    
+    Names are 'total', 'status:<status>' and 'type:<contract_type>'.
+    """
+    __tablename__ = 'contract_counters'
+    
+    name = db.Column(db.String(80), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ContractCounter {self.name}={self.value}>'
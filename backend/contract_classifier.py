@@ -0,0 +1,151 @@
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, NamedTuple
+
+from src.services.text_stream import StreamMatcher
+
+
+def fold_text(text: str) -> str:
+    """Lowercase text and strip accents, so 'Locação' and 'LOCACAO' compare equal"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return decomposed.encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def plural_forms(word: str) -> List[str]:
+    """Return a folded keyword plus its regular Portuguese plural"""
+    if ' ' in word or word.endswith('s'):
+        return [word]
+    if word.endswith('ao'):
+        return [word, word[:-2] + 'oes']
+    if word.endswith('l'):
+        return [word, word[:-1] + 'is']
+    if word.endswith(('r', 'z')):
+        return [word, word + 'es']
+    return [word, word + 's']
+
+
+def _build_trie_pattern(words: List[str]) -> str:
+    """Build a regex alternation factored by common prefixes.
+
+    A trie-shaped pattern lets the regex engine reject a position after
+    looking at one or two characters instead of trying every keyword.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        is_end = '' in node
+        branches = [
+            (r'\s+' if char == ' ' else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        pattern = '(?:' + '|'.join(branches) + ')'
+        return pattern + '?' if is_end else pattern
+
+    return build(trie)
+
+
+class Classification(NamedTuple):
+    contract_type: str
+    scores: Dict[str, int]
+    confidence: float
+
+
+class KeywordClassifier:
+    """Scores contract categories by keyword hits found in a single pass over the text"""
+
+    def __init__(self, keywords: Dict[str, List[str]]):
+        self.categories = list(keywords)
+
+        # Folded keyword -> categories it counts towards
+        self._keyword_categories = {}
+        # Folded spelling found in text (keyword or its plural) -> keyword
+        self._variants = {}
+        for category, words in keywords.items():
+            for word in words:
+                folded = ' '.join(fold_text(word).split())
+                self._keyword_categories.setdefault(folded, []).append(category)
+                for variant in plural_forms(folded):
+                    self._variants[variant] = folded
+
+        # One compiled pattern for every keyword, matched on whole words only
+        self._pattern = re.compile(r'\b' + _build_trie_pattern(list(self._variants)) + r'\b')
+
+    def count_keywords(self, text: str) -> Counter:
+        """Count whole-word keyword occurrences, ignoring case and accents"""
+        hits = Counter()
+        for match, count in Counter(self._pattern.findall(fold_text(text))).items():
+            # Multi-word keywords may span line breaks or repeated spaces
+            hits[self._variants[' '.join(match.split())]] += count
+        return hits
+
+    def tally(self, min_lead: int = 25, min_confidence: float = 0.6) -> 'KeywordTally':
+        """Start classifying text fed in chunks, see KeywordTally"""
+        return KeywordTally(self, min_lead, min_confidence)
+
+    def score(self, hits: Counter) -> Classification:
+        """Turn keyword hits into per-category scores and a best guess"""
+        scores = {category: 0 for category in self.categories}
+        for keyword, count in hits.items():
+            for category in self._keyword_categories[keyword]:
+                scores[category] += count
+
+        total = sum(scores.values())
+        if total == 0:
+            return Classification('unknown', scores, 0.0)
+
+        best = max(scores, key=scores.get)
+        return Classification(best, scores, scores[best] / total)
+
+    def classify(self, text: str) -> Classification:
+        """Classify text, returning the best category, all scores and the winner's share of hits"""
+        return self.score(self.count_keywords(text))
+
+
+class KeywordTally:
+    """Keyword hits of a document fed chunk by chunk.
+
+    The answer is settled once the leading category is ahead of the runner-up
+    by min_lead hits and holds min_confidence of all hits; later chunks
+    can then be skipped.
+    """
+
+    def __init__(self, classifier: KeywordClassifier, min_lead: int, min_confidence: float):
+        self.classifier = classifier
+        self.min_lead = min_lead
+        self.min_confidence = min_confidence
+        self.hits = Counter()
+        self.chunks = 0
+        self._matcher = StreamMatcher(classifier._pattern)
+
+    def _count(self, matches):
+        for match, _ in matches:
+            self.hits[self.classifier._variants[' '.join(match.group().split())]] += 1
+
+    def feed(self, chunk: str):
+        """Count the keywords of the next chunk"""
+        self.chunks += 1
+        self._count(self._matcher.feed(fold_text(chunk)))
+
+    def settled(self) -> bool:
+        """Whether the text read so far already decides the category"""
+        ranked = sorted(self.classifier.score(self.hits).scores.values(), reverse=True)
+        total = sum(ranked)
+        if not total:
+            return False
+        runner_up = ranked[1] if len(ranked) > 1 else 0
+        return ranked[0] - runner_up >= self.min_lead and ranked[0] / total >= self.min_confidence
+
+    def result(self) -> Classification:
+        """Classification of the text read so far"""
+        self._count(self._matcher.finish())
+        return self.classifier.score(self.hits)
@@ -0,0 +1,51 @@
+import time
+from typing import Dict, Mapping
+
+from src.models.contract import Contract
+from src.services.document_processor import DocumentProcessor
+from src.services.event_bus import contract_event, event_bus
+from src.services.field_values import set_contract_fields
+from src.services.metrics import record_processing
+from src.services.ocr_settings import OCRSettings
+
+# Shared by the API's embedded workers and by worker.py
+doc_processor = DocumentProcessor()
+
+
+def configure_processor(config: Mapping):
+    """Apply the OCR_* settings, OCR_CACHE_DIR and OCR_CACHE_MAX_MB from the app config"""
+    max_mb = config.get('OCR_CACHE_MAX_MB')
+    doc_processor.configure_ocr(
+        OCRSettings.from_config(config),
+        config.get('OCR_CACHE_DIR'),
+        int(float(max_mb) * 1024 * 1024) if max_mb is not None else None
+    )
+
+
+def apply_processing(contract: Contract, stats: Dict, processor: DocumentProcessor = doc_processor):
+    """Process the contract's file and set the results on it, without committing"""
+    start = time.perf_counter()
+    extracted_text, contract_type, extracted_data = processor.process_document(
+        contract.file_path,
+        contract.file_type,
+        stats
+    )
+    stats.setdefault('timings', {})['total'] = time.perf_counter() - start
+
+    contract.extracted_text = extracted_text
+    contract.contract_type = contract_type
+    contract.set_extracted_data(extracted_data)
+    set_contract_fields(contract, extracted_data)
+    contract.set_processing_stats(stats)
+    contract.extractor_version = DocumentProcessor.EXTRACTOR_VERSION
+    contract.status = 'completed' if extracted_text else 'error'
+
+
+def processing_finished(contract: Contract, stats: Dict):
+    """Announce a committed result and record its measurements"""
+    event_bus.publish(contract_event(contract))
+    record_processing(stats, contract.file_type, contract.status, contract.contract_type)
+
+    print(f"Contract {contract.id} processed successfully. Type: {contract.contract_type}")
+    if 'ocr_pages' in stats:
+        print(f"Contract {contract.id}: {stats['text_pages']} text pages, {stats['ocr_pages']} OCR pages")
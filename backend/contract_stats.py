@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from sqlalchemy import event, func, inspect
+
+from src.models.user import db
+from src.models.contract import Contract, ContractCounter
+
+# Contract types always present in the stats, even when zero
+CONTRACT_TYPES = ('financing', 'rental', 'insurance')
+
+
+def counter_names(status, contract_type) -> List[str]:
+    """Counters a contract with this status and type contributes to"""
+    names = ['total']
+    if status:
+        names.append(f'status:{status}')
+    if contract_type:
+        names.append(f'type:{contract_type}')
+    return names
+
+
+def _old_value(state, attribute):
+    """Value of an attribute as last loaded from the database"""
+    history = state.attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return None
+
+
+def apply_counter_deltas(connection, deltas: Dict[str, int]):
+    """Add deltas to the counters table within the current transaction"""
+    table = ContractCounter.__table__
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        result = connection.execute(
+            table.update().where(table.c.name == name).values(value=table.c.value + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(name=name, value=delta))
+
+
+@event.listens_for(db.session, 'before_flush')
+def _track_counter_changes(session, flush_context, instances):
+    """Update the counters in the same transaction as the contract changes"""
+    deltas = Counter()
+
+    for contract in session.new:
+        if isinstance(contract, Contract):
+            deltas.update(counter_names(contract.status or 'processing', contract.contract_type))
+
+    for contract in session.dirty:
+        if not isinstance(contract, Contract):
+            continue
+        state = inspect(contract)
+        for attribute, prefix in (('status', 'status:'), ('contract_type', 'type:')):
+            history = state.attrs[attribute].history
+            if not history.has_changes():
+                continue
+            for old in history.deleted:
+                if old:
+                    deltas[prefix + old] -= 1
+            for new in history.added:
+                if new:
+                    deltas[prefix + new] += 1
+
+    for contract in session.deleted:
+        if isinstance(contract, Contract):
+            state = inspect(contract)
+            deltas.subtract(counter_names(_old_value(state, 'status'), _old_value(state, 'contract_type')))
+
+    if any(deltas.values()):
+        apply_counter_deltas(session.connection(), deltas)
+        stats_cache.invalidate()
+
+
+def record_bulk_insert(rows: List[Dict]):
+    """Count contracts inserted with a bulk INSERT, which skips the flush events"""
+    deltas = Counter()
+    for row in rows:
+        deltas.update(counter_names(row.get('status') or 'processing', row.get('contract_type')))
+    apply_counter_deltas(db.session.connection(), deltas)
+    stats_cache.invalidate()
+
+
+def rebuild_counters():
+    """Recompute every counter from the contracts table with one grouped query"""
+    counts = Counter()
+    rows = db.session.query(Contract.status, Contract.contract_type, func.count(Contract.id)) \
+        .group_by(Contract.status, Contract.contract_type).all()
+    for status, contract_type, count in rows:
+        for name in counter_names(status, contract_type):
+            counts[name] += count
+
+    ContractCounter.query.delete()
+    db.session.add_all(ContractCounter(name=name, value=value) for name, value in counts.items())
+    db.session.commit()
+    stats_cache.invalidate()
+
+
+def ensure_counters():
+    """Build the counters on first start, when the table is still empty"""
+    if not db.session.query(ContractCounter.query.exists()).scalar():
+        rebuild_counters()
+
+
+class StatsCache:
+    """Keeps the counters in memory for a few seconds between dashboard refreshes"""
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._counters = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Dict[str, int]:
+        """Return all counters, reloading them once the TTL has expired"""
+        with self._lock:
+            if self._counters is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._counters = dict(db.session.query(ContractCounter.name, ContractCounter.value).all())
+                self._loaded_at = time.monotonic()
+            return self._counters
+
+    def invalidate(self):
+        """Force the next get() to read the counters table"""
+        with self._lock:
+            self._counters = None
+
+
+stats_cache = StatsCache()
+
+
+def get_contract_stats() -> Dict:
+    """Contract totals by status and type, served from the counters table"""
+    counters = stats_cache.get()
+    return {
+        'total_contracts': counters.get('total', 0),
+        'completed_contracts': counters.get('status:completed', 0),
+        'processing_contracts': counters.get('status:processing', 0),
+        'error_contracts': counters.get('status:error', 0),
+        'contract_types': {
+            contract_type: counters.get(f'type:{contract_type}', 0)
+            for contract_type in CONTRACT_TYPES
+        }
+    }
+
+
+def recent_contracts(limit: int = 5) -> List[Contract]:
+    """Newest contracts, loading only the summary columns"""
+    return Contract.summary_query().order_by(Contract.created_at.desc(), Contract.id.desc()).limit(limit).all()
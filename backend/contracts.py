@@ -1,173 +1,906 @@
+import io
 import os
+import csv
+import json
+import time
 import uuid
 import threading
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
+import click
+import base64
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.orm import selectinload
+from werkzeug.exceptions import RequestEntityTooLarge
 from src.models.user import db
-from src.models.contract import Contract
+from src.models.contract import Contract, ContractBatch, ContractField, ContractText
 from src.services.document_processor import DocumentProcessor
+from src.services.extractors import extractor_registry
+from src.services.processing_queue import ProcessingExecutor, QueueFullError
+from src.services.upload_ingest import UploadIngestor, UploadRejected
+from src.services.contract_stats import get_contract_stats, record_bulk_insert
+from src.services.event_bus import contract_event, event_bus
+from src.services.metrics import metrics
+from src.services.job_queue import ContractStatusWatcher, JobWorker, job_queue
+from src.services.job_cost import default_lane_limits, estimate_job, parse_lane_limits
+from src.services.contract_processing import configure_processor
+from src.services.field_values import (
+    AGGREGATE_GROUPS, AGGREGATE_MEASURES, MAX_HISTOGRAM_BINS, aggregate_field, field_histogram, field_rows,
+    field_values_query, set_contract_fields
+)
+from src.services.payload_cache import contract_payloads
+from src.services.search_index import REINDEX_CHUNK_SIZE, build_match_query, reindex, search_query, search_result
 
 contracts_bp = Blueprint('contracts', __name__)
 
-# Initialize document processor
-doc_processor = DocumentProcessor()
+# Shared worker pool running processing jobs in embedded mode
+processing_executor = ProcessingExecutor()
 
-# Allowed file extensions
-ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc', 'jpg', 'jpeg', 'png', 'tiff', 'bmp', 'txt'}
+# Queue and stream state, read when /api/metrics is scraped
+metrics.callback('processing_queue_depth', 'Jobs waiting for a worker',
+                 lambda: processing_executor.stats()['queue_depth'])
+metrics.callback('processing_active_workers', 'Workers currently processing a contract',
+                 lambda: processing_executor.stats()['active_workers'])
+metrics.callback('processing_jobs_completed_total', 'Processing jobs finished',
+                 lambda: processing_executor.stats()['completed_jobs'], kind='counter')
+metrics.callback('processing_jobs_failed_total', 'Processing jobs that raised an error',
+                 lambda: processing_executor.stats()['failed_jobs'], kind='counter')
+metrics.callback('processing_jobs_rejected_total', 'Jobs refused because the queue was full',
+                 lambda: processing_executor.stats()['rejected_jobs'], kind='counter')
+metrics.callback('event_stream_subscribers', 'Open status event streams', event_bus.subscriber_count)
+metrics.callback('processing_jobs_pending', 'Stored jobs waiting to be claimed', lambda: job_queue.pending_count())
+
+# Page size limits for GET /contracts
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Rows fetched from the database cursor at a time by /contracts/export
+EXPORT_CHUNK_SIZE = 1000
+
+# X-Export-Time lags the export by this much. updated_at is set when a change is
+# flushed, which can be a while before it commits; a row flushed before an export
+# but committed after it is then still picked up by the next incremental export
+EXPORT_OVERLAP = timedelta(minutes=5)
+
+# Columns written by /contracts/export, before extracted_data
+EXPORT_COLUMNS = (
+    'id', 'original_filename', 'file_type', 'file_size', 'status',
+    'contract_type', 'batch_id', 'created_at', 'updated_at'
+)
 
 def allowed_file(filename):
-    """Check if file extension is allowed"""
+    """Check if file extension is allowed (read by one of the registered extractors)"""
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+           filename.rsplit('.', 1)[1].lower() in extractor_registry.extensions
 
 def get_file_type(filename):
     """Get file extension"""
     return filename.rsplit('.', 1)[1].lower()
 
-def process_contract_async(contract_id, app):
-    """Process contract in background thread"""
-    with app.app_context():
-        try:
-            contract = Contract.query.get(contract_id)
-            if not contract:
-                return
-            
-            # Process the document
-            extracted_text, contract_type, extracted_data = doc_processor.process_document(
-                contract.file_path, 
-                contract.file_type
-            )
-            
-            # Update contract in database
-            contract.extracted_text = extracted_text
-            contract.contract_type = contract_type
-            contract.set_extracted_data(extracted_data)
-            contract.status = 'completed' if extracted_text else 'error'
-            
-            db.session.commit()
-            
-            print(f"Contract {contract_id} processed successfully. Type: {contract_type}")
-            
-        except Exception as e:
-            print(f"Error processing contract {contract_id}: {str(e)}")
-            # Update contract status to error
+def get_upload_folder():
+    """Return the uploads directory, creating it if it doesn't exist"""
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', 
+                                           os.path.join(os.path.dirname(__file__), '..', 'uploads'))
+    os.makedirs(upload_folder, exist_ok=True)
+    return upload_folder
+
+def ingest_request_files(strict=True):
+    """Stream the files of the current request to the upload folder.
+    
+    Returns (ingestor, files); files map form field names to FileStorage
+    objects whose stream is the stored IngestedFile. With strict=False a
+    rejected file doesn't abort the request; its error is kept on the
+    IngestedFile instead.
+    """
+    ingestor = UploadIngestor(
+        get_upload_folder(),
+        extractor_registry.extensions,
+        current_app.config.get('UPLOAD_MAX_SIZES'),
+        strict=strict
+    )
+    _, files = ingestor.parse(request.environ, current_app.config.get('MAX_CONTENT_LENGTH'))
+    return ingestor, files
+
+def encode_cursor(contract):
+    """Encode the (created_at, id) position of a contract as an opaque cursor"""
+    raw = f"{contract.created_at.isoformat()}|{contract.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a cursor into (created_at, id), raising ValueError if malformed"""
+    try:
+        created_at, contract_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(contract_id)
+    except (TypeError, UnicodeDecodeError, base64.binascii.Error) as e:
+        raise ValueError(str(e))
+
+def get_page_size(args):
+    """Read the `limit` query parameter, raising ValueError if invalid"""
+    limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE)
+
+def parse_date_arg(args, name):
+    """Read an ISO 8601 date query parameter, raising ValueError if malformed"""
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date')
+
+def apply_contract_filters(query, args):
+    """Filter a contracts query by the status, contract_type, created_after and
+    created_before query parameters, raising ValueError on a malformed date"""
+    created_after = parse_date_arg(args, 'created_after')
+    created_before = parse_date_arg(args, 'created_before')
+    if args.get('status'):
+        query = query.filter(Contract.status == args['status'])
+    if args.get('contract_type'):
+        query = query.filter(Contract.contract_type == args['contract_type'])
+    if created_after:
+        query = query.filter(Contract.created_at >= created_after)
+    if created_before:
+        query = query.filter(Contract.created_at < created_before)
+    return query
+
+def next_page_query(next_cursor):
+    """Query string of the next page, keeping the current filters"""
+    args = request.args.to_dict()
+    args['cursor'] = next_cursor
+    return urlencode(args)
+
+def find_cached_contract(content_hash):
+    """Find a completed contract with the same content and extractor version"""
+    return Contract.query.filter_by(
+        content_hash=content_hash,
+        extractor_version=DocumentProcessor.EXTRACTOR_VERSION,
+        status='completed'
+    ).order_by(Contract.id.desc()).first()
+
+def find_cached_contracts(content_hashes):
+    """Map each hash to a reusable completed contract, fetched in one query"""
+    if not content_hashes:
+        return {}
+    contracts = Contract.query.options(selectinload(Contract.text_record)).filter(
+        Contract.content_hash.in_(content_hashes),
+        Contract.extractor_version == DocumentProcessor.EXTRACTOR_VERSION,
+        Contract.status == 'completed'
+    ).order_by(Contract.id).all()
+    # Later rows win, so the newest result is reused
+    return {contract.content_hash: contract for contract in contracts}
+
+def get_processing_executor():
+    """Return the shared executor, configured from the app settings on first use"""
+    processing_executor.configure(
+        max_workers=current_app.config.get('PROCESSING_WORKERS'),
+        max_queue_size=current_app.config.get('PROCESSING_QUEUE_SIZE'),
+        retry_after=current_app.config.get('PROCESSING_RETRY_AFTER')
+    )
+    return processing_executor
+
+def get_job_queue():
+    """Return the shared job queue, configured from the app settings.
+    
+    JOB_LANE_LIMITS (e.g. 'fast=3,heavy=1') caps the jobs of each lane run by
+    the embedded workers; by default neither lane can take every worker.
+    """
+    job_queue.configure(
+        max_attempts=current_app.config.get('JOB_MAX_ATTEMPTS'),
+        lease_seconds=current_app.config.get('JOB_LEASE_SECONDS'),
+        backoff_seconds=current_app.config.get('JOB_BACKOFF_SECONDS'),
+        aging_factor=current_app.config.get('JOB_AGING_FACTOR'),
+        lane_limits=parse_lane_limits(current_app.config.get('JOB_LANE_LIMITS'))
+                    or default_lane_limits(get_processing_executor().max_workers)
+    )
+    return job_queue
+
+def processing_mode():
+    """'embedded' runs jobs on the API's own worker threads; 'external' leaves them to worker.py"""
+    return current_app.config.get('PROCESSING_MODE', 'embedded')
+
+def has_processing_capacity(count=1):
+    """Whether `count` more jobs fit under the queue limit"""
+    return get_job_queue().pending_count() + count <= get_processing_executor().max_queue_size
+
+def run_pending_jobs(app):
+    """Executor task: process stored jobs until none is due"""
+    JobWorker(app, job_queue).drain()
+
+def dispatch_jobs(count):
+    """Wake embedded workers for newly queued jobs; external workers poll on their own"""
+    if not count or processing_mode() != 'embedded':
+        return
+    executor = get_processing_executor()
+    try:
+        # Each task drains the queue, so more tasks than workers add nothing
+        executor.submit_many(run_pending_jobs, [(current_app._get_current_object(),)] * min(count, executor.max_workers))
+    except QueueFullError:
+        # The jobs are stored; the workers already running will get to them
+        pass
+
+def _poll_due_jobs(app, interval):
+    """Embedded mode: start draining when retries come due while the workers are idle"""
+    while True:
+        time.sleep(interval)
+        with app.app_context():
             try:
-                contract = Contract.query.get(contract_id)
-                if contract:
-                    contract.status = 'error'
-                    db.session.commit()
-            except:
-                pass
+                executor_stats = get_processing_executor().stats()
+                # A long job in one lane shouldn't keep the other lane's retries waiting
+                if executor_stats['active_workers'] < executor_stats['max_workers'] and not executor_stats['queue_depth']:
+                    dispatch_jobs(get_job_queue().pending_count(due_only=True))
+            except Exception as e:
+                print(f"Error polling processing jobs: {str(e)}")
+                db.session.rollback()
+
+def start_processing(app):
+    """Recover jobs left by a previous run and start what the processing mode needs"""
+    configure_processor(app.config)
+    with app.app_context():
+        queue = get_job_queue()
+        embedded = processing_mode() == 'embedded'
+        # In embedded mode no other process runs jobs, so every running job is orphaned
+        requeued, failed = queue.reclaim_expired(all_running=embedded)
+        recovered = queue.recover_stuck_contracts()
+        if requeued or failed or recovered:
+            print(f"Processing jobs recovered: {requeued} requeued, {failed} failed, {recovered} contracts re-queued")
+        
+        interval = app.config.get('JOB_POLL_INTERVAL', 2.0)
+        if embedded:
+            dispatch_jobs(queue.pending_count(due_only=True))
+            threading.Thread(target=_poll_due_jobs, args=(app, interval), name='job-poller', daemon=True).start()
+        else:
+            # Results are committed by other processes; relay them to event streams
+            ContractStatusWatcher(app, app.config.get('EVENTS_POLL_INTERVAL', 1.0)).start()
+
+def queue_full_response(retry_after):
+    """Build the 503 response returned when the processing queue is full"""
+    response = jsonify({'error': 'Processing queue is full, try again later'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def format_sse(event):
+    """Encode an event as a Server-Sent Events message"""
+    lines = []
+    if 'event_id' in event:
+        lines.append(f"id: {event['event_id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event)}")
+    return '\n'.join(lines) + '\n\n'
+
+def export_row(row):
+    """Export columns of a row as JSON-friendly values"""
+    return {
+        name: value.isoformat() if isinstance(value, datetime) else value
+        for name, value in zip(EXPORT_COLUMNS, row)
+    }
+
+def export_ndjson(rows):
+    """One JSON object per line, yielded a chunk of rows at a time"""
+    lines = []
+    for row in rows:
+        # The stored extracted data is already JSON; splice it in as is
+        head = json.dumps(export_row(row), ensure_ascii=False)
+        lines.append(f'{head[:-1]}, "extracted_data": {row[-1] or "{}"}}}\n')
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+def export_csv(rows):
+    """CSV with a header row and extracted_data as a JSON column, yielded a chunk at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS + ('extracted_data',))
+    for count, row in enumerate(rows, 1):
+        writer.writerow(list(export_row(row).values()) + [row[-1] or '{}'])
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def contract_version(contract_id):
+    """(id, version) of a contract, reading only its timestamps; None if it doesn't exist.
+    
+    The version is updated_at (created_at for rows never updated), which
+    changes whenever the contract does.
+    """
+    return db.session.execute(
+        select(Contract.id, func.coalesce(Contract.updated_at, Contract.created_at))
+        .where(Contract.id == contract_id)
+    ).first()
+
+def contract_etag(contract_id, version):
+    return f"{contract_id}-{version.strftime('%Y%m%d%H%M%S%f')}"
+
+def is_not_modified(contract_id, version):
+    """Whether the request's If-None-Match or If-Modified-Since matches this version"""
+    if version is None:
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(contract_etag(contract_id, version))
+    if request.if_modified_since:
+        # Last-Modified has a resolution of one second
+        return version.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+def with_validators(response, contract_id, version):
+    """Add ETag and Last-Modified; clients may keep the response but must revalidate it"""
+    if version is not None:
+        response.set_etag(contract_etag(contract_id, version))
+        response.last_modified = version.replace(tzinfo=timezone.utc)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def not_modified_response(contract_id, version):
+    return with_validators(Response(status=304), contract_id, version)
+
+def render_contract_data(row):
+    """Body of GET /contracts/<id>/data, splicing in the stored JSON instead of parsing it"""
+    head = json.dumps({'id': row.id, 'status': row.status, 'contract_type': row.contract_type})
+    extracted_data = row.extracted_data_json or '{}'
+    processing_stats = row.processing_stats_json or 'null'
+    return f'{head[:-1]}, "extracted_data": {extracted_data}, "processing_stats": {processing_stats}}}'.encode('utf-8')
+
+EXPORT_FORMATS = {
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+    'csv': (export_csv, 'text/csv'),
+}
 
 @contracts_bp.route('/contracts/upload', methods=['POST'])
 def upload_contract():
     """Upload a contract file for processing"""
     try:
+        # Stream files to disk, checking type, content and size on the way
+        try:
+            ingestor, files = ingest_request_files()
+        except UploadRejected as e:
+            return jsonify({'error': e.message}), e.status_code
+        except RequestEntityTooLarge:
+            return jsonify({'error': 'Request too large'}), 413
+        
         # Check if file is present
-        if 'file' not in request.files:
+        if 'file' not in files:
+            ingestor.discard_all()
             return jsonify({'error': 'No file provided'}), 400
         
-        file = request.files['file']
-        
         # Check if file is selected
-        if file.filename == '':
+        if files['file'].filename == '':
+            ingestor.discard_all()
             return jsonify({'error': 'No file selected'}), 400
         
-        # Check if file type is allowed
-        if not allowed_file(file.filename):
-            return jsonify({'error': 'File type not allowed'}), 400
+        upload = files['file'].stream
+        ingestor.discard_all(keep=[upload])
+        filename = upload.filename
+        file_path = upload.path
+        file_size = upload.size
+        content_hash = upload.content_hash
         
-        # Create uploads directory if it doesn't exist
-        upload_folder = current_app.config.get('UPLOAD_FOLDER', 
-                                               os.path.join(os.path.dirname(__file__), '..', 'uploads'))
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Generate unique filename
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        file_path = os.path.join(upload_folder, unique_filename)
+        # Reuse the results of an identical file that was already processed
+        cached = find_cached_contract(content_hash)
+        if cached:
+            contract = Contract(
+                original_filename=filename,
+                file_path=file_path,
+                file_type=upload.file_type,
+                file_size=file_size,
+                content_hash=content_hash,
+                extracted_text=cached.extracted_text,
+                contract_type=cached.contract_type,
+                extracted_data_json=cached.extracted_data_json,
+                extractor_version=cached.extractor_version,
+                status='completed'
+            )
+            set_contract_fields(contract, cached.get_extracted_data())
+            db.session.add(contract)
+            db.session.commit()
+            event_bus.publish(contract_event(contract))
+            
+            return jsonify({
+                'message': 'File uploaded successfully',
+                'contract_id': contract.id,
+                'status': 'completed',
+                'cached': True
+            }), 201
         
-        # Save file
-        file.save(file_path)
+        # Refuse when the processing queue is already full
+        if not has_processing_capacity():
+            os.remove(file_path)
+            return queue_full_response(get_processing_executor().retry_after)
         
         # Create contract record in database
         contract = Contract(
             original_filename=filename,
             file_path=file_path,
-            file_type=get_file_type(filename),
-            file_size=os.path.getsize(file_path),
+            file_type=upload.file_type,
+            file_size=file_size,
+            content_hash=content_hash,
             status='processing'
         )
         
         db.session.add(contract)
+        db.session.flush()
+        
+        # Store the job in the same transaction, so an accepted upload can't be lost
+        estimate = estimate_job(file_path, upload.file_type, file_size)
+        get_job_queue().enqueue([contract.id], [estimate])
         db.session.commit()
+        dispatch_jobs(1)
         
-        # Start background processing
-        thread = threading.Thread(
-            target=process_contract_async, 
-            args=(contract.id, current_app._get_current_object())
-        )
-        thread.daemon = True
-        thread.start()
+        event_bus.publish(contract_event(contract))
         
         return jsonify({
             'message': 'File uploaded successfully',
             'contract_id': contract.id,
-            'status': 'processing'
+            'status': 'processing',
+            'lane': estimate.lane,
+            'cached': False
         }), 201
         
     except Exception as e:
         print(f"Error uploading file: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@contracts_bp.route('/contracts/batch', methods=['POST'])
+def upload_contract_batch():
+    """Upload many contract files in one multipart request"""
+    try:
+        # Stream every file part to disk; bad files are reported, not fatal
+        try:
+            ingestor, _ = ingest_request_files(strict=False)
+        except RequestEntityTooLarge:
+            return jsonify({'error': 'Request too large'}), 413
+        
+        uploads = ingestor.files
+        if not uploads:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        accepted = [upload for upload in uploads if not upload.error]
+        cached = find_cached_contracts({upload.content_hash for upload in accepted})
+        to_process = [upload for upload in accepted if upload.content_hash not in cached]
+        
+        # Refuse new work only while the queue is already full. An admitted batch is
+        # stored whole, even past the limit: its jobs wait in the table and the
+        # workers are only woken for as many as they can run (see dispatch_jobs)
+        if to_process and not has_processing_capacity():
+            ingestor.discard_all()
+            return queue_full_response(get_processing_executor().retry_after)
+        
+        results = {}
+        batch_id = None
+        if accepted:
+            batch_id = str(uuid.uuid4())
+            db.session.add(ContractBatch(id=batch_id, file_count=len(accepted)))
+            
+            rows = []
+            for upload in accepted:
+                row = {
+                    'original_filename': upload.filename,
+                    'file_path': upload.path,
+                    'file_type': upload.file_type,
+                    'file_size': upload.size,
+                    'content_hash': upload.content_hash,
+                    'batch_id': batch_id,
+                    'status': 'processing'
+                }
+                hit = cached.get(upload.content_hash)
+                if hit:
+                    row.update(
+                        contract_type=hit.contract_type,
+                        extracted_data_json=hit.extracted_data_json,
+                        extractor_version=hit.extractor_version,
+                        status='completed'
+                    )
+                rows.append(row)
+            
+            # One INSERT for all contracts, returning their ids in order
+            contract_ids = db.session.scalars(
+                insert(Contract).returning(Contract.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            
+            # Reused results share the already compressed text
+            texts = [
+                {
+                    'contract_id': contract_id,
+                    'compressed_text': cached[upload.content_hash].text_record.compressed_text,
+                    'text_length': cached[upload.content_hash].text_record.text_length
+                }
+                for contract_id, upload in zip(contract_ids, accepted)
+                if upload.content_hash in cached and cached[upload.content_hash].text_record
+            ]
+            if texts:
+                db.session.execute(insert(ContractText), texts)
+            fields = [
+                row
+                for contract_id, upload in zip(contract_ids, accepted)
+                if upload.content_hash in cached
+                for row in field_rows(cached[upload.content_hash].get_extracted_data(), contract_id)
+            ]
+            if fields:
+                db.session.execute(insert(ContractField), fields)
+            
+            # Jobs for the new files, committed together with the contracts
+            pending = [
+                (contract_id, estimate_job(row['file_path'], row['file_type'], row['file_size']))
+                for contract_id, row in zip(contract_ids, rows) if row['status'] == 'processing'
+            ]
+            pending_ids = [contract_id for contract_id, _ in pending]
+            get_job_queue().enqueue(pending_ids, [estimate for _, estimate in pending])
+            
+            record_bulk_insert(rows)
+            db.session.commit()
+            dispatch_jobs(len(pending_ids))
+            
+            lanes = {contract_id: estimate.lane for contract_id, estimate in pending}
+            for contract_id, upload, row in zip(contract_ids, accepted, rows):
+                results[id(upload)] = {
+                    'filename': upload.filename,
+                    'contract_id': contract_id,
+                    'status': row['status'],
+                    'lane': lanes.get(contract_id),
+                    'cached': upload.content_hash in cached
+                }
+            
+            for contract_id, row in zip(contract_ids, rows):
+                event_bus.publish({
+                    'type': 'status',
+                    'id': contract_id,
+                    'status': row['status'],
+                    'contract_type': row.get('contract_type'),
+                    'batch_id': batch_id
+                })
+        
+        files = [
+            results.get(id(upload)) or {'filename': upload.filename, 'error': upload.error.message}
+            for upload in uploads
+        ]
+        response = {
+            'batch_id': batch_id,
+            'accepted': len(accepted),
+            'rejected': len(uploads) - len(accepted),
+            'files': files
+        }
+        return jsonify(response), 201 if accepted else 400
+        
+    except Exception as e:
+        print(f"Error uploading batch: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@contracts_bp.route('/contracts/batch/<batch_id>', methods=['GET'])
+def get_batch_status(batch_id):
+    """Get aggregate processing progress of a batch"""
+    try:
+        counts = dict(
+            db.session.query(Contract.status, func.count(Contract.id))
+            .filter(Contract.batch_id == batch_id)
+            .group_by(Contract.status)
+            .all()
+        )
+        if not counts:
+            return jsonify({'error': 'Batch not found'}), 404
+        
+        total = sum(counts.values())
+        finished = counts.get('completed', 0) + counts.get('error', 0)
+        return jsonify({
+            'batch_id': batch_id,
+            'total': total,
+            'completed': counts.get('completed', 0),
+            'processing': counts.get('processing', 0),
+            'error': counts.get('error', 0),
+            'progress': round(100.0 * finished / total, 1),
+            'finished': finished == total
+        })
+    except Exception as e:
+        print(f"Error getting batch status {batch_id}: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@contracts_bp.route('/contracts/events', methods=['GET'])
+def stream_contract_events():
+    """Stream contract status changes as Server-Sent Events.
+    
+    Filter with ?contract_id= or ?batch_id=; without either every contract's
+    changes are sent. Events come from the in-process event bus, so an open
+    stream costs no database queries.
+    """
+    try:
+        contract_id = request.args.get('contract_id', type=int)
+        batch_id = request.args.get('batch_id') or None
+        last_event_id = request.headers.get('Last-Event-ID', type=int)
+        keepalive = current_app.config.get('EVENTS_KEEPALIVE', 15)
+        max_duration = current_app.config.get('EVENTS_MAX_DURATION', 300)
+        
+        # Subscribe before reading the current state so no transition is missed
+        subscription = event_bus.subscribe(contract_id, batch_id, last_event_id)
+        snapshot = None
+        if contract_id is not None and last_event_id is None:
+            contract = db.session.get(Contract, contract_id)
+            if not contract:
+                event_bus.unsubscribe(subscription)
+                return jsonify({'error': 'Contract not found'}), 404
+            snapshot = contract_event(contract)
+    except Exception as e:
+        print(f"Error opening event stream: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            if snapshot:
+                yield format_sse(snapshot)
+            # Streams are closed periodically; clients reconnect with Last-Event-ID
+            deadline = time.monotonic() + max_duration
+            while time.monotonic() < deadline:
+                if subscription.lagged:
+                    # Events were dropped; the client has to reload the state it shows
+                    yield format_sse({'type': 'resync'})
+                    return
+                event = subscription.get(timeout=keepalive)
+                if event:
+                    yield format_sse(event)
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            event_bus.unsubscribe(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@contracts_bp.route('/contracts/export', methods=['GET'])
+def export_contracts():
+    """Stream contracts with their extracted data as NDJSON or CSV.
+    
+    Supports `format` (ndjson or csv), the listing filters, and `since` to
+    export only contracts changed at or after a timestamp. The X-Export-Time
+    header holds the value to pass as `since` on the next incremental export;
+    it is EXPORT_OVERLAP before the export started, so consecutive exports
+    overlap and clients should replace rows they already have by id.
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'format must be ndjson or csv'}), 400
+        
+        columns = [getattr(Contract, name) for name in EXPORT_COLUMNS] + [Contract.extracted_data_json]
+        try:
+            statement = apply_contract_filters(select(*columns), request.args)
+            since = parse_date_arg(request.args, 'since')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        export_time = datetime.utcnow() - EXPORT_OVERLAP
+        if since:
+            statement = statement.where(Contract.updated_at >= since) \
+                .order_by(Contract.updated_at, Contract.id)
+        else:
+            statement = statement.order_by(Contract.id)
+        
+        # Rows are fetched from the cursor in chunks while the response is sent
+        rows = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        encode, mimetype = EXPORT_FORMATS[export_format]
+        
+        return Response(stream_with_context(encode(rows)), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename=contracts.{export_format}',
+            'X-Export-Time': export_time.isoformat()
+        })
+    except Exception as e:
+        print(f"Error exporting contracts: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@contracts_bp.route('/contracts/search', methods=['GET'])
+def search_contracts():
+    """Full-text search over the extracted text of contracts, best matches first.
+    
+    Takes `q` (words, "phrases", prefix*), `limit`, `offset` and the listing
+    filters. Accents are ignored and CPF/CNPJ numbers match with or without
+    punctuation.
+    """
+    try:
+        match_expression = build_match_query(request.args.get('q', ''))
+        if not match_expression:
+            return jsonify({'error': 'q must contain at least one word'}), 400
+        try:
+            limit = get_page_size(request.args)
+            offset = int(request.args.get('offset', 0))
+            if offset < 0:
+                raise ValueError('offset must not be negative')
+            query = apply_contract_filters(Contract.summary_query(), request.args)
+        except ValueError:
+            return jsonify({'error': 'Invalid limit, offset or filter'}), 400
+        
+        query = search_query(query, match_expression)
+        total = query.order_by(None).with_entities(func.count(Contract.id)).scalar()
+        hits = query.offset(offset).limit(limit).all()
+        
+        return jsonify({
+            'query': request.args['q'],
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'next_offset': offset + limit if offset + limit < total else None,
+            'results': [search_result(contract, score, snippet) for contract, score, snippet in hits]
+        })
+    except Exception as e:
+        print(f"Error searching contracts: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@contracts_bp.route('/contracts/fields/aggregate', methods=['GET'])
+def aggregate_contract_fields():
+    """Aggregate one extracted field over contracts, computed in SQL.
+    
+    Takes `field` (an extracted_data key such as valor_financiado), `measure`
+    (number, rate_monthly or rate_annual), optional `group_by` (contract_type,
+    status or month of upload), `bins` for a histogram, and the listing filters.
+    """
+    try:
+        field = request.args.get('field')
+        measure = request.args.get('measure', 'number')
+        group_by = request.args.get('group_by')
+        if not field:
+            return jsonify({'error': 'field is required'}), 400
+        if measure not in AGGREGATE_MEASURES:
+            return jsonify({'error': f"measure must be one of {', '.join(AGGREGATE_MEASURES)}"}), 400
+        if group_by and group_by not in AGGREGATE_GROUPS:
+            return jsonify({'error': f"group_by must be one of {', '.join(AGGREGATE_GROUPS)}"}), 400
+        try:
+            bins = int(request.args.get('bins', 0))
+            if not 0 <= bins <= MAX_HISTOGRAM_BINS:
+                raise ValueError(f'bins must be between 0 and {MAX_HISTOGRAM_BINS}')
+            statement = apply_contract_filters(field_values_query(field, measure), request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        result = {'field': field, 'measure': measure, 'group_by': group_by}
+        if group_by:
+            result['groups'] = aggregate_field(statement, measure, group_by)
+        else:
+            result['summary'] = aggregate_field(statement, measure)[0]
+        if bins:
+            result['histogram'] = field_histogram(statement, measure, bins)
+        return jsonify(result)
+    except Exception as e:
+        print(f"Error aggregating contract fields: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@contracts_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Processing metrics in the Prometheus text format; external workers serve their own (worker.py --metrics-port)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@contracts_bp.route('/contracts/queue', methods=['GET'])
+def get_processing_queue():
+    """Get processing mode, stored job counts, per-lane waits and usage of the embedded worker pool"""
+    try:
+        stats = get_processing_executor().stats()
+        stats['mode'] = processing_mode()
+        stats['jobs'] = get_job_queue().counts()
+        stats['lanes'] = get_job_queue().lane_stats()
+        return jsonify(stats)
+    except Exception as e:
+        print(f"Error getting processing queue: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 @contracts_bp.route('/contracts', methods=['GET'])
 def get_contracts():
-    """Get list of all contracts"""
+    """Get a page of contracts, newest first.
+    
+    Supports `limit`, `cursor`, `status`, `contract_type`, `created_after` and
+    `created_before` query parameters. The cursor of the next page is returned
+    in the X-Next-Cursor header.
+    """
     try:
-        contracts = Contract.query.order_by(Contract.created_at.desc()).all()
-        return jsonify([contract.to_dict() for contract in contracts])
+        try:
+            limit = get_page_size(request.args)
+            cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            return jsonify({'error': 'Invalid limit or cursor'}), 400
+        
+        try:
+            query = apply_contract_filters(Contract.summary_query(), request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if cursor:
+            # Keyset pagination: continue right after the last row of the previous page
+            query = query.filter(tuple_(Contract.created_at, Contract.id) < cursor)
+        
+        contracts = query.order_by(Contract.created_at.desc(), Contract.id.desc()).limit(limit + 1).all()
+        
+        response = jsonify([contract.to_dict() for contract in contracts[:limit]])
+        if len(contracts) > limit:
+            next_cursor = encode_cursor(contracts[limit - 1])
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{request.base_url}?{next_page_query(next_cursor)}>; rel="next"'
+        return response
     except Exception as e:
         print(f"Error getting contracts: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @contracts_bp.route('/contracts/<int:contract_id>', methods=['GET'])
 def get_contract(contract_id):
-    """Get specific contract details"""
+    """Get specific contract details; answers conditional requests with 304"""
     try:
-        contract = Contract.query.get_or_404(contract_id)
-        return jsonify(contract.to_dict())
+        current = contract_version(contract_id)
+        if current is None:
+            return jsonify({'error': 'Contract not found'}), 404
+        if is_not_modified(*current):
+            return not_modified_response(*current)
+        
+        contract = Contract.summary_query().filter(Contract.id == contract_id).first()
+        if contract is None:
+            return jsonify({'error': 'Contract not found'}), 404
+        version = contract.updated_at or contract.created_at
+        return with_validators(jsonify(contract.to_dict()), contract_id, version)
     except Exception as e:
         print(f"Error getting contract {contract_id}: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @contracts_bp.route('/contracts/<int:contract_id>/data', methods=['GET'])
 def get_contract_data(contract_id):
-    """Get extracted data from a specific contract"""
+    """Get extracted data from a specific contract.
+    
+    The stored JSON is written into the response as is, and rendered bodies
+    are kept in an LRU keyed by the contract's version. Conditional requests
+    are answered with 304 without loading the data columns.
+    """
     try:
-        contract = Contract.query.get_or_404(contract_id)
+        current = contract_version(contract_id)
+        if current is None:
+            return jsonify({'error': 'Contract not found'}), 404
+        if is_not_modified(*current):
+            return not_modified_response(*current)
         
-        response_data = {
-            'id': contract.id,
-            'status': contract.status,
-            'contract_type': contract.contract_type,
-            'extracted_data': contract.get_extracted_data()
-        }
+        version = current[1]
+        body = contract_payloads.get(contract_id, version)
+        if body is None:
+            row = db.session.execute(
+                select(
+                    Contract.id, Contract.status, Contract.contract_type, Contract.extracted_data_json,
+                    Contract.processing_stats_json, func.coalesce(Contract.updated_at, Contract.created_at)
+                ).where(Contract.id == contract_id)
+            ).first()
+            if row is None:
+                return jsonify({'error': 'Contract not found'}), 404
+            version = row[-1]
+            body = render_contract_data(row)
+            contract_payloads.put(contract_id, version, body)
         
-        return jsonify(response_data)
+        return with_validators(Response(body, mimetype='application/json'), contract_id, version)
     except Exception as e:
         print(f"Error getting contract data {contract_id}: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @contracts_bp.route('/contracts/<int:contract_id>/status', methods=['GET'])
 def get_contract_status(contract_id):
-    """Get processing status of a specific contract"""
+    """Get processing status of a specific contract; answers conditional requests with 304"""
     try:
-        contract = Contract.query.get_or_404(contract_id)
-        return jsonify({
-            'id': contract.id,
-            'status': contract.status,
-            'contract_type': contract.contract_type
+        current = contract_version(contract_id)
+        if current is None:
+            return jsonify({'error': 'Contract not found'}), 404
+        if is_not_modified(*current):
+            return not_modified_response(*current)
+        
+        row = db.session.execute(
+            select(
+                Contract.id, Contract.status, Contract.contract_type,
+                func.coalesce(Contract.updated_at, Contract.created_at)
+            ).where(Contract.id == contract_id)
+        ).first()
+        if row is None:
+            return jsonify({'error': 'Contract not found'}), 404
+        response = jsonify({
+            'id': row.id,
+            'status': row.status,
+            'contract_type': row.contract_type
         })
+        return with_validators(response, contract_id, row[-1])
     except Exception as e:
         print(f"Error getting contract status {contract_id}: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -176,28 +909,14 @@ def get_contract_status(contract_id):
 def get_contracts_stats():
     """Get statistics about contracts"""
     try:
-        total_contracts = Contract.query.count()
-        completed_contracts = Contract.query.filter_by(status='completed').count()
-        processing_contracts = Contract.query.filter_by(status='processing').count()
-        error_contracts = Contract.query.filter_by(status='error').count()
-        
-        # Count by contract type
-        financing_count = Contract.query.filter_by(contract_type='financing').count()
-        rental_count = Contract.query.filter_by(contract_type='rental').count()
-        insurance_count = Contract.query.filter_by(contract_type='insurance').count()
-        
-        return jsonify({
-            'total_contracts': total_contracts,
-            'completed_contracts': completed_contracts,
-            'processing_contracts': processing_contracts,
-            'error_contracts': error_contracts,
-            'contract_types': {
-                'financing': financing_count,
-                'rental': rental_count,
-                'insurance': insurance_count
-            }
-        })
+        return jsonify(get_contract_stats())
     except Exception as e:
         print(f"Error getting contract stats: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+@contracts_bp.cli.command('reindex-search')
+@click.option('--chunk-size', default=REINDEX_CHUNK_SIZE, help='Contracts reindexed per transaction')
+def reindex_search_command(chunk_size):
+    """Rebuild the full-text search index while the API keeps running"""
+    count = reindex(db.engine, chunk_size)
+    print(f"Reindexed {count} contracts")
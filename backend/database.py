@@ -0,0 +1,252 @@
+import json
+import sqlite3
+import zlib
+from datetime import datetime
+
+from sqlalchemy import event, insert, inspect, text
+
+from src.models.user import db
+from src.models.contract import Contract, ContractField, ProcessingJob
+from src.services.field_values import field_rows
+from src.services.search_index import create_search_index, rebuild_search_index, register_sqlite_functions
+
+# Applied to every new SQLite connection; overridable with the SQLITE_PRAGMAS setting
+SQLITE_PRAGMAS = {
+    # Readers no longer block the writer (and vice versa)
+    'journal_mode': 'WAL',
+    # Safe with WAL, and avoids an fsync per commit
+    'synchronous': 'NORMAL',
+    # Wait for locks instead of failing with 'database is locked'
+    'busy_timeout': 5000,
+    'foreign_keys': 'ON',
+    'temp_store': 'MEMORY',
+    # Negative values are KiB: 64 MB page cache per connection
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+# Contracts copied per statement by data migrations
+MIGRATION_BATCH_SIZE = 500
+
+
+def configure_sqlite(engine, pragmas):
+    """Run the PRAGMAs and register our SQL functions on each connection the engine opens"""
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        register_sqlite_functions(dbapi_connection)
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+
+def _column_names(connection, table):
+    return {column['name'] for column in inspect(connection).get_columns(table)}
+
+
+def _create_indexes(connection, *names, table=Contract.__table__):
+    """Create indexes declared on a model (by default Contract), by name"""
+    for index in table.indexes:
+        if index.name in names:
+            index.create(connection, checkfirst=True)
+
+
+def _add_dedup_columns(connection):
+    """Add the content hash and extractor version columns"""
+    columns = _column_names(connection, 'contracts')
+    if 'content_hash' not in columns:
+        connection.execute(text('ALTER TABLE contracts ADD COLUMN content_hash VARCHAR(64)'))
+    if 'extractor_version' not in columns:
+        connection.execute(text('ALTER TABLE contracts ADD COLUMN extractor_version VARCHAR(20)'))
+    _create_indexes(connection, 'ix_contracts_content_hash')
+
+
+def _add_contract_indexes(connection):
+    """Create the indexes used by listing and filtering"""
+    _create_indexes(
+        connection,
+        'ix_contracts_created_at_id',
+        'ix_contracts_status_created_at',
+        'ix_contracts_type_created_at'
+    )
+
+
+def _move_extracted_text(connection):
+    """Move extracted_text out of contracts into compressed contract_texts rows"""
+    if 'extracted_text' not in _column_names(connection, 'contracts'):
+        return
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            text('SELECT id, extracted_text FROM contracts '
+                 'WHERE id > :last_id AND extracted_text IS NOT NULL ORDER BY id LIMIT :limit'),
+            {'last_id': last_id, 'limit': MIGRATION_BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            text('INSERT INTO contract_texts (contract_id, compressed_text, text_length) '
+                 'VALUES (:contract_id, :compressed_text, :text_length)'),
+            [
+                {
+                    'contract_id': contract_id,
+                    'compressed_text': zlib.compress(extracted_text.encode('utf-8'), 6),
+                    'text_length': len(extracted_text)
+                }
+                for contract_id, extracted_text in rows
+            ]
+        )
+        last_id = rows[-1][0]
+
+    if connection.dialect.name != 'sqlite' or sqlite3.sqlite_version_info >= (3, 35):
+        connection.execute(text('ALTER TABLE contracts DROP COLUMN extracted_text'))
+    else:
+        # Old SQLite without DROP COLUMN: free the space, leave the column unused
+        connection.execute(text('UPDATE contracts SET extracted_text = NULL'))
+
+
+def _add_batch_column(connection):
+    """Add the batch_id column and its index"""
+    if 'batch_id' not in _column_names(connection, 'contracts'):
+        connection.execute(text(
+            'ALTER TABLE contracts ADD COLUMN batch_id VARCHAR(36) REFERENCES contract_batches (id)'
+        ))
+    _create_indexes(connection, 'ix_contracts_batch_id')
+
+
+def _add_updated_at_index(connection):
+    """Create the index used by incremental exports"""
+    _create_indexes(connection, 'ix_contracts_updated_at')
+
+
+def _add_processing_stats_column(connection):
+    """Add the column holding per-contract processing measurements"""
+    if 'processing_stats_json' not in _column_names(connection, 'contracts'):
+        connection.execute(text('ALTER TABLE contracts ADD COLUMN processing_stats_json TEXT'))
+
+
+def _add_search_index(connection):
+    """Create the full-text index and index the existing contracts"""
+    create_search_index(connection)
+    rebuild_search_index(connection)
+
+
+def _backfill_contract_fields(connection):
+    """Fill contract_fields from the extracted_data_json of processed contracts"""
+    if connection.execute(text('SELECT 1 FROM contract_fields LIMIT 1')).first():
+        return
+
+    last_id = 0
+    while True:
+        contracts = connection.execute(
+            text('SELECT id, extracted_data_json FROM contracts '
+                 'WHERE id > :last_id AND extracted_data_json IS NOT NULL ORDER BY id LIMIT :limit'),
+            {'last_id': last_id, 'limit': MIGRATION_BATCH_SIZE}
+        ).all()
+        if not contracts:
+            break
+        rows = []
+        for contract_id, extracted_data_json in contracts:
+            try:
+                rows.extend(field_rows(json.loads(extracted_data_json), contract_id))
+            except (ValueError, AttributeError):
+                continue
+        if rows:
+            connection.execute(insert(ContractField.__table__), rows)
+        last_id = contracts[-1][0]
+
+
+def _add_job_lanes(connection):
+    """Add lane, cost and rank_at to processing jobs; existing jobs stay in the fast lane in FIFO order"""
+    columns = _column_names(connection, 'processing_jobs')
+    if 'lane' not in columns:
+        connection.execute(text("ALTER TABLE processing_jobs ADD COLUMN lane VARCHAR(10) NOT NULL DEFAULT 'fast'"))
+    if 'cost' not in columns:
+        connection.execute(text('ALTER TABLE processing_jobs ADD COLUMN cost FLOAT'))
+    if 'rank_at' not in columns:
+        connection.execute(text('ALTER TABLE processing_jobs ADD COLUMN rank_at DATETIME'))
+        connection.execute(text('UPDATE processing_jobs SET rank_at = available_at'))
+    _create_indexes(connection, 'ix_processing_jobs_status_lane_rank', table=ProcessingJob.__table__)
+
+
+# Ordered schema changes; each must be safe to run on a database that already has it
+MIGRATIONS = [
+    (1, 'add content_hash and extractor_version to contracts', _add_dedup_columns),
+    (2, 'add contracts indexes', _add_contract_indexes),
+    (3, 'move extracted text to compressed contract_texts', _move_extracted_text),
+    (4, 'add batch_id to contracts', _add_batch_column),
+    (5, 'add contracts updated_at index', _add_updated_at_index),
+    (6, 'add full-text search index', _add_search_index),
+    (7, 'add processing_stats_json to contracts', _add_processing_stats_column),
+    (8, 'fill typed contract_fields from extracted data', _backfill_contract_fields),
+    (9, 'add lanes and cost ranking to processing_jobs', _add_job_lanes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _set_aside_legacy_contracts():
+    """Rename a contracts table from the original prototype schema, which migrations can't upgrade.
+
+    That table (title, contract_type, extracted_data) has none of the upload
+    columns. Its rows are kept in contracts_legacy and a new contracts table
+    is created. Returns the new name, or None if there was nothing to move.
+    """
+    inspector = inspect(db.engine)
+    if not inspector.has_table('contracts'):
+        return None
+    if 'file_path' in {column['name'] for column in inspector.get_columns('contracts')}:
+        return None
+
+    name, number = 'contracts_legacy', 1
+    while inspector.has_table(name):
+        number += 1
+        name = f'contracts_legacy_{number}'
+    with db.engine.begin() as connection:
+        connection.execute(text(f'ALTER TABLE contracts RENAME TO {name}'))
+    return name
+
+
+def _current_version(connection):
+    connection.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, applied_at DATETIME NOT NULL)'
+    ))
+    return connection.execute(text('SELECT MAX(version) FROM schema_migrations')).scalar() or 0
+
+
+def upgrade_schema():
+    """Create missing tables and apply pending migrations"""
+    legacy_table = _set_aside_legacy_contracts()
+    if legacy_table:
+        print(f"Renamed the old contracts table to {legacy_table}; a new one will be created")
+    fresh = not inspect(db.engine).has_table('contracts')
+    db.create_all()
+
+    with db.engine.begin() as connection:
+        if fresh:
+            # Objects create_all() doesn't know about
+            create_search_index(connection)
+        version = _current_version(connection)
+        for number, description, migrate in MIGRATIONS:
+            if number <= version:
+                continue
+            # A brand new database already has the current schema from create_all()
+            if not fresh:
+                print(f"Applying migration {number}: {description}")
+                migrate(connection)
+            connection.execute(
+                text('INSERT INTO schema_migrations (version, applied_at) VALUES (:version, :applied_at)'),
+                {'version': number, 'applied_at': datetime.utcnow()}
+            )
+
+
+def init_database(app):
+    """Bind the database to the app, tune SQLite and bring the schema up to date"""
+    db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            configure_sqlite(db.engine, dict(SQLITE_PRAGMAS, **app.config.get('SQLITE_PRAGMAS', {})))
+        upgrade_schema()
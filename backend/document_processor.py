@@ -1,15 +1,34 @@
 import os
-import re
-import fitz  # PyMuPDF
-import pytesseract
-from PIL import Image
-from docx import Document
-from pdf2image import convert_from_path
-import tempfile
-from typing import Dict, List, Optional, Tuple
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+from src.services.ocr_settings import OCRSettings
+from src.services.contract_classifier import Classification, KeywordClassifier
+from src.services.extractors import ExtractorRegistry, extractor_registry
+from src.services.field_extractor import field_registry
+from src.services.metrics import timed
 
 class DocumentProcessor:
-    def __init__(self):
+    # Bump whenever extraction output changes so cached results are not reused
+    EXTRACTOR_VERSION = '7'
+    
+    def __init__(self, ocr_workers: Optional[int] = None, ocr_settings: Optional[OCRSettings] = None,
+                 ocr_cache_dir: Optional[str] = None, min_page_text_chars: int = 20,
+                 extractors: ExtractorRegistry = extractor_registry, ocr_cache_max_bytes: Optional[int] = None):
+        # Text backends by file type; each is imported when its first file arrives
+        self.extractors = extractors
+        
+        # OCR engine, created on first use (see ocr_engine): scanned PDF pages go to its process
+        # pool, image files are OCR'd in the calling thread
+        self.ocr_workers = ocr_workers
+        self.ocr_settings = ocr_settings
+        self.ocr_cache_dir = ocr_cache_dir
+        self.ocr_cache_max_bytes = ocr_cache_max_bytes
+        self._ocr_engine = None
+        self._ocr_engine_lock = threading.Lock()
+        
+        # PDF pages with less extractable text than this are OCR'd
+        self.min_page_text_chars = min_page_text_chars
+        
         # Contract classification keywords
         self.contract_keywords = {
             'financing': [
@@ -28,281 +47,128 @@ class DocumentProcessor:
                 'renovação', 'exclusão', 'risco', 'dano', 'ressarcimento'
             ]
         }
+        
+        # Single-pass matcher over all keywords
+        self.classifier = KeywordClassifier(self.contract_keywords)
+        
+        # Field specs per contract type (see field_extractor.register_default_fields)
+        self.field_extractor = field_registry.compile()
     
-    def extract_text_from_file(self, file_path: str, file_type: str) -> str:
+    def iter_text_chunks(self, file_path: str, file_type: str, stats: Optional[Dict] = None) -> Iterator[str]:
+        """Yield the text of a file in order, a page (PDF) or a batch of paragraphs or lines at a time.
+        
+        Joined, the chunks are the document text. Errors are raised to the caller.
+        """
+        yield from self.extractors.get(file_type)(self, file_path, stats)
+    
+    def extract_text_from_file(self, file_path: str, file_type: str, stats: Optional[Dict] = None) -> str:
         """Extract text from different file types"""
         try:
-            if file_type.lower() == 'pdf':
-                return self._extract_text_from_pdf(file_path)
-            elif file_type.lower() in ['docx', 'doc']:
-                return self._extract_text_from_docx(file_path)
-            elif file_type.lower() in ['jpg', 'jpeg', 'png', 'tiff', 'bmp']:
-                return self._extract_text_from_image(file_path)
-            elif file_type.lower() == 'txt':
-                return self._extract_text_from_txt(file_path)
-            else:
-                raise ValueError(f"Unsupported file type: {file_type}")
+            return "".join(self.iter_text_chunks(file_path, file_type, stats))
         except Exception as e:
             print(f"Error extracting text from {file_path}: {str(e)}")
             return ""
     
-    def _extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF using PyMuPDF and OCR fallback"""
-        text = ""
-        
-        try:
-            # First try to extract text directly
-            doc = fitz.open(file_path)
-            for page in doc:
-                page_text = page.get_text()
-                if page_text.strip():
-                    text += page_text + "\n"
-            
-            doc.close()
-            
-            # If no text found, use OCR
-            if not text.strip():
-                print("No text found in PDF, using OCR...")
-                images = convert_from_path(file_path)
-                for image in images:
-                    # Save image temporarily
-                    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp_file:
-                        image.save(tmp_file.name)
-                        ocr_text = self._extract_text_from_image(tmp_file.name)
-                        text += ocr_text + "\n"
-                        os.unlink(tmp_file.name)
-            
-            return text
-        except Exception as e:
-            print(f"Error extracting text from PDF: {str(e)}")
-            return ""
+    @property
+    def ocr_engine(self):
+        """The OCR process pool; importing it loads PyMuPDF, Pillow and pytesseract"""
+        with self._ocr_engine_lock:
+            if self._ocr_engine is None:
+                from src.services.ocr_engine import OCREngine
+                self._ocr_engine = OCREngine(max_workers=self.ocr_workers, settings=self.ocr_settings,
+                                             cache_dir=self.ocr_cache_dir,
+                                             cache_max_bytes=self.ocr_cache_max_bytes)
+            return self._ocr_engine
     
-    def _extract_text_from_docx(self, file_path: str) -> str:
-        """Extract text from DOCX file"""
-        try:
-            doc = Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-        except Exception as e:
-            print(f"Error extracting text from DOCX: {str(e)}")
-            return ""
+    def configure_ocr(self, settings: Optional[OCRSettings] = None, cache_dir: Optional[str] = None,
+                      cache_max_bytes: Optional[int] = None):
+        """Update the OCR settings, whether or not the engine has been created yet"""
+        with self._ocr_engine_lock:
+            if settings:
+                self.ocr_settings = settings
+            if cache_dir:
+                self.ocr_cache_dir = cache_dir
+            if cache_max_bytes is not None:
+                self.ocr_cache_max_bytes = cache_max_bytes
+            if self._ocr_engine is not None:
+                self._ocr_engine.configure(settings, cache_dir, cache_max_bytes)
     
-    def _extract_text_from_txt(self, file_path: str) -> str:
-        """Extract text from TXT file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except UnicodeDecodeError:
-            # Try with different encoding if UTF-8 fails
-            try:
-                with open(file_path, 'r', encoding='latin-1') as file:
-                    return file.read()
-            except Exception as e:
-                print(f"Error reading TXT file: {str(e)}")
-                return ""
-        except Exception as e:
-            print(f"Error extracting text from TXT: {str(e)}")
-            return ""
-    
-    def _extract_text_from_image(self, file_path: str) -> str:
-        """Extract text from image using OCR"""
-        try:
-            image = Image.open(file_path)
-            text = pytesseract.image_to_string(image, lang='por')
-            return text
-        except Exception as e:
-            print(f"Error extracting text from image: {str(e)}")
-            return ""
+    def classify_contract(self, text: str) -> Classification:
+        """Classify contract type, returning per-category scores and a confidence"""
+        return self.classifier.classify(text)
     
     def classify_contract_type(self, text: str) -> str:
         """Classify contract type based on keywords"""
-        text_lower = text.lower()
-        scores = {}
-        
-        for contract_type, keywords in self.contract_keywords.items():
-            score = 0
-            for keyword in keywords:
-                # Count occurrences of each keyword
-                score += text_lower.count(keyword.lower())
-            scores[contract_type] = score
-        
-        # Return the type with highest score, or 'unknown' if no clear match
-        if max(scores.values()) > 0:
-            return max(scores, key=scores.get)
-        else:
-            return 'unknown'
+        return self.classify_contract(text).contract_type
     
     def extract_contract_data(self, text: str, contract_type: str) -> Dict:
         """Extract specific data based on contract type"""
-        if contract_type == 'financing':
-            return self._extract_financing_data(text)
-        elif contract_type == 'rental':
-            return self._extract_rental_data(text)
-        elif contract_type == 'insurance':
-            return self._extract_insurance_data(text)
-        else:
-            return self._extract_general_data(text)
+        return self.field_extractor.extract(text, contract_type)
     
-    def _extract_financing_data(self, text: str) -> Dict:
-        """Extract data specific to financing contracts"""
-        data = {}
-        
-        # Extract monetary values
-        money_pattern = r'R\$\s*[\d.,]+(?:\.\d{2})?'
-        money_matches = re.findall(money_pattern, text)
-        
-        # Extract percentages (interest rates)
-        percentage_pattern = r'\d+(?:,\d+)?%\s*(?:a\.a\.|ao ano|a\.m\.|ao mês)?'
-        percentage_matches = re.findall(percentage_pattern, text)
-        
-        # Extract number of installments
-        installment_pattern = r'(\d+)\s*(?:parcelas?|prestações?)'
-        installment_matches = re.findall(installment_pattern, text, re.IGNORECASE)
-        
-        # Extract dates
-        date_pattern = r'\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4}'
-        date_matches = re.findall(date_pattern, text)
-        
-        # Extract amortization system
-        amortization_pattern = r'(SAC|PRICE|Tabela Price)'
-        amortization_matches = re.findall(amortization_pattern, text, re.IGNORECASE)
-        
-        # Organize extracted data
-        if money_matches:
-            data['valores_monetarios'] = money_matches
-            # Try to identify specific values
-            for i, value in enumerate(money_matches):
-                if i == 0:
-                    data['valor_financiado'] = value
-                elif i == 1:
-                    data['valor_parcela'] = value
-        
-        if percentage_matches:
-            data['taxas_juros'] = percentage_matches
-        
-        if installment_matches:
-            data['numero_parcelas'] = installment_matches[0] if installment_matches else None
-        
-        if date_matches:
-            data['datas'] = date_matches
-        
-        if amortization_matches:
-            data['sistema_amortizacao'] = amortization_matches[0]
-        
-        return data
-    
-    def _extract_rental_data(self, text: str) -> Dict:
-        """Extract data specific to rental contracts"""
-        data = {}
-        
-        # Extract monetary values
-        money_pattern = r'R\$\s*[\d.,]+(?:\.\d{2})?'
-        money_matches = re.findall(money_pattern, text)
-        
-        # Extract rental period
-        period_pattern = r'(\d+)\s*(?:meses?|anos?)'
-        period_matches = re.findall(period_pattern, text, re.IGNORECASE)
-        
-        # Extract dates
-        date_pattern = r'\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4}'
-        date_matches = re.findall(date_pattern, text)
-        
-        # Extract penalty information
-        penalty_pattern = r'multa.*?(\d+(?:,\d+)?%|R\$\s*[\d.,]+)'
-        penalty_matches = re.findall(penalty_pattern, text, re.IGNORECASE)
-        
-        # Organize extracted data
-        if money_matches:
-            data['valores_monetarios'] = money_matches
-            if len(money_matches) > 0:
-                data['valor_aluguel'] = money_matches[0]
-            if len(money_matches) > 1:
-                data['valor_caucao'] = money_matches[1]
-        
-        if period_matches:
-            data['prazo_locacao'] = period_matches[0] if period_matches else None
-        
-        if date_matches:
-            data['datas'] = date_matches
-        
-        if penalty_matches:
-            data['multa_rescisao'] = penalty_matches[0] if penalty_matches else None
-        
-        return data
-    
-    def _extract_insurance_data(self, text: str) -> Dict:
-        """Extract data specific to insurance contracts"""
-        data = {}
-        
-        # Extract monetary values
-        money_pattern = r'R\$\s*[\d.,]+(?:\.\d{2})?'
-        money_matches = re.findall(money_pattern, text)
-        
-        # Extract coverage information
-        coverage_pattern = r'cobertura.*?(?:até|máximo).*?(R\$\s*[\d.,]+)'
-        coverage_matches = re.findall(coverage_pattern, text, re.IGNORECASE)
-        
-        # Extract deductible information
-        deductible_pattern = r'franquia.*?(R\$\s*[\d.,]+|\d+(?:,\d+)?%)'
-        deductible_matches = re.findall(deductible_pattern, text, re.IGNORECASE)
-        
-        # Organize extracted data
-        if money_matches:
-            data['valores_monetarios'] = money_matches
-            if len(money_matches) > 0:
-                data['premio_seguro'] = money_matches[0]
-        
-        if coverage_matches:
-            data['valor_cobertura'] = coverage_matches[0] if coverage_matches else None
-        
-        if deductible_matches:
-            data['franquia'] = deductible_matches[0] if deductible_matches else None
-        
-        return data
-    
-    def _extract_general_data(self, text: str) -> Dict:
-        """Extract general data from any contract"""
-        data = {}
-        
-        # Extract monetary values
-        money_pattern = r'R\$\s*[\d.,]+(?:\.\d{2})?'
-        money_matches = re.findall(money_pattern, text)
-        
-        # Extract dates
-        date_pattern = r'\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4}'
-        date_matches = re.findall(date_pattern, text)
-        
-        # Extract percentages
-        percentage_pattern = r'\d+(?:,\d+)?%'
-        percentage_matches = re.findall(percentage_pattern, text)
-        
-        # Organize extracted data
-        if money_matches:
-            data['valores_monetarios'] = money_matches
-        
-        if date_matches:
-            data['datas'] = date_matches
-        
-        if percentage_matches:
-            data['percentuais'] = percentage_matches
+    def process_document(self, file_path: str, file_type: str, stats: Optional[Dict] = None) -> Tuple[str, str, Dict]:
+        """Main method to process a document and extract all relevant data.
+        
+        The text is classified and scanned for fields chunk by chunk as it is
+        extracted; classification stops reading once the first chunks settle
+        the contract type. The full text is assembled once at the end.
+        
+        If a `stats` dict is given it is filled with extraction details such as
+        the number of PDF pages read from the text layer and via OCR, sizes, and
+        the seconds spent in each stage under stats['timings'].
+        """
+        if stats is not None:
+            stats['file_size'] = os.path.getsize(file_path)
+        
+        chunks = []
+        tally = self.classifier.tally()
+        scan = self.field_extractor.scanner()
+        classification = None
+        try:
+            chunk_iter = self.iter_text_chunks(file_path, file_type, stats)
+            while True:
+                # Extract text
+                with timed(stats, 'extract_text'):
+                    chunk = next(chunk_iter, None)
+                if chunk is None:
+                    break
+                chunks.append(chunk)
+                
+                # Classify contract type until the answer is settled
+                if classification is None:
+                    with timed(stats, 'classify'):
+                        tally.feed(chunk)
+                        if tally.settled():
+                            classification = tally.result()
+                
+                # Extract specific data
+                with timed(stats, 'extract_fields'):
+                    scan.feed(chunk)
+        except Exception as e:
+            print(f"Error extracting text from {file_path}: {str(e)}")
+            return "", "unknown", {}
         
-        return data
-    
-    def process_document(self, file_path: str, file_type: str) -> Tuple[str, str, Dict]:
-        """Main method to process a document and extract all relevant data"""
-        # Extract text
-        text = self.extract_text_from_file(file_path, file_type)
+        chunk_count = len(chunks)
+        text = "".join(chunks)
+        del chunks
+        if stats is not None:
+            stats['text_chars'] = len(text)
         
-        if not text.strip():
+        if not text or text.isspace():
             return "", "unknown", {}
         
-        # Classify contract type
-        contract_type = self.classify_contract_type(text)
-        
-        # Extract specific data
-        extracted_data = self.extract_contract_data(text, contract_type)
+        if classification is None:
+            with timed(stats, 'classify'):
+                classification = tally.result()
+        contract_type = classification.contract_type
+        if stats is not None:
+            stats['contract_scores'] = classification.scores
+            stats['classification_confidence'] = classification.confidence
+            stats['text_chunks'] = chunk_count
+            stats['classified_after_chunks'] = tally.chunks
+        
+        with timed(stats, 'extract_fields'):
+            extracted_data = self.field_extractor.values(scan.finish(), contract_type)
+        if stats is not None:
+            stats['field_count'] = len(extracted_data)
         
         return text, contract_type, extracted_data
-
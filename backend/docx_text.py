@@ -0,0 +1,164 @@
+import posixpath
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from src.services.text_stream import batched_text
+
+# Transitional and Strict OOXML namespaces
+_NAMESPACES = (
+    'http://schemas.openxmlformats.org/wordprocessingml/2006/main',
+    'http://purl.oclc.org/ooxml/wordprocessingml/main',
+)
+_MARKUP_COMPATIBILITY = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+_RELATIONSHIPS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+
+# Uploaded XML is untrusted: no DTD loading, entity expansion or network access (XXE), and libxml2's
+# size limits stay on
+_PARSER_OPTIONS = {'resolve_entities': False, 'no_network': True, 'load_dtd': False}
+
+
+def _parse(data: bytes):
+    return etree.fromstring(data, etree.XMLParser(**_PARSER_OPTIONS))
+
+
+def _tags(name: str) -> frozenset:
+    return frozenset(f'{{{namespace}}}{name}' for namespace in _NAMESPACES)
+
+
+P, R, T, TAB, PTAB, BR, CR, HYPHEN = (_tags(name) for name in
+                                      ('p', 'r', 't', 'tab', 'ptab', 'br', 'cr', 'noBreakHyphen'))
+TBL, TR, TC = _tags('tbl'), _tags('tr'), _tags('tc')
+_BREAK_TYPE = [f'{{{namespace}}}type' for namespace in _NAMESPACES]
+# Alternate renderings of the same content (e.g. a text box drawn twice); only the first is read
+_FALLBACK = f'{{{_MARKUP_COMPATIBILITY}}}Fallback'
+
+
+def _part_paths(archive: zipfile.ZipFile) -> Tuple[List[str], str, List[str]]:
+    """Paths of the header parts, the main document part and the footer parts"""
+    main = 'word/document.xml'
+    package_rels = _parse(archive.read('_rels/.rels'))
+    for relationship in package_rels.iter(f'{{{_RELATIONSHIPS}}}Relationship'):
+        if relationship.get('Type', '').endswith('/officeDocument'):
+            main = relationship.get('Target').lstrip('/')
+
+    directory, name = posixpath.split(main)
+    rels_path = posixpath.join(directory, '_rels', name + '.rels')
+    parts = {'header': set(), 'footer': set()}
+    if rels_path in archive.namelist():
+        for relationship in _parse(archive.read(rels_path)).iter(f'{{{_RELATIONSHIPS}}}Relationship'):
+            kind = relationship.get('Type', '').rsplit('/', 1)[-1]
+            if kind in parts and relationship.get('TargetMode') != 'External':
+                parts[kind].add(posixpath.normpath(posixpath.join(directory, relationship.get('Target'))))
+
+    def part_number(path):
+        return [int(digits) for digits in re.findall(r'\d+', path)]
+    return sorted(parts['header'], key=part_number), main, sorted(parts['footer'], key=part_number)
+
+
+def _iter_part_lines(stream) -> Iterator[str]:
+    """Lines of one WordprocessingML part: a paragraph, or a table row with tab-separated cells"""
+    paragraphs = []  # text of the open paragraphs; text boxes nest paragraphs inside paragraphs
+    cells = []  # paragraph texts of the open table cells
+    rows = []  # cell texts of the open table rows; tables nest inside cells
+    skip = 0  # depth inside mc:Fallback
+    for event, element in etree.iterparse(stream, events=('start', 'end'), **_PARSER_OPTIONS):
+        tag = element.tag
+        if tag == _FALLBACK:
+            skip += 1 if event == 'start' else -1
+            continue
+        if skip:
+            continue
+
+        if event == 'start':
+            if tag in P:
+                paragraphs.append([])
+            elif tag in TC:
+                cells.append([])
+            elif tag in TR:
+                rows.append([])
+            continue
+
+        if tag in T:
+            if paragraphs and element.text:
+                paragraphs[-1].append(element.text)
+            continue
+        if tag in TAB or tag in PTAB or tag in BR or tag in CR or tag in HYPHEN:
+            # w:tab also defines tab stops in paragraph properties; only runs hold text
+            if paragraphs and element.getparent().tag in R:
+                if tag in BR:
+                    kind = next((element.get(name) for name in _BREAK_TYPE if element.get(name)), None)
+                    # Page and column breaks add no text, as in python-docx
+                    if kind in (None, 'textWrapping'):
+                        paragraphs[-1].append('\n')
+                else:
+                    paragraphs[-1].append('-' if tag in HYPHEN else '\n' if tag in CR else '\t')
+            continue
+
+        if tag in P:
+            text = ''.join(paragraphs.pop())
+            if paragraphs:
+                # Text box: inline in the paragraph that anchors it
+                paragraphs[-1].append(f' {text} ')
+            elif cells:
+                cells[-1].append(text)
+            else:
+                yield text + '\n'
+        elif tag in TC:
+            if rows:
+                rows[-1].append(' '.join(text for text in cells.pop() if text))
+        elif tag in TR:
+            line = '\t'.join(rows.pop())
+            if cells:
+                # Nested table: its rows become paragraphs of the outer cell
+                cells[-1].append(line)
+            else:
+                yield line + '\n'
+        elif tag not in TBL:
+            continue
+
+        # Drop finished content so the tree built by iterparse stays small
+        element.clear()
+        parent = element.getparent()
+        if parent is not None:
+            while element.getprevious() is not None:
+                del parent[0]
+
+
+def iter_docx_lines(file_path: str) -> Iterator[str]:
+    """Text of a DOCX file line by line, streamed from the zip with constant memory.
+
+    Headers come first, then the body, then footers. Each paragraph is a line
+    and each table row is a line of tab-separated cells, in document order.
+    A header or footer repeated word for word (e.g. first and default page
+    headers) is read once.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        names = set(archive.namelist())
+        headers, main, footers = _part_paths(archive)
+        seen = set()
+
+        def small_part(path):
+            with archive.open(path) as stream:
+                text = ''.join(_iter_part_lines(stream))
+            if text.strip() and text not in seen:
+                seen.add(text)
+                return text
+            return None
+
+        for path in headers:
+            if path in names and (text := small_part(path)):
+                yield text
+        with archive.open(main) as stream:
+            yield from _iter_part_lines(stream)
+        for path in footers:
+            if path in names and (text := small_part(path)):
+                yield text
+
+
+def iter_docx_chunks(processor, file_path: str, stats: Optional[Dict] = None) -> Iterator[str]:
+    """Extractor backend: the headers, paragraphs, table rows and footers of a DOCX file, batched"""
+    yield from batched_text(iter_docx_lines(file_path))
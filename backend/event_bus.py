@@ -0,0 +1,113 @@
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class Subscription:
+    """Bounded queue of the events matching one subscriber's filter"""
+
+    def __init__(self, contract_id: Optional[int] = None, batch_id: Optional[str] = None,
+                 max_pending: int = 100):
+        self.contract_id = contract_id
+        self.batch_id = batch_id
+        self.lagged = False
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def matches(self, event: Dict) -> bool:
+        """Whether the event is for this subscriber's contract or batch (or everything)"""
+        if self.contract_id is not None and event.get('id') != self.contract_id:
+            return False
+        if self.batch_id is not None and event.get('batch_id') != self.batch_id:
+            return False
+        return True
+
+    def put(self, event: Dict):
+        """Queue an event without blocking the publisher; a full queue marks the subscriber as lagged"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.lagged = True
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Next event, or None if nothing arrived within `timeout` seconds"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """In-process publish/subscribe for contract status changes.
+
+    Each event gets an increasing id, and the most recent ones are kept so
+    a reconnecting client can resume from the last id it received. Ids start
+    from the clock in milliseconds rather than 1, so an id handed out before
+    a restart (or by another API process) isn't mistaken for a recent one.
+    """
+
+    def __init__(self, history_size: int = 1000, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._history = deque(maxlen=history_size)
+        self._subscriptions = set()
+        self._ids = itertools.count(int(time.time() * 1000))
+        self._newest_id = None
+        self._lock = threading.Lock()
+
+    def publish(self, event: Dict) -> Dict:
+        """Deliver an event to every matching subscriber"""
+        with self._lock:
+            event = dict(event, event_id=next(self._ids))
+            self._newest_id = event['event_id']
+            self._history.append(event)
+            subscriptions = [s for s in self._subscriptions if s.matches(event)]
+        for subscription in subscriptions:
+            subscription.put(event)
+        return event
+
+    def subscribe(self, contract_id: Optional[int] = None, batch_id: Optional[str] = None,
+                  last_event_id: Optional[int] = None) -> Subscription:
+        """Register a subscriber, replaying the kept events newer than last_event_id"""
+        subscription = Subscription(contract_id, batch_id, self.max_pending)
+        with self._lock:
+            if last_event_id is not None:
+                if self._history and self._history[0]['event_id'] > last_event_id + 1:
+                    # Some of the missed events are no longer kept
+                    subscription.lagged = True
+                elif last_event_id > (self._newest_id or 0):
+                    # Not an id this bus handed out: it came from before a restart or from another process
+                    subscription.lagged = True
+                for event in self._history:
+                    if event['event_id'] > last_event_id and subscription.matches(event):
+                        subscription.put(event)
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def recent(self, limit: int = 50) -> List[Dict]:
+        """Most recent events, oldest first"""
+        with self._lock:
+            return list(self._history)[-limit:]
+
+
+event_bus = EventBus()
+
+
+def contract_event(contract) -> Dict:
+    """Status event payload for a contract"""
+    return {
+        'type': 'status',
+        'id': contract.id,
+        'status': contract.status,
+        'contract_type': contract.contract_type,
+        'batch_id': contract.batch_id
+    }
@@ -0,0 +1,75 @@
+import importlib
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple
+
+# processor, file_path, stats -> text chunks in document order
+ExtractorFunction = Callable[..., Iterator[str]]
+
+
+class ExtractorSpec(NamedTuple):
+    """A text extraction backend and the file types it reads.
+
+    `target` is 'module:function'; the module is imported the first time a
+    file of one of the extensions is processed, so the libraries behind a
+    format (PyMuPDF, Pillow, tesseract...) are only loaded by processes
+    that read it.
+    """
+    name: str
+    extensions: FrozenSet[str]
+    target: str
+
+
+class ExtractorRegistry:
+    """Text extraction backends by file extension, imported on first use"""
+
+    def __init__(self):
+        self.specs: Dict[str, ExtractorSpec] = {}
+        self._by_extension: Dict[str, ExtractorSpec] = {}
+        self._loaded: Dict[str, ExtractorFunction] = {}
+
+    def register(self, name: str, extensions: Iterable[str], target: str):
+        """Register a backend, replacing any earlier one for the same name or extensions"""
+        if ':' not in target:
+            raise ValueError(f"Extractor target must be 'module:function', got {target!r}")
+        spec = ExtractorSpec(name, frozenset(extension.lower() for extension in extensions), target)
+        previous = self.specs.get(name)
+        if previous:
+            for extension in previous.extensions:
+                self._by_extension.pop(extension, None)
+        self.specs[name] = spec
+        self._loaded.pop(name, None)
+        for extension in spec.extensions:
+            self._by_extension[extension] = spec
+
+    @property
+    def extensions(self) -> FrozenSet[str]:
+        """Every file extension some backend reads (the uploads that are accepted)"""
+        return frozenset(self._by_extension)
+
+    def get(self, file_type: str) -> ExtractorFunction:
+        """The backend function for a file extension, importing its module if needed"""
+        spec = self._by_extension.get(file_type.lower())
+        if spec is None:
+            raise ValueError(f"Unsupported file type: {file_type}")
+        function = self._loaded.get(spec.name)
+        if function is None:
+            module_name, attribute = spec.target.split(':', 1)
+            function = getattr(importlib.import_module(module_name), attribute)
+            self._loaded[spec.name] = function
+        return function
+
+    def loaded(self) -> List[str]:
+        """Names of the backends imported so far"""
+        return sorted(self._loaded)
+
+
+def register_default_extractors(registry: ExtractorRegistry):
+    """Register the backends for the formats accepted out of the box"""
+    registry.register('pdf', ['pdf'], 'src.services.pdf_text:iter_pdf_chunks')
+    registry.register('docx', ['docx', 'doc'], 'src.services.docx_text:iter_docx_chunks')
+    registry.register('image', ['jpg', 'jpeg', 'png', 'tiff', 'bmp'], 'src.services.ocr_engine:iter_image_chunks')
+    registry.register('txt', ['txt'], 'src.services.text_stream:iter_txt_chunks')
+
+
+# Shared by DocumentProcessor and the upload routes; plugins call register() before the app starts
+extractor_registry = ExtractorRegistry()
+register_default_extractors(extractor_registry)
@@ -0,0 +1,240 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from src.services.text_stream import StreamMatcher
+
+# Regex flags that can be scoped to one alternative of the combined pattern
+_INLINE_FLAGS = {re.IGNORECASE: 'i', re.MULTILINE: 'm', re.DOTALL: 's'}
+
+
+class TokenSpec(NamedTuple):
+    """Something to find in the text, e.g. a money amount or a date.
+
+    A token with a `tail` is an anchor: the tail pattern is matched right
+    after the anchor (e.g. 'multa' followed by the value of the penalty).
+    """
+    name: str
+    pattern: str
+    flags: int = 0
+    tail: Optional[str] = None
+
+
+class FieldSpec(NamedTuple):
+    """An output field built from the matches of one token.
+
+    `group` selects the capture group used as value (of the tail for anchor
+    tokens), and `index` picks a single match instead of the list of all.
+    """
+    key: str
+    token: str
+    group: int = 0
+    index: Optional[int] = None
+
+
+class FieldMatch(NamedTuple):
+    token: str
+    groups: tuple
+    start: int
+    end: int
+
+
+class FieldRegistry:
+    """Declarative token and field specs per contract type"""
+
+    def __init__(self, default_type: str = 'general'):
+        self.default_type = default_type
+        self.tokens: Dict[str, TokenSpec] = {}
+        self.fields: Dict[str, List[FieldSpec]] = {}
+
+    def register_token(self, name: str, pattern: str, flags: int = 0, tail: Optional[str] = None):
+        """Register a token scanned for in every document"""
+        self.tokens[name] = TokenSpec(name, pattern, flags, tail)
+
+    def register_field(self, contract_type: str, key: str, token: str, group: int = 0, index: Optional[int] = None):
+        """Register an output field for a contract type"""
+        if token not in self.tokens:
+            raise ValueError(f"Unknown token: {token}")
+        self.fields.setdefault(contract_type, []).append(FieldSpec(key, token, group, index))
+
+    def compile(self) -> 'FieldExtractor':
+        """Compile all registered specs into an extractor"""
+        return FieldExtractor(self)
+
+
+class FieldExtractor:
+    """Finds every registered token in one pass over the text.
+
+    Token matches never overlap: where two tokens could match overlapping
+    text, only the match that starts first is kept (at the same position,
+    the token registered first). Searching each pattern on its own, as
+    before, also found the later one. So a number that is part of an earlier
+    match no longer becomes a field of its own: 'R$ 1.500,00 meses' has no
+    prazo_locacao ('00' before), '10/12/2024 parcelas' no numero_parcelas,
+    and the '2%' of 'R$ 2%' or the date of 'R$ 10/12/2024' is taken by
+    the money token.
+    """
+
+    def __init__(self, registry: FieldRegistry):
+        self.default_type = registry.default_type
+        self.fields = {contract_type: list(specs) for contract_type, specs in registry.fields.items()}
+
+        # One alternation with a named group per token
+        alternatives = []
+        for spec in registry.tokens.values():
+            inline = ''.join(letter for flag, letter in _INLINE_FLAGS.items() if spec.flags & flag)
+            body = f'(?{inline}:{spec.pattern})' if inline else f'(?:{spec.pattern})'
+            alternatives.append(f'(?P<{spec.name}>{body})')
+        self._pattern = re.compile('|'.join(alternatives))
+
+        # Position of each token's own capture groups inside the combined pattern
+        self._group_spans = {}
+        for spec in registry.tokens.values():
+            first = self._pattern.groupindex[spec.name]
+            self._group_spans[spec.name] = (first, first + re.compile(spec.pattern).groups)
+
+        self._tails = {
+            spec.name: re.compile(spec.tail, spec.flags)
+            for spec in registry.tokens.values() if spec.tail
+        }
+
+    def _field_match(self, match: re.Match, offset: int) -> FieldMatch:
+        name = match.lastgroup
+        first, last = self._group_spans[name]
+        groups = match.group(*range(first, last + 1)) if last > first else (match.group(first),)
+        return FieldMatch(name, groups, match.start() + offset, match.end() + offset)
+
+    def scan(self, text: str, offset: int = 0) -> List[FieldMatch]:
+        """Return every token match in text order, with offsets shifted by `offset`"""
+        return [self._field_match(match, offset) for match in self._pattern.finditer(text)]
+
+    def scanner(self) -> 'FieldScan':
+        """Start scanning text fed in chunks"""
+        return FieldScan(self)
+
+    def build_fields(self, scan: 'FieldScan', contract_type: str) -> Dict[str, List[FieldMatch]]:
+        """Group scanned matches by the fields registered for a contract type"""
+        specs = self.fields.get(contract_type) or self.fields[self.default_type]
+        by_token = {}
+        for match in scan.matches:
+            by_token.setdefault(match.token, []).append(match)
+
+        fields = {}
+        for spec in specs:
+            token_matches = scan.resolved[spec.token] if spec.token in self._tails else by_token.get(spec.token, [])
+            if spec.index is None:
+                selected = token_matches
+            elif len(token_matches) > spec.index:
+                selected = [token_matches[spec.index]]
+            else:
+                selected = []
+            if selected:
+                fields[spec.key] = [match._replace(groups=(match.groups[spec.group],)) for match in selected]
+        return fields
+
+    def values(self, scan: 'FieldScan', contract_type: str) -> Dict:
+        """The fields of a contract type as plain values"""
+        fields = self.build_fields(scan, contract_type)
+        data = {}
+        for spec in self.fields.get(contract_type) or self.fields[self.default_type]:
+            if spec.key in fields:
+                values = [match.groups[0] for match in fields[spec.key]]
+                data[spec.key] = values if spec.index is None else values[0]
+        return data
+
+    def extract(self, text: str, contract_type: str) -> Dict:
+        """Extract the fields of a contract type as plain values"""
+        scan = self.scanner()
+        scan.feed(text)
+        return self.values(scan.finish(), contract_type)
+
+
+class FieldScan:
+    """Token matches of a document fed chunk by chunk.
+
+    Anchor tails are matched as soon as the anchor's line is complete, so the
+    text of earlier chunks does not need to be kept.
+    """
+
+    def __init__(self, extractor: FieldExtractor):
+        self.extractor = extractor
+        self.matches: List[FieldMatch] = []
+        # Anchor tokens with their tail matched, skipping anchors inside a previous match
+        self.resolved: Dict[str, List[FieldMatch]] = {token: [] for token in extractor._tails}
+        self._resolved_until = {token: 0 for token in extractor._tails}
+        self._matcher = StreamMatcher(extractor._pattern)
+
+    def _add(self, settled):
+        for match, offset in settled:
+            field_match = self.extractor._field_match(match, offset)
+            self.matches.append(field_match)
+            tail = self.extractor._tails.get(field_match.token)
+            if tail is None or field_match.start < self._resolved_until[field_match.token]:
+                continue
+            # The tail can't cross a line break, and the anchor's line is complete in match.string
+            tail_match = tail.match(match.string, match.end())
+            if tail_match:
+                end = tail_match.end() + offset
+                self.resolved[field_match.token].append(FieldMatch(
+                    field_match.token, (tail_match.group(0),) + tail_match.groups(), field_match.start, end
+                ))
+                self._resolved_until[field_match.token] = end
+
+    def feed(self, chunk: str):
+        """Scan the next chunk"""
+        self._add(self._matcher.feed(chunk))
+
+    def finish(self) -> 'FieldScan':
+        """Scan what is left after the last chunk"""
+        self._add(self._matcher.finish())
+        return self
+
+
+def register_default_fields(registry: FieldRegistry):
+    """Register the tokens and fields extracted from Brazilian contracts"""
+    money = r'R\$\s*[\d.,]+(?:\.\d{2})?'
+
+    registry.register_token('money', money)
+    registry.register_token('date', r'\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4}')
+    registry.register_token('percentage', r'(\d+(?:,\d+)?%)\s*(?:a\.a\.|ao ano|a\.m\.|ao mês)?')
+    registry.register_token('installments', r'(\d+)\s*(?:parcelas?|prestações?)', re.IGNORECASE)
+    registry.register_token('period', r'(\d+)\s*(?:meses?|anos?)', re.IGNORECASE)
+    registry.register_token('amortization', r'\b(SAC|PRICE|Tabela Price)\b', re.IGNORECASE)
+    registry.register_token('penalty', r'multa', re.IGNORECASE,
+                            tail=r'.*?(\d+(?:,\d+)?%|R\$\s*[\d.,]+)')
+    registry.register_token('coverage', r'cobertura', re.IGNORECASE,
+                            tail=r'.*?(?:até|máximo).*?(R\$\s*[\d.,]+)')
+    registry.register_token('deductible', r'franquia', re.IGNORECASE,
+                            tail=r'.*?(R\$\s*[\d.,]+|\d+(?:,\d+)?%)')
+
+    # Financing
+    registry.register_field('financing', 'valores_monetarios', 'money')
+    registry.register_field('financing', 'valor_financiado', 'money', index=0)
+    registry.register_field('financing', 'valor_parcela', 'money', index=1)
+    registry.register_field('financing', 'taxas_juros', 'percentage')
+    registry.register_field('financing', 'numero_parcelas', 'installments', group=1, index=0)
+    registry.register_field('financing', 'datas', 'date')
+    registry.register_field('financing', 'sistema_amortizacao', 'amortization', group=1, index=0)
+
+    # Rental
+    registry.register_field('rental', 'valores_monetarios', 'money')
+    registry.register_field('rental', 'valor_aluguel', 'money', index=0)
+    registry.register_field('rental', 'valor_caucao', 'money', index=1)
+    registry.register_field('rental', 'prazo_locacao', 'period', group=1, index=0)
+    registry.register_field('rental', 'datas', 'date')
+    registry.register_field('rental', 'multa_rescisao', 'penalty', group=1, index=0)
+
+    # Insurance
+    registry.register_field('insurance', 'valores_monetarios', 'money')
+    registry.register_field('insurance', 'premio_seguro', 'money', index=0)
+    registry.register_field('insurance', 'valor_cobertura', 'coverage', group=1, index=0)
+    registry.register_field('insurance', 'franquia', 'deductible', group=1, index=0)
+
+    # Any other contract type
+    registry.register_field('general', 'valores_monetarios', 'money')
+    registry.register_field('general', 'datas', 'date')
+    registry.register_field('general', 'percentuais', 'percentage', group=1)
+
+
+# Default specs, compiled once by DocumentProcessor
+field_registry = FieldRegistry()
+register_default_fields(field_registry)
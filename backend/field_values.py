@@ -0,0 +1,196 @@
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+from sqlalchemy import Integer, case, cast, func, select
+
+from src.models.user import db
+from src.models.contract import Contract, ContractField
+
+_MONEY = re.compile(r'R\$\s*([\d.,]+)')
+_RATE = re.compile(r'(\d+(?:,\d+)?)%\s*(a\.a\.|ao ano|a\.m\.|ao mês)?', re.IGNORECASE)
+_DATE = re.compile(r'(\d{1,2})[/\-](\d{1,2})[/\-](\d{4})')
+_INTEGER = re.compile(r'\d+')
+
+# Rate suffix -> period the rate refers to
+_RATE_PERIODS = {'a.a.': 'year', 'ao ano': 'year', 'a.m.': 'month', 'ao mês': 'month'}
+
+
+def parse_brl_amount(raw: str) -> Optional[Decimal]:
+    """Parse a Brazilian amount such as 'R$ 1.234,56' (also '1234,56' or '1.234')"""
+    match = _MONEY.search(raw)
+    digits = (match.group(1) if match else raw).strip().rstrip('.,')
+    if not digits:
+        return None
+    if ',' in digits:
+        # Dots group thousands, the comma starts the cents
+        digits = digits.replace('.', '').replace(',', '.')
+    elif digits.count('.') == 1 and len(digits.split('.')[1]) != 3:
+        # A single dot not followed by three digits is a decimal point
+        pass
+    else:
+        digits = digits.replace('.', '')
+    try:
+        return Decimal(digits)
+    except InvalidOperation:
+        return None
+
+
+def parse_rate(raw: str):
+    """Parse a rate such as '2,5% a.m.', returning (percent, period) with period 'month', 'year' or None"""
+    match = _RATE.search(raw)
+    if not match:
+        return None, None
+    suffix = match.group(2)
+    return Decimal(match.group(1).replace(',', '.')), _RATE_PERIODS.get(suffix.lower()) if suffix else None
+
+
+def monthly_and_annual(percent: Decimal, period: Optional[str]):
+    """Equivalent compound (monthly, annual) rates in percent; (None, None) if the period is unknown"""
+    rate = float(percent) / 100
+    if period == 'month':
+        return float(percent), ((1 + rate) ** 12 - 1) * 100
+    if period == 'year':
+        return ((1 + rate) ** (1 / 12) - 1) * 100, float(percent)
+    return None, None
+
+
+def parse_br_date(raw: str) -> Optional[date]:
+    """Parse a day-first date such as '05/03/2024'; None if it is not a real date"""
+    match = _DATE.search(raw)
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def normalize_value(raw: str) -> Dict:
+    """Typed columns of one extracted value, by its shape: money, rate, date, number or text"""
+    # Every column is present so rows can be inserted together with executemany
+    values = {'kind': 'text', 'number': None, 'rate_monthly': None, 'rate_annual': None, 'date_value': None}
+    if 'R$' in raw:
+        amount = parse_brl_amount(raw)
+        if amount is not None:
+            values.update(kind='money', number=amount)
+    elif '%' in raw:
+        percent, period = parse_rate(raw)
+        if percent is not None:
+            monthly, annual = monthly_and_annual(percent, period)
+            values.update(kind='rate', number=percent, rate_monthly=monthly, rate_annual=annual)
+    elif _DATE.fullmatch(raw.strip()):
+        parsed = parse_br_date(raw)
+        if parsed:
+            values.update(kind='date', date_value=parsed)
+    elif _INTEGER.fullmatch(raw.strip()):
+        values.update(kind='number', number=Decimal(raw.strip()))
+    return values
+
+
+def field_rows(data: Dict, contract_id: Optional[int] = None) -> List[Dict]:
+    """One row per extracted value (list fields give one row per element), for contract_fields"""
+    rows = []
+    for key, value in data.items():
+        for position, raw in enumerate(value if isinstance(value, list) else [value]):
+            if not isinstance(raw, str):
+                raw = str(raw)
+            row = {'key': key, 'position': position, 'raw': raw[:255], **normalize_value(raw)}
+            if contract_id is not None:
+                row['contract_id'] = contract_id
+            rows.append(row)
+    return rows
+
+
+def set_contract_fields(contract, data: Dict):
+    """Replace the typed field rows of a contract with those of `data`"""
+    contract.fields = [ContractField(**row) for row in field_rows(data)]
+
+
+# Columns /contracts/fields/aggregate can aggregate, and what it can group by
+AGGREGATE_MEASURES = {
+    'number': ContractField.number,
+    'rate_monthly': ContractField.rate_monthly,
+    'rate_annual': ContractField.rate_annual,
+}
+AGGREGATE_GROUPS = ('contract_type', 'status', 'month')
+MAX_HISTOGRAM_BINS = 100
+
+
+def _number(value):
+    return float(value) if value is not None else None
+
+
+def month_of(column):
+    """'YYYY-MM' of a datetime column, in the SQL dialect in use"""
+    if db.engine.dialect.name == 'sqlite':
+        return func.strftime('%Y-%m', column)
+    return func.to_char(column, 'YYYY-MM')
+
+
+def field_values_query(key: str, measure: str):
+    """Select over the values of one field joined to their contracts, to be filtered and aggregated"""
+    value = AGGREGATE_MEASURES[measure]
+    return select(value).select_from(ContractField) \
+        .join(Contract, Contract.id == ContractField.contract_id) \
+        .where(ContractField.key == key, value.is_not(None))
+
+
+def aggregate_field(statement, measure: str, group_by: Optional[str] = None) -> List[Dict]:
+    """count, sum, avg, min and max of a field in SQL, overall or per group"""
+    value = AGGREGATE_MEASURES[measure]
+    columns = [
+        func.count(value).label('count'),
+        func.count(func.distinct(ContractField.contract_id)).label('contracts'),
+        func.sum(value).label('sum'),
+        func.avg(value).label('avg'),
+        func.min(value).label('min'),
+        func.max(value).label('max'),
+    ]
+    if group_by:
+        group = month_of(Contract.created_at) if group_by == 'month' else getattr(Contract, group_by)
+        statement = statement.with_only_columns(group.label('group'), *columns).group_by(group).order_by(group)
+    else:
+        statement = statement.with_only_columns(*columns)
+
+    return [
+        {
+            **({'group': row.group} if group_by else {}),
+            'count': row.count,
+            'contracts': row.contracts,
+            'sum': _number(row.sum),
+            'avg': _number(row.avg),
+            'min': _number(row.min),
+            'max': _number(row.max),
+        }
+        for row in db.session.execute(statement)
+    ]
+
+
+def field_histogram(statement, measure: str, bins: int) -> List[Dict]:
+    """Counts of a field's values in `bins` equal-width bins between its min and max, computed in SQL.
+
+    When every value is the same there is a single bin, [value, value].
+    """
+    value = AGGREGATE_MEASURES[measure]
+    low, high, total = db.session.execute(
+        statement.with_only_columns(func.min(value), func.max(value), func.count(value))
+    ).one()
+    if low is None:
+        return []
+    low, high = float(low), float(high)
+    if low == high:
+        return [{'lower': low, 'upper': high, 'count': total}]
+    width = (high - low) / bins
+
+    # The maximum falls in the last bin rather than one past it
+    bucket = case((value >= high, bins - 1), else_=cast((value - low) / width, Integer))
+    counts = dict(db.session.execute(
+        statement.with_only_columns(bucket.label('bucket'), func.count()).group_by(bucket)
+    ).all())
+    return [
+        {'lower': low + index * width, 'upper': low + (index + 1) * width, 'count': counts.get(index, 0)}
+        for index in range(bins)
+    ]
@@ -0,0 +1,89 @@
+import os
+from typing import Dict, NamedTuple, Optional, Union
+
+# Rough processing seconds by format, from benchmarks/bench_processor.py runs; only their ratios matter much
+BASE_SECONDS = 0.01
+TEXT_SECONDS_PER_MB = {'txt': 0.3, 'docx': 0.6, 'doc': 0.6}
+DEFAULT_SECONDS_PER_MB = 1.0
+PDF_TEXT_SECONDS_PER_PAGE = 0.006
+OCR_SECONDS_PER_PAGE = 2.0
+IMAGE_TYPES = {'jpg', 'jpeg', 'png', 'tiff', 'bmp'}
+
+# Lanes have their own worker limits, so OCR jobs can't hold up quick ones
+FAST_LANE = 'fast'
+HEAVY_LANE = 'heavy'
+LANES = (FAST_LANE, HEAVY_LANE)
+
+# Jobs estimated above this go to the heavy lane even without OCR
+FAST_LANE_MAX_SECONDS = 5.0
+
+# PDF pages whose text layer is sampled to guess how many pages need OCR
+PDF_SAMPLE_PAGES = 3
+
+
+class JobEstimate(NamedTuple):
+    """Expected cost of processing a file, and the lane its job runs in"""
+    lane: str
+    cost: float  # estimated seconds
+    pages: Optional[int] = None
+    ocr_pages: int = 0
+
+
+def _pdf_pages(file_path: str, min_page_text_chars: int):
+    """(page count, estimated pages without a text layer), reading only a few evenly spaced pages"""
+    import fitz  # PyMuPDF; imported here so API processes load it only when a PDF arrives
+
+    with fitz.open(file_path) as doc:
+        pages = doc.page_count
+        if not pages:
+            return 0, 0
+        step = max(1, pages // PDF_SAMPLE_PAGES)
+        sample = list(range(0, pages, step))[:PDF_SAMPLE_PAGES]
+        scanned = sum(1 for index in sample if len(doc[index].get_text().strip()) < min_page_text_chars)
+    return pages, round(pages * scanned / len(sample))
+
+
+def estimate_job(file_path: str, file_type: str, file_size: Optional[int] = None,
+                 min_page_text_chars: int = 20) -> JobEstimate:
+    """Estimate the processing cost of a file from its type, size and (PDF) page count"""
+    file_type = file_type.lower()
+    if file_size is None:
+        file_size = os.path.getsize(file_path)
+    megabytes = file_size / 1e6
+
+    pages, ocr_pages = None, 0
+    if file_type == 'pdf':
+        try:
+            pages, ocr_pages = _pdf_pages(file_path, min_page_text_chars)
+            cost = BASE_SECONDS + (pages - ocr_pages) * PDF_TEXT_SECONDS_PER_PAGE + ocr_pages * OCR_SECONDS_PER_PAGE
+        except Exception as e:
+            # Unreadable here too; processing will fail fast on it
+            print(f"Error estimating the cost of {file_path}: {str(e)}")
+            cost = BASE_SECONDS
+    elif file_type in IMAGE_TYPES:
+        pages, ocr_pages = 1, 1
+        cost = BASE_SECONDS + OCR_SECONDS_PER_PAGE
+    else:
+        cost = BASE_SECONDS + megabytes * TEXT_SECONDS_PER_MB.get(file_type, DEFAULT_SECONDS_PER_MB)
+
+    lane = HEAVY_LANE if ocr_pages or cost > FAST_LANE_MAX_SECONDS else FAST_LANE
+    return JobEstimate(lane, cost, pages, ocr_pages)
+
+
+def parse_lane_limits(value: Union[str, Dict[str, int], None]) -> Dict[str, int]:
+    """Lane limits from a dict or a setting such as 'fast=3,heavy=1'"""
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {lane: int(limit) for lane, limit in value.items()}
+    limits = {}
+    for item in value.split(','):
+        lane, _, limit = item.partition('=')
+        limits[lane.strip()] = int(limit)
+    return limits
+
+
+def default_lane_limits(workers: int) -> Dict[str, int]:
+    """Jobs each lane may run at once on `workers` threads; with two or more, neither lane can take them all"""
+    heavy = max(1, workers // 2)
+    return {FAST_LANE: max(1, workers - 1), HEAVY_LANE: heavy}
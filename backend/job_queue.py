@@ -0,0 +1,513 @@
+import os
+import random
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import case, func, insert, select, tuple_, update
+
+from src.models.user import db
+from src.models.contract import Contract, ProcessingJob
+from src.services.contract_processing import apply_processing, doc_processor, processing_finished
+# Registers the counters flush listener, so jobs completed outside the API process keep the stats right
+import src.services.contract_stats  # noqa: F401
+from src.services.event_bus import contract_event, event_bus
+from src.services.job_cost import FAST_LANE, LANES, JobEstimate, estimate_job
+from src.services.metrics import job_wait_seconds, record_processing, timed
+
+# Jobs that still hold their contract in 'processing'
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+# ContractStatusWatcher re-reads this much before the newest update it has seen. updated_at comes
+# from the worker's clock at flush time, so a result can commit after a newer one, or come from a
+# host whose clock is behind; such rows are still picked up unless they are later than this
+STATUS_WATCH_OVERLAP = timedelta(minutes=5)
+
+
+class ClaimedJob(NamedTuple):
+    id: int
+    contract_id: int
+    attempts: int
+    max_attempts: int
+    lane: str
+    cost: Optional[float]
+    owner: str
+
+
+class JobQueue:
+    """Processing jobs kept in the processing_jobs table.
+
+    A worker claims a job by taking a lease on it, renews the lease while it
+    works, and marks the job done in the same transaction as the results. A
+    failed job is retried with exponential backoff until max_attempts; a job
+    whose lease expires (the worker died) is picked up again by reclaim_expired().
+
+    Jobs run in lanes (see job_cost): each process runs at most lane_limits[lane]
+    jobs of a lane at once, so OCR jobs can't take every worker. Due jobs are
+    claimed in rank_at order: available_at delayed by aging_factor times the
+    estimated cost. Short jobs go first, but a long job is only passed over by
+    jobs that became due less than cost * aging_factor seconds after it.
+    """
+
+    def __init__(self, max_attempts: int = 3, lease_seconds: int = 300,
+                 backoff_seconds: int = 30, max_backoff_seconds: int = 3600,
+                 aging_factor: float = 2.0, lane_limits: Optional[Dict[str, int]] = None):
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.aging_factor = aging_factor
+        # Lanes missing here are unlimited
+        self.lane_limits = dict(lane_limits or {})
+
+        # Jobs of each lane running in this process, and their waits: lane -> [count, total seconds, max]
+        self._lane_running = {lane: 0 for lane in LANES}
+        self._lane_waits = {lane: [0, 0.0, 0.0] for lane in LANES}
+        # Reentrant: claim() records the wait while claim_next() holds it
+        self._lane_lock = threading.RLock()
+
+    def configure(self, max_attempts: int = None, lease_seconds: int = None, backoff_seconds: int = None,
+                  aging_factor: float = None, lane_limits: Dict[str, int] = None):
+        """Update settings from the app config"""
+        if max_attempts:
+            self.max_attempts = max_attempts
+        if lease_seconds:
+            self.lease_seconds = lease_seconds
+        if backoff_seconds:
+            self.backoff_seconds = backoff_seconds
+        if aging_factor is not None:
+            self.aging_factor = aging_factor
+        if lane_limits:
+            self.lane_limits = dict(lane_limits)
+
+    def rank_at(self, available_at: datetime, cost: Optional[float]) -> datetime:
+        """Claim rank of a job due at available_at: later for costlier jobs"""
+        return available_at + timedelta(seconds=(cost or 0.0) * self.aging_factor)
+
+    def enqueue(self, contract_ids: List[int], estimates: Optional[List[JobEstimate]] = None):
+        """Queue a job per contract in the current transaction; the caller commits.
+
+        `estimates` (see job_cost.estimate_job) gives each job its lane and
+        cost; without them the jobs go to the fast lane in arrival order.
+        """
+        if not contract_ids:
+            return
+        now = datetime.utcnow()
+        rows = []
+        for index, contract_id in enumerate(contract_ids):
+            estimate = estimates[index] if estimates else JobEstimate(FAST_LANE, None)
+            rows.append({
+                'contract_id': contract_id,
+                'max_attempts': self.max_attempts,
+                'available_at': now,
+                'lane': estimate.lane,
+                'cost': estimate.cost,
+                'rank_at': self.rank_at(now, estimate.cost)
+            })
+        db.session.execute(insert(ProcessingJob), rows)
+
+    def pending_count(self, due_only: bool = False) -> int:
+        """Jobs waiting to be claimed; with due_only, those not held back by a retry backoff"""
+        query = db.session.query(func.count(ProcessingJob.id)).filter(ProcessingJob.status == 'queued')
+        if due_only:
+            query = query.filter(ProcessingJob.available_at <= datetime.utcnow())
+        return query.scalar()
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        return dict(
+            db.session.query(ProcessingJob.status, func.count(ProcessingJob.id))
+            .group_by(ProcessingJob.status).all()
+        )
+
+    def lane_stats(self) -> Dict[str, Dict]:
+        """Per lane: queued and running jobs (all processes), the longest current wait of a due
+        job, and this process's limit, running jobs and waits of the jobs it claimed"""
+        now = datetime.utcnow()
+        due_since = case((ProcessingJob.available_at <= now, ProcessingJob.available_at))
+        rows = db.session.query(
+            ProcessingJob.lane, ProcessingJob.status, func.count(ProcessingJob.id), func.min(due_since)
+        ).filter(ProcessingJob.status.in_(ACTIVE_JOB_STATUSES)).group_by(ProcessingJob.lane, ProcessingJob.status)
+
+        stats = {}
+        with self._lane_lock:
+            for lane in LANES:
+                count, total, longest = self._lane_waits[lane]
+                stats[lane] = {
+                    'queued': 0,
+                    'running': 0,
+                    'oldest_wait_seconds': 0.0,
+                    'limit': self.lane_limits.get(lane),
+                    'running_here': self._lane_running[lane],
+                    'claimed_here': count,
+                    'avg_wait_seconds': total / count if count else 0.0,
+                    'max_wait_seconds': longest
+                }
+        for lane, status, count, oldest_due in rows:
+            lane_stats = stats.setdefault(lane, {'queued': 0, 'running': 0, 'oldest_wait_seconds': 0.0})
+            lane_stats[status] = count
+            if status == 'queued' and oldest_due:
+                lane_stats['oldest_wait_seconds'] = (now - oldest_due).total_seconds()
+        return stats
+
+    def claim_next(self, owner: str) -> Optional[ClaimedJob]:
+        """Claim the best due job among the lanes with a free slot in this process.
+
+        The job holds its lane slot until release_lane() is called.
+        """
+        with self._lane_lock:
+            lanes = [
+                lane for lane in LANES
+                if lane not in self.lane_limits or self._lane_running[lane] < self.lane_limits[lane]
+            ]
+            if not lanes:
+                return None
+            # Lanes with no limit also take jobs of lanes this process doesn't know
+            limited = [lane for lane in LANES if lane not in lanes]
+            job = self.claim(owner, exclude_lanes=limited)
+            if job:
+                self._lane_running[job.lane] = self._lane_running.get(job.lane, 0) + 1
+            return job
+
+    def release_lane(self, lane: str):
+        """Free the lane slot of a job claimed with claim_next()"""
+        with self._lane_lock:
+            self._lane_running[lane] -= 1
+
+    def claim(self, owner: str, exclude_lanes: Optional[List[str]] = None) -> Optional[ClaimedJob]:
+        """Lease the due job with the lowest rank to `owner`, or return None if there is none"""
+        now = datetime.utcnow()
+        query = select(ProcessingJob.id) \
+            .where(ProcessingJob.status == 'queued', ProcessingJob.available_at <= now)
+        if exclude_lanes:
+            query = query.where(ProcessingJob.lane.not_in(exclude_lanes))
+        candidate = query \
+            .order_by(ProcessingJob.rank_at, ProcessingJob.id) \
+            .limit(1) \
+            .with_for_update(skip_locked=True) \
+            .scalar_subquery()
+        # A single UPDATE, so two workers can never take the same job
+        row = db.session.execute(
+            update(ProcessingJob)
+            .where(ProcessingJob.id == candidate, ProcessingJob.status == 'queued')
+            .values(
+                status='running',
+                lease_owner=owner,
+                lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                attempts=ProcessingJob.attempts + 1
+            )
+            .returning(
+                ProcessingJob.id, ProcessingJob.contract_id, ProcessingJob.attempts, ProcessingJob.max_attempts,
+                ProcessingJob.lane, ProcessingJob.cost, ProcessingJob.available_at
+            )
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.session.commit()
+        if not row:
+            return None
+
+        *fields, available_at = row
+        job = ClaimedJob(*fields, owner)
+        wait = max((now - available_at).total_seconds(), 0.0)
+        job_wait_seconds.observe(wait, lane=job.lane)
+        with self._lane_lock:
+            waits = self._lane_waits.setdefault(job.lane, [0, 0.0, 0.0])
+            waits[0] += 1
+            waits[1] += wait
+            waits[2] = max(waits[2], wait)
+        return job
+
+    def _update_held(self, job: ClaimedJob, **values) -> bool:
+        """Update a job only while `job.owner` still holds its lease"""
+        result = db.session.execute(
+            update(ProcessingJob)
+            .where(
+                ProcessingJob.id == job.id,
+                ProcessingJob.status == 'running',
+                ProcessingJob.lease_owner == job.owner
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def heartbeat(self, job: ClaimedJob) -> bool:
+        """Extend the lease; False if the job was taken over by someone else"""
+        renewed = self._update_held(job, lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+        db.session.commit()
+        return renewed
+
+    def complete(self, job: ClaimedJob) -> bool:
+        """Mark the job done in the current transaction; False if the lease was lost"""
+        return self._update_held(job, status='done', lease_owner=None, lease_expires_at=None)
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds to wait before the next attempt, doubling each time, with jitter"""
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** max(attempts - 1, 0))
+        return delay * random.uniform(0.9, 1.1)
+
+    def fail(self, job: ClaimedJob, error: str) -> Optional[bool]:
+        """Schedule a retry, or fail the job and its contract after the last attempt.
+
+        Returns True if the job will be retried, False if it failed for good and
+        None if the lease had already been lost.
+        """
+        retry = job.attempts < job.max_attempts
+        values = {'lease_owner': None, 'lease_expires_at': None, 'last_error': error[:2000]}
+        if retry:
+            available_at = datetime.utcnow() + timedelta(seconds=self.backoff(job.attempts))
+            values.update(status='queued', available_at=available_at, rank_at=self.rank_at(available_at, job.cost))
+        else:
+            values['status'] = 'failed'
+
+        if not self._update_held(job, **values):
+            db.session.rollback()
+            return None
+        failed = [] if retry else self._fail_contracts([job.contract_id])
+        db.session.commit()
+        self._announce(failed)
+        return retry
+
+    def _fail_contracts(self, contract_ids: List[int]) -> List[Contract]:
+        """Set contracts still processing to 'error', through the ORM so the stats counters follow"""
+        contracts = Contract.query.filter(Contract.id.in_(contract_ids), Contract.status == 'processing').all()
+        for contract in contracts:
+            contract.status = 'error'
+        return contracts
+
+    def _announce(self, contracts: List[Contract]):
+        for contract in contracts:
+            event_bus.publish(contract_event(contract))
+
+    def reclaim_expired(self, all_running: bool = False) -> Tuple[int, int]:
+        """Requeue running jobs whose lease has expired, failing those out of attempts.
+
+        With all_running=True every running job is reclaimed; only safe when no
+        other worker can be alive, e.g. when the embedded workers start.
+        Returns (requeued, failed).
+        """
+        now = datetime.utcnow()
+        query = ProcessingJob.query.filter(ProcessingJob.status == 'running')
+        if not all_running:
+            query = query.filter(ProcessingJob.lease_expires_at < now)
+
+        requeued, failed_ids = 0, []
+        for job in query.all():
+            job.lease_owner = None
+            job.lease_expires_at = None
+            if job.attempts < job.max_attempts:
+                job.status = 'queued'
+                job.available_at = now
+                job.rank_at = self.rank_at(now, job.cost)
+                requeued += 1
+            else:
+                job.status = 'failed'
+                job.last_error = 'Lease expired on the last attempt'
+                failed_ids.append(job.contract_id)
+        failed = self._fail_contracts(failed_ids) if failed_ids else []
+        db.session.commit()
+        self._announce(failed)
+        return requeued, len(failed_ids)
+
+    def recover_stuck_contracts(self) -> int:
+        """Queue a job for each contract left 'processing' without an active job"""
+        active = select(ProcessingJob.contract_id).where(ProcessingJob.status.in_(ACTIVE_JOB_STATUSES))
+        contracts = db.session.execute(
+            select(Contract.id, Contract.file_path, Contract.file_type, Contract.file_size)
+            .where(Contract.status == 'processing', Contract.id.not_in(active))
+        ).all()
+        self.enqueue(
+            [contract.id for contract in contracts],
+            [estimate_job(contract.file_path, contract.file_type, contract.file_size) for contract in contracts]
+        )
+        db.session.commit()
+        return len(contracts)
+
+
+job_queue = JobQueue()
+
+
+class JobWorker:
+    """Claims jobs from a JobQueue and processes their contracts"""
+
+    def __init__(self, app, queue: JobQueue = job_queue, name: str = None,
+                 poll_interval: float = 2.0, reclaim_interval: float = 60.0, processor=doc_processor):
+        self.app = app
+        self.queue = queue
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.poll_interval = poll_interval
+        self.reclaim_interval = reclaim_interval
+        self.processor = processor
+        self._next_reclaim = 0.0
+
+    def _owner(self) -> str:
+        """Lease owner for the calling thread"""
+        return f'{self.name}:{threading.current_thread().name}'
+
+    def _keep_lease(self, job: ClaimedJob, stop: threading.Event):
+        """Renew the lease until the job ends (runs in its own thread)"""
+        with self.app.app_context():
+            while not stop.wait(self.queue.lease_seconds / 3):
+                try:
+                    if not self.queue.heartbeat(job):
+                        return
+                except Exception as e:
+                    print(f"Error renewing lease of job {job.id}: {str(e)}")
+                    db.session.rollback()
+
+    def run_job(self, job: ClaimedJob):
+        """Process the job's contract and record the outcome (inside an app context)"""
+        stats = {}
+        file_type = 'unknown'
+        stop = threading.Event()
+        threading.Thread(target=self._keep_lease, args=(job, stop), daemon=True).start()
+        try:
+            contract = db.session.get(Contract, job.contract_id)
+            if contract is None:
+                self.queue.complete(job)
+                db.session.commit()
+                return
+            file_type = contract.file_type
+
+            apply_processing(contract, stats, self.processor)
+            if not self.queue.complete(job):
+                # The lease expired and the job went to another worker; drop our result
+                print(f"Lost the lease on job {job.id}, discarding the result")
+                db.session.rollback()
+                return
+            with timed(stats, 'db_commit'):
+                db.session.commit()
+            processing_finished(contract, stats)
+
+        except Exception as e:
+            print(f"Error processing contract {job.contract_id}: {str(e)}")
+            db.session.rollback()
+            retried = self.queue.fail(job, str(e))
+            record_processing(stats, file_type, 'retry' if retried else 'error', None)
+        finally:
+            stop.set()
+
+    def run_once(self) -> bool:
+        """Claim and run one job; False when no job is due in a lane with a free slot"""
+        with self.app.app_context():
+            try:
+                now = datetime.utcnow().timestamp()
+                if now >= self._next_reclaim:
+                    self._next_reclaim = now + self.reclaim_interval
+                    self.queue.reclaim_expired()
+                job = self.queue.claim_next(self._owner())
+            except Exception as e:
+                print(f"Error claiming a processing job: {str(e)}")
+                db.session.rollback()
+                return False
+            if job is None:
+                return False
+            try:
+                self.run_job(job)
+            finally:
+                self.queue.release_lane(job.lane)
+            return True
+
+    def drain(self):
+        """Run jobs until none is due"""
+        while self.run_once():
+            pass
+
+    def run_forever(self, stop: threading.Event):
+        """Poll for jobs until `stop` is set, finishing the current job first"""
+        while not stop.is_set():
+            if not self.run_once():
+                stop.wait(self.poll_interval)
+
+
+class ContractStatusWatcher:
+    """Publishes results committed by external workers to the in-process event bus.
+
+    One indexed query per interval for the whole API process, instead of one
+    per client polling a status. Each poll reads the finished contracts
+    updated within `overlap` of the newest update seen so far, and publishes
+    the (id, updated_at) pairs it hasn't published yet.
+    """
+
+    def __init__(self, app, interval: float = 1.0, overlap: timedelta = STATUS_WATCH_OVERLAP,
+                 batch_size: int = 500):
+        self.app = app
+        self.interval = interval
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self._newest = None
+        # (id, updated_at) of the published rows still inside the overlap window
+        self._published = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='contract-status-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _changed_rows(self, since: datetime):
+        """Finished contracts updated at or after `since`, in (updated_at, id) order, a batch per query"""
+        after = None
+        while True:
+            query = select(Contract.id, Contract.status, Contract.contract_type, Contract.batch_id,
+                           Contract.updated_at) \
+                .where(Contract.updated_at >= since, Contract.status != 'processing')
+            if after:
+                query = query.where(tuple_(Contract.updated_at, Contract.id) > after)
+            rows = db.session.execute(query.order_by(Contract.updated_at, Contract.id).limit(self.batch_size)).all()
+            yield from rows
+            if len(rows) < self.batch_size:
+                return
+            after = (rows[-1].updated_at, rows[-1].id)
+
+    def poll(self) -> int:
+        """Publish the contracts finished since the last poll; returns how many were published.
+
+        The first poll only records what is already there.
+        """
+        first = self._newest is None
+        newest = self._newest
+        if first:
+            newest = db.session.query(func.max(Contract.updated_at)).scalar() or datetime.utcnow()
+        rows = list(self._changed_rows(newest - self.overlap))
+        # End the read transaction so the next poll sees new commits
+        db.session.rollback()
+
+        published = 0
+        for row in rows:
+            newest = max(newest, row.updated_at)
+            key = (row.id, row.updated_at)
+            if key in self._published:
+                continue
+            self._published.add(key)
+            if first:
+                continue
+            event_bus.publish({
+                'type': 'status',
+                'id': row.id,
+                'status': row.status,
+                'contract_type': row.contract_type,
+                'batch_id': row.batch_id
+            })
+            published += 1
+
+        self._newest = newest
+        since = newest - self.overlap
+        self._published = {key for key in self._published if key[1] >= since}
+        return published
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Error watching contract updates: {str(e)}")
+                    db.session.rollback()
+                if self._stop.wait(self.interval):
+                    return
@@ -1,26 +1,58 @@
+import os
 from flask import Flask, jsonify
 from flask_cors import CORS
+from src.services.database import init_database
+from src.routes.contracts import contracts_bp, start_processing
+from src.services.contract_stats import ensure_counters, get_contract_stats, recent_contracts
 
 app = Flask(__name__)
 CORS(app)  # Liberando CORS para todas as rotas
 
+# SQLite database in the instance folder unless DATABASE_URL is set
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
+# 'embedded' processes uploads on this server's threads; 'external' leaves them to worker.py
+app.config['PROCESSING_MODE'] = os.environ.get('PROCESSING_MODE', 'embedded')
+# OCR preprocessing (OCR_TARGET_DPI, OCR_PSM, ...; see OCRSettings) and the page cache (OCR_CACHE_DIR, OCR_CACHE_MAX_MB)
+app.config.update({key: value for key, value in os.environ.items() if key.startswith('OCR_')})
+app.config.setdefault('OCR_CACHE_DIR', os.path.join(app.instance_path, 'ocr_cache'))
+init_database(app)
+
+app.register_blueprint(contracts_bp, url_prefix='/api')
+
+with app.app_context():
+    ensure_counters()
+
+start_processing(app)
+
+# Labels shown on the dashboard for each processing status
+DASHBOARD_STATUS_LABELS = {
+    'completed': 'Ativo',
+    'processing': 'Processando',
+    'error': 'Erro'
+}
+
 @app.route("/api/status", methods=["GET"])
 def status():
     return jsonify({"status": "Backend funcionando com sucesso!"}), 200
 
 @app.route("/api/dashboard", methods=["GET"])
 def dashboard():
-    fake_data = {
-        "ativos": 12,
-        "com_erro": 1,
-        "processando": 5,
+    stats = get_contract_stats()
+    data = {
+        "ativos": stats['completed_contracts'],
+        "com_erro": stats['error_contracts'],
+        "processando": stats['processing_contracts'],
         "recentes": [
-            {"id": 1, "nome": "Contrato X", "status": "Ativo"},
-            {"id": 2, "nome": "Contrato Y", "status": "Erro"},
+            {
+                "id": contract.id,
+                "nome": contract.original_filename,
+                "status": DASHBOARD_STATUS_LABELS.get(contract.status, contract.status)
+            }
+            for contract in recent_contracts()
         ],
-        "total_processados": 18
+        "total_processados": stats['total_contracts']
     }
-    return jsonify(fake_data), 200
+    return jsonify(data), 200
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,227 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; covers a fast TXT parse up to a long scanned PDF
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Seconds a processing job waits for a worker; OCR backlogs can take an hour
+WAIT_BUCKETS = DURATION_BUCKETS + (600, 1800, 3600)
+
+# Characters of extracted text, or bytes of uploaded file
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count, optionally split by labels"""
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple((name, labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observations, optionally split by labels"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = DURATION_BUCKETS,
+                 labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # label key -> [count per bucket (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple((name, labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    samples.append((f'{self.name}_bucket', key + (('le', _format_value(bound)),), cumulative))
+                samples.append((f'{self.name}_sum', key, total))
+                samples.append((f'{self.name}_count', key, cumulative))
+        return samples
+
+
+class Callback:
+    """Value read from a function when the metrics are scraped"""
+
+    def __init__(self, name: str, help: str, kind: str, fn: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self) -> List[Tuple[str, Tuple, float]]:
+        return [(self.name, (), self.fn())]
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Registering the same name again returns the existing metric
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, buckets: Iterable[float] = DURATION_BUCKETS,
+                  labelnames: Iterable[str] = ()) -> Histogram:
+        return self._register(Histogram(name, help, buckets, labelnames))
+
+    def callback(self, name: str, help: str, fn: Callable[[], float], kind: str = 'gauge'):
+        """Expose a value computed at scrape time; replaces an earlier callback of the same name"""
+        with self._lock:
+            self._metrics[name] = Callback(name, help, kind, fn)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port: int, host: str = '0.0.0.0', registry: MetricsRegistry = None) -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread, for processes without the API (the external worker)"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry or metrics
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+stage_seconds = metrics.histogram(
+    'contract_stage_seconds', 'Time spent in each contract processing stage', labelnames=('stage', 'file_type')
+)
+processing_seconds = metrics.histogram(
+    'contract_processing_seconds', 'Total time to process a contract', labelnames=('file_type',)
+)
+ocr_page_seconds = metrics.histogram('ocr_page_seconds', 'Time to render and OCR one PDF page')
+file_bytes = metrics.histogram(
+    'contract_file_bytes', 'Size of processed contract files', SIZE_BUCKETS, labelnames=('file_type',)
+)
+text_chars = metrics.histogram(
+    'contract_text_chars', 'Characters of text extracted per contract', SIZE_BUCKETS, labelnames=('file_type',)
+)
+pages_total = metrics.counter('contract_pdf_pages_total', 'PDF pages read, by text source', labelnames=('source',))
+ocr_cache_pages_total = metrics.counter(
+    'ocr_cache_pages_total', 'Pages sent to OCR, by whether the OCR cache answered', labelnames=('result',)
+)
+job_wait_seconds = metrics.histogram(
+    'processing_job_wait_seconds', 'Time from a job being due to being claimed, by lane', WAIT_BUCKETS,
+    labelnames=('lane',)
+)
+processed_total = metrics.counter(
+    'contracts_processed_total', 'Contracts processed, by outcome', labelnames=('status', 'contract_type')
+)
+
+
+@contextmanager
+def timed(stats: Optional[Dict], stage: str):
+    """Add the time spent in the block to stats['timings'][stage]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            timings = stats.setdefault('timings', {})
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def record_processing(stats: Dict, file_type: str, status: str, contract_type: Optional[str]):
+    """Feed the measurements of one processed contract into the histograms"""
+    for stage, seconds in stats.get('timings', {}).items():
+        if stage == 'total':
+            processing_seconds.observe(seconds, file_type=file_type)
+        else:
+            stage_seconds.observe(seconds, stage=stage, file_type=file_type)
+    for _, seconds in stats.get('ocr_page_seconds', []):
+        ocr_page_seconds.observe(seconds)
+    if 'file_size' in stats:
+        file_bytes.observe(stats['file_size'], file_type=file_type)
+    if 'text_chars' in stats:
+        text_chars.observe(stats['text_chars'], file_type=file_type)
+    if 'ocr_pages' in stats:
+        pages_total.inc(stats['text_pages'], source='text')
+        pages_total.inc(stats['ocr_pages'], source='ocr')
+    if 'ocr_cached_pages' in stats:
+        hits = stats['ocr_cached_pages']
+        ocr_cache_pages_total.inc(hits, result='hit')
+        ocr_cache_pages_total.inc(stats.get('ocr_pages', 1) - hits, result='miss')
+    processed_total.inc(status=status, contract_type=contract_type or 'unknown')
@@ -0,0 +1,109 @@
+import os
+import time
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterator, Optional, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from src.services.metrics import timed
+from src.services.ocr_preprocess import OCRCache, ocr_image
+from src.services.ocr_settings import OCRSettings
+
+
+def _ocr_pdf_page(file_path: str, page_index: int, settings: OCRSettings,
+                  cache_dir: Optional[str], cache_max_bytes: Optional[int] = None) -> Tuple[int, str, float, bool]:
+    """Render one PDF page with PyMuPDF and OCR it in memory (runs inside a worker process).
+    
+    Returns (page_index, text, seconds spent on the page, whether the text came from the cache).
+    """
+    start = time.perf_counter()
+    cached = False
+    try:
+        doc = fitz.open(file_path)
+        try:
+            pixmap = doc[page_index].get_pixmap(dpi=settings.target_dpi, colorspace=fitz.csGRAY)
+        finally:
+            doc.close()
+        image = Image.frombytes('L', (pixmap.width, pixmap.height), pixmap.samples)
+        cache = OCRCache(cache_dir, cache_max_bytes) if cache_dir else None
+        text, cached = ocr_image(image, settings, cache, source_dpi=settings.target_dpi)
+    except Exception as e:
+        print(f"Error running OCR on page {page_index + 1} of {file_path}: {str(e)}")
+        text = ""
+    return page_index, text, time.perf_counter() - start, cached
+
+
+class OCREngine:
+    """Process pool that renders and OCRs PDF pages concurrently"""
+
+    def __init__(self, max_workers: int = None, settings: OCRSettings = None, cache_dir: str = None,
+                 cache_max_bytes: int = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.settings = settings or OCRSettings()
+        # Directory of OCR results by page image hash; None disables the cache
+        self.cache_dir = cache_dir
+        # Size bound of that directory; None keeps OCRCache's default
+        self.cache_max_bytes = cache_max_bytes
+        # Pages in flight at once; bounds how many bitmaps exist at the same time
+        self.max_pending = self.max_workers * 2
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def configure(self, settings: OCRSettings = None, cache_dir: str = None, cache_max_bytes: int = None):
+        """Update settings from the app config; applies to pages submitted afterwards"""
+        if settings:
+            self.settings = settings
+        if cache_dir:
+            self.cache_dir = cache_dir
+        if cache_max_bytes is not None:
+            self.cache_max_bytes = cache_max_bytes
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use"""
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn avoids forking a process that already runs worker threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def submit_pdf_page(self, file_path: str, page_index: int) -> Future:
+        """Queue a 0-based PDF page for OCR.
+        
+        The future's result is (page_index, text, seconds spent in the worker,
+        whether the text came from the OCR cache).
+        """
+        return self._get_pool().submit(
+            _ocr_pdf_page, file_path, page_index, self.settings, self.cache_dir, self.cache_max_bytes
+        )
+
+    def ocr_image_file(self, file_path: str) -> Tuple[str, bool]:
+        """OCR an image file in the calling thread, returning (text, whether it came from the cache)"""
+        cache = OCRCache(self.cache_dir, self.cache_max_bytes) if self.cache_dir else None
+        with Image.open(file_path) as image:
+            return ocr_image(image, self.settings, cache)
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+def iter_image_chunks(processor, file_path: str, stats: Optional[Dict] = None) -> Iterator[str]:
+    """Extractor backend: the text of an image file via OCR, after preprocessing (see ocr_preprocess)"""
+    try:
+        with timed(stats, 'ocr'):
+            text, cached = processor.ocr_engine.ocr_image_file(file_path)
+        if stats is not None:
+            stats['ocr_cached_pages'] = int(cached)
+    except Exception as e:
+        print(f"Error extracting text from image: {str(e)}")
+        text = ""
+    yield text
@@ -0,0 +1,242 @@
+import hashlib
+import os
+import tempfile
+import time
+from typing import Optional
+
+import pytesseract
+from PIL import Image, ImageOps, ImageStat
+
+from src.services.ocr_settings import OCRSettings
+
+# Height of an A4 page in inches; used to guess the resolution of photos without DPI metadata
+A4_HEIGHT_INCHES = 11.69
+
+# Width the skew search works at; enough to resolve text lines, cheap to rotate
+SKEW_SEARCH_WIDTH = 1000
+
+# Default size bound of the OCR cache directory, overridable with OCR_CACHE_MAX_MB; least
+# recently used pages are evicted past it
+OCR_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Seconds between size checks of the cache directory, across every process sharing it
+OCR_CACHE_PRUNE_INTERVAL = 300
+
+# Eviction goes down to this fraction of the bound, so a full cache isn't pruned on every write
+OCR_CACHE_PRUNE_TARGET = 0.9
+
+
+def estimate_dpi(image: Image.Image) -> float:
+    """Resolution from the file metadata, or a guess assuming the image shows an A4 page"""
+    dpi = image.info.get('dpi')
+    if dpi and dpi[0] >= 100:
+        return float(dpi[0])
+    # Phone photos usually claim 72 dpi whatever they show
+    return max(image.size) / A4_HEIGHT_INCHES
+
+
+def downscale(image: Image.Image, source_dpi: float, target_dpi: int) -> Image.Image:
+    """Reduce the image to target_dpi; OCR time grows with the pixel count"""
+    if source_dpi <= target_dpi * 1.1:
+        return image
+    scale = target_dpi / source_dpi
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    # Averaging by a whole factor first is much cheaper than filtering the full image
+    factor = int(1 / scale)
+    if factor > 1:
+        image = image.reduce(factor)
+    return image.resize(size, Image.LANCZOS) if image.size != size else image
+
+
+def otsu_threshold(gray: Image.Image) -> int:
+    """Gray level that best separates ink from paper (Otsu's method on the histogram)"""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        background += count
+        if not background:
+            continue
+        foreground = total - background
+        if not foreground:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def binarize(gray: Image.Image) -> Image.Image:
+    """Black text on white, thresholded at the Otsu level"""
+    threshold = otsu_threshold(gray)
+    return gray.point([0 if level <= threshold else 255 for level in range(256)])
+
+
+def estimate_skew(image: Image.Image, max_degrees: float) -> float:
+    """Angle that straightens the text lines, found by maximizing the row profile variance.
+
+    Rotating a page so its lines are horizontal makes the rows alternate
+    sharply between ink and blank, which maximizes the variance of row sums.
+    """
+    if max_degrees <= 0:
+        return 0.0
+    # Ink as white on black, so the rotation fill adds nothing to the profile
+    sample = ImageOps.invert(image)
+    if sample.width > SKEW_SEARCH_WIDTH:
+        sample = sample.resize(
+            (SKEW_SEARCH_WIDTH, max(1, round(sample.height * SKEW_SEARCH_WIDTH / sample.width))),
+            Image.BILINEAR
+        )
+
+    def score(angle: float) -> float:
+        rotated = sample.rotate(angle, resample=Image.NEAREST, fillcolor=0)
+        # Mean of each row in C: a one-pixel-wide box resize
+        return ImageStat.Stat(rotated.resize((1, rotated.height), Image.BOX)).var[0]
+
+    # Coarse search, then refine around the best angle
+    steps = int(max_degrees / 0.5)
+    best = max((step * 0.5 for step in range(-steps, steps + 1)), key=score)
+    best = max((best + step * 0.1 for step in range(-4, 5)), key=score)
+    return round(best, 1) if abs(best) >= 0.1 else 0.0
+
+
+def detect_orientation(image: Image.Image) -> int:
+    """Clockwise rotation in degrees that tesseract says puts the page upright, 0 if unknown"""
+    try:
+        return pytesseract.image_to_osd(image, output_type=pytesseract.Output.DICT)['rotate']
+    except pytesseract.TesseractError:
+        # Missing osd data or too little text to tell
+        return 0
+
+
+def preprocess(image: Image.Image, settings: OCRSettings, source_dpi: Optional[float] = None) -> Image.Image:
+    """Downscale, grayscale, binarize and straighten a page image for OCR"""
+    source_dpi = source_dpi or estimate_dpi(image)
+    # Photos are often stored sideways with an EXIF orientation tag
+    image = ImageOps.exif_transpose(image)
+    gray = downscale(image, source_dpi, settings.target_dpi).convert('L')
+    if settings.detect_orientation:
+        rotation = detect_orientation(gray)
+        if rotation:
+            gray = gray.rotate(-rotation, expand=True)
+    if settings.binarize:
+        gray = binarize(gray)
+    if settings.deskew:
+        angle = estimate_skew(gray, settings.max_skew_degrees)
+        if angle:
+            gray = gray.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return gray
+
+
+class OCRCache:
+    """OCR text of page images stored in a directory, keyed by image content and settings.
+
+    Files are written atomically, so worker processes can share a directory.
+    Reads refresh a file's mtime, and writes evict the least recently used
+    files once the directory grows past max_bytes (checked every
+    prune_interval seconds).
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None,
+                 prune_interval: float = OCR_CACHE_PRUNE_INTERVAL):
+        self.directory = directory
+        self.max_bytes = OCR_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.prune_interval = prune_interval
+
+    def key(self, image: Image.Image, settings: OCRSettings) -> str:
+        digest = hashlib.sha256(repr(settings).encode())
+        digest.update(f'{image.mode}:{image.size}'.encode())
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.txt')
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as file:
+                text = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Missing, or evicted by another process between the read and the touch
+            return None
+        return text
+
+    def put(self, key: str, text: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.replace(temp_path, path)
+        self.prune_if_due()
+
+    def prune_if_due(self):
+        """Prune unless a process sharing the directory did so in the last prune_interval seconds"""
+        marker = os.path.join(self.directory, '.pruned')
+        try:
+            if time.time() - os.path.getmtime(marker) < self.prune_interval:
+                return
+        except FileNotFoundError:
+            pass
+        with open(marker, 'w'):
+            pass
+        self.prune()
+
+    def prune(self) -> int:
+        """Delete the least recently used files until the cache fits its bound; returns the number deleted"""
+        entries = []
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith('.txt'):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes * OCR_CACHE_PRUNE_TARGET:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+
+def ocr_image(image: Image.Image, settings: OCRSettings, cache: Optional[OCRCache] = None,
+              source_dpi: Optional[float] = None):
+    """OCR one page image, returning (text, whether it came from the cache)"""
+    key = cache.key(image, settings) if cache else None
+    if key:
+        text = cache.get(key)
+        if text is not None:
+            return text, True
+
+    page = preprocess(image, settings, source_dpi)
+    text = pytesseract.image_to_string(page, lang=settings.lang, config=settings.tesseract_config(settings.psm))
+    if settings.fallback_psm is not None and len(text.strip()) < settings.min_chars:
+        retry = pytesseract.image_to_string(
+            page, lang=settings.lang, config=settings.tesseract_config(settings.fallback_psm)
+        )
+        if len(retry.strip()) > len(text.strip()):
+            text = retry
+
+    if key:
+        cache.put(key, text)
+    return text, False
@@ -0,0 +1,44 @@
+from typing import Mapping, NamedTuple, Optional
+
+
+def _parse_setting(value, default):
+    """Convert a setting given as a string (environment variable) to the type of its default"""
+    if not isinstance(value, str):
+        return value
+    if isinstance(default, bool):
+        return value.lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, float):
+        return float(value)
+    if isinstance(default, int) or default is None:
+        return int(value)
+    return value
+
+
+class OCRSettings(NamedTuple):
+    """How pages are prepared for tesseract and how tesseract reads them"""
+    lang: str = 'por'
+    # Resolution pages are rendered at (PDF) or reduced to (images); never upscaled
+    target_dpi: int = 200
+    binarize: bool = True
+    deskew: bool = True
+    max_skew_degrees: float = 5.0
+    # Needs the tesseract 'osd' language data; pages are rotated by multiples of 90 degrees
+    detect_orientation: bool = False
+    # Tesseract page segmentation mode: 3 = automatic layout, 4 = single column, 6 = single block
+    psm: int = 3
+    # Retried when the first pass reads fewer than min_chars, e.g. 11 (sparse text) for photos
+    fallback_psm: Optional[int] = None
+    min_chars: int = 20
+
+    @classmethod
+    def from_config(cls, config: Mapping) -> 'OCRSettings':
+        """Build settings from OCR_* keys (e.g. OCR_TARGET_DPI), keeping defaults for missing ones"""
+        values = {}
+        for field, default in cls._field_defaults.items():
+            value = config.get(f'OCR_{field.upper()}')
+            if value is not None:
+                values[field] = _parse_setting(value, default)
+        return cls(**values)
+
+    def tesseract_config(self, psm: int) -> str:
+        return f'--psm {psm}'
@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from sqlalchemy import event
+
+from src.models.contract import Contract
+from src.services.metrics import metrics
+
+payload_cache_total = metrics.counter(
+    'contract_payload_cache_total', 'Contract data responses, by whether the rendered payload was cached',
+    labelnames=('result',)
+)
+
+
+class PayloadCache:
+    """Small LRU of rendered response bodies, keyed by (contract id, version).
+
+    The version is the contract's updated_at, so a changed contract is never
+    served from an older entry; invalidate() also frees the entries of a
+    contract as soon as this process updates it.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, contract_id: int, version: Hashable) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get((contract_id, version))
+            if body is not None:
+                self._entries.move_to_end((contract_id, version))
+        payload_cache_total.inc(result='hit' if body is not None else 'miss')
+        return body
+
+    def put(self, contract_id: int, version: Hashable, body: bytes):
+        """Keep a rendered body, evicting the least recently used ones beyond the limits"""
+        if len(body) > self.max_bytes // 4:
+            # One huge contract shouldn't flush everything else
+            return
+        with self._lock:
+            previous = self._entries.pop((contract_id, version), None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[(contract_id, version)] = body
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def invalidate(self, contract_id: int):
+        """Drop every cached version of a contract"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == contract_id]:
+                self._size -= len(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+# Rendered GET /contracts/<id>/data bodies
+contract_payloads = PayloadCache()
+
+
+@event.listens_for(Contract, 'after_update')
+@event.listens_for(Contract, 'after_delete')
+def _invalidate_contract(mapper, connection, target):
+    contract_payloads.invalidate(target.id)
@@ -0,0 +1,60 @@
+from collections import deque
+from typing import Dict, Iterator, Optional
+
+import fitz  # PyMuPDF
+
+from src.services.metrics import timed
+
+
+def iter_pdf_chunks(processor, file_path: str, stats: Optional[Dict] = None) -> Iterator[str]:
+    """Yield PDF pages, running OCR only on pages without a usable text layer.
+
+    Scanned pages are OCR'd in parallel while later pages are read; pages
+    are yielded in order, with at most ocr_engine.max_pending held back.
+    """
+    text_pages = ocr_pages = 0
+    page_seconds = {}
+    cached_pages = 0
+    # (page_index, text or OCR future) in page order
+    window = deque()
+
+    def next_page():
+        nonlocal cached_pages
+        page_index, result = window.popleft()
+        if isinstance(result, str):
+            return result
+        with timed(stats, 'ocr'):
+            page_index, text, seconds, cached = result.result()
+        page_seconds[page_index] = seconds
+        cached_pages += cached
+        return text
+
+    with fitz.open(file_path) as doc:
+        for page in doc:
+            with timed(stats, 'text_layer'):
+                page_text = page.get_text()
+            if len(page_text.strip()) >= processor.min_page_text_chars:
+                window.append((page.number, page_text))
+                text_pages += 1
+            else:
+                # Scanned page (or only a stray header): OCR it instead
+                window.append((page.number, processor.ocr_engine.submit_pdf_page(file_path, page.number)))
+                ocr_pages += 1
+
+            while window and (isinstance(window[0][1], str) or len(window) >= processor.ocr_engine.max_pending):
+                page_text = next_page()
+                if page_text.strip():
+                    yield page_text + "\n"
+
+        while window:
+            page_text = next_page()
+            if page_text.strip():
+                yield page_text + "\n"
+
+    if ocr_pages:
+        print(f"{ocr_pages} of {text_pages + ocr_pages} PDF pages had no text layer, used OCR")
+    if stats is not None:
+        stats['text_pages'] = text_pages
+        stats['ocr_pages'] = ocr_pages
+        stats['ocr_cached_pages'] = cached_pages
+        stats['ocr_page_seconds'] = sorted(page_seconds.items())
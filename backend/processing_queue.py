@@ -0,0 +1,124 @@
+import os
+import queue
+import threading
+
+
+class QueueFullError(Exception):
+    """Raised when the processing queue cannot accept more jobs"""
+
+    def __init__(self, retry_after: int):
+        super().__init__('Processing queue is full')
+        self.retry_after = retry_after
+
+
+class ProcessingExecutor:
+    """Fixed pool of worker threads fed by a bounded job queue"""
+
+    def __init__(self, max_workers: int = None, max_queue_size: int = 100, retry_after: int = 30):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue_size = max_queue_size
+        self.retry_after = retry_after
+
+        self._queue = None
+        self._workers = []
+        self._lock = threading.Lock()
+
+        # Counters exposed through stats()
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    def configure(self, max_workers: int = None, max_queue_size: int = None, retry_after: int = None):
+        """Update pool settings. Ignored once the workers are running."""
+        with self._lock:
+            if self._workers:
+                return
+            if max_workers:
+                self.max_workers = max_workers
+            if max_queue_size:
+                self.max_queue_size = max_queue_size
+            if retry_after:
+                self.retry_after = retry_after
+
+    def _ensure_started(self):
+        """Start the worker threads on first use (caller holds the lock)"""
+        if self._workers:
+            return
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        for index in range(self.max_workers):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f'contract-worker-{index}',
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _worker_loop(self):
+        """Run queued jobs until a shutdown sentinel is received"""
+        while True:
+            fn, args = self._queue.get()
+            if fn is None:
+                self._queue.task_done()
+                break
+
+            with self._lock:
+                self._active += 1
+            try:
+                fn(*args)
+                with self._lock:
+                    self._completed += 1
+            except Exception as e:
+                print(f"Error running processing job: {str(e)}")
+                with self._lock:
+                    self._failed += 1
+            finally:
+                with self._lock:
+                    self._active -= 1
+                self._queue.task_done()
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker"""
+        return self._queue.qsize() if self._queue else 0
+
+    def has_capacity(self, count: int = 1) -> bool:
+        """Check whether `count` more jobs would currently fit in the queue"""
+        return self.queue_depth() + count <= self.max_queue_size
+
+    def submit(self, fn, *args):
+        """Queue a job without blocking, raising QueueFullError when the queue is full"""
+        self.submit_many(fn, [args])
+
+    def submit_many(self, fn, args_list):
+        """Queue several jobs at once: either all of them fit or none is queued"""
+        with self._lock:
+            self._ensure_started()
+            if not self.has_capacity(len(args_list)):
+                self._rejected += len(args_list)
+                raise QueueFullError(self.retry_after)
+            for args in args_list:
+                self._queue.put_nowait((fn, tuple(args)))
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth, worker usage and job counters"""
+        with self._lock:
+            return {
+                'queue_depth': self.queue_depth(),
+                'max_queue_size': self.max_queue_size,
+                'active_workers': self._active,
+                'max_workers': self.max_workers,
+                'completed_jobs': self._completed,
+                'failed_jobs': self._failed,
+                'rejected_jobs': self._rejected
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers after the jobs already queued have run"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put((None, ()))
+        if wait:
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,166 @@
+import html
+import re
+import zlib
+from typing import Dict, Optional
+
+from sqlalchemy import column, func, literal_column, table, text
+
+from src.models.contract import Contract
+
+# unicode61 with remove_diacritics folds accents: 'locação' matches 'locacao'
+SEARCH_TOKENIZER = "unicode61 remove_diacritics 2"
+
+# The index reads the text through a view that decompresses contract_texts,
+# and triggers keep it in step with every write to that table
+SEARCH_INDEX_DDL = (
+    "CREATE VIEW IF NOT EXISTS contract_search_texts AS "
+    "SELECT contract_id, decompress_text(compressed_text) AS text FROM contract_texts",
+
+    "CREATE VIRTUAL TABLE IF NOT EXISTS contracts_fts USING fts5("
+    "text, content='contract_search_texts', content_rowid='contract_id', "
+    f"tokenize='{SEARCH_TOKENIZER}')",
+
+    "CREATE TRIGGER IF NOT EXISTS contract_texts_fts_insert AFTER INSERT ON contract_texts BEGIN "
+    "INSERT INTO contracts_fts (rowid, text) VALUES (new.contract_id, decompress_text(new.compressed_text)); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS contract_texts_fts_delete AFTER DELETE ON contract_texts BEGIN "
+    "INSERT INTO contracts_fts (contracts_fts, rowid, text) "
+    "VALUES ('delete', old.contract_id, decompress_text(old.compressed_text)); "
+    "END",
+
+    "CREATE TRIGGER IF NOT EXISTS contract_texts_fts_update AFTER UPDATE ON contract_texts BEGIN "
+    "INSERT INTO contracts_fts (contracts_fts, rowid, text) "
+    "VALUES ('delete', old.contract_id, decompress_text(old.compressed_text)); "
+    "INSERT INTO contracts_fts (rowid, text) VALUES (new.contract_id, decompress_text(new.compressed_text)); "
+    "END",
+)
+
+# Contracts reindexed per transaction by reindex(), short enough not to stall the API
+REINDEX_CHUNK_SIZE = 500
+
+# Markers placed around matches by snippet(); replaced with <mark> after escaping
+_MATCH_START = '\x01'
+_MATCH_END = '\x02'
+
+SNIPPET_TOKENS = 24
+
+_QUERY_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r'\w+')
+
+
+def decompress_text(compressed: Optional[bytes]) -> Optional[str]:
+    """SQL function used by the search view and triggers"""
+    if compressed is None:
+        return None
+    return zlib.decompress(compressed).decode('utf-8')
+
+
+def register_sqlite_functions(dbapi_connection):
+    """Make decompress_text() available on a new SQLite connection"""
+    dbapi_connection.create_function('decompress_text', 1, decompress_text, deterministic=True)
+
+
+def create_search_index(connection):
+    """Create the full-text index, its view and triggers if they don't exist"""
+    if connection.dialect.name != 'sqlite':
+        return
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+
+
+def rebuild_search_index(connection):
+    """Reindex every contract in one statement"""
+    connection.execute(text("INSERT INTO contracts_fts (contracts_fts) VALUES ('rebuild')"))
+
+
+def reindex(engine, chunk_size: int = REINDEX_CHUNK_SIZE) -> int:
+    """Rebuild the index from scratch, then fill it a range of contracts at a time.
+
+    'delete-all' empties the index without reading the content view, so it
+    also clears entries that drifted from the stored text, which a DELETE on
+    the external-content table can't. Other requests keep reading and writing
+    between chunks; searches miss the contracts not reinserted yet, and new
+    contracts are indexed by the triggers. Returns the number of contracts
+    reindexed.
+    """
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO contracts_fts (contracts_fts) VALUES ('delete-all')"))
+        max_id = connection.execute(text('SELECT MAX(contract_id) FROM contract_texts')).scalar() or 0
+
+    total = 0
+    for first in range(1, max_id + 1, chunk_size):
+        bounds = {'first': first, 'last': first + chunk_size - 1}
+        with engine.begin() as connection:
+            total += connection.execute(text(
+                'INSERT INTO contracts_fts (rowid, text) SELECT contract_id, text FROM contract_search_texts '
+                'WHERE contract_id BETWEEN :first AND :last'
+            ), bounds).rowcount
+
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO contracts_fts (contracts_fts) VALUES ('optimize')"))
+    return total
+
+
+def _document_number_phrases(digits: str):
+    """Phrases matching a CPF or CNPJ written with or without punctuation"""
+    if len(digits) == 11:
+        formatted = f'{digits[:3]} {digits[3:6]} {digits[6:9]} {digits[9:]}'
+    elif len(digits) == 14:
+        formatted = f'{digits[:2]} {digits[2:5]} {digits[5:8]} {digits[8:12]} {digits[12:]}'
+    else:
+        return None
+    return f'"{digits}"', f'"{formatted}"'
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Turn user input into an FTS5 MATCH expression.
+
+    Words and "quoted phrases" must all match; a trailing * makes a word a
+    prefix. Only word characters reach FTS5, so its query syntax can't be
+    injected. Returns None when the input has no searchable words.
+    """
+    terms = []
+    for phrase, word in _QUERY_TERM.findall(query):
+        words = _WORD.findall(phrase or word)
+        if not words:
+            continue
+        term = '"' + ' '.join(words) + '"'
+        if word.endswith('*') and len(words) == 1:
+            term += '*'
+
+        digits = ''.join(words)
+        alternatives = _document_number_phrases(digits) if digits.isdigit() else None
+        if alternatives:
+            term = '(' + ' OR '.join(alternatives) + ')'
+        terms.append(term)
+    return ' AND '.join(terms) or None
+
+
+def format_snippet(snippet: Optional[str]) -> Optional[str]:
+    """HTML-escape a snippet and wrap the matches in <mark> tags"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+
+
+def search_query(query, match_expression: str):
+    """Add the full-text match, bm25 score and snippet to a contracts query, best first"""
+    fts = table('contracts_fts', column('rowid'))
+    fts_table = literal_column('contracts_fts')
+    score = func.bm25(fts_table).label('score')
+    snippet = func.snippet(fts_table, 0, _MATCH_START, _MATCH_END, '…', SNIPPET_TOKENS).label('snippet')
+
+    return query.join(fts, fts.c.rowid == Contract.id) \
+        .filter(fts_table.op('MATCH')(match_expression)) \
+        .add_columns(score, snippet) \
+        .order_by(score, Contract.id)
+
+
+def search_result(contract, score: float, snippet: Optional[str]) -> Dict:
+    """API representation of a search hit"""
+    result = contract.to_dict()
+    # bm25() is lower for better matches; flip it so higher means more relevant
+    result['score'] = -score
+    result['snippet'] = format_snippet(snippet)
+    return result
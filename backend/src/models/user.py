@@ -12,14 +12,3 @@ class User(db.Model):
 
     def __repr__(self):
         return f"<User {self.username}>"
-
-class Contract(db.Model):
-    __tablename__ = 'contracts'
-
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(255), nullable=False)
-    contract_type = db.Column(db.String(50), nullable=False)
-    extracted_data = db.Column(db.Text, nullable=True)
-
-    def __repr__(self):
-        return f"<Contract {self.title}>"
@@ -0,0 +1,39 @@
+"""Expose the flat backend modules under the src.* packages they import each other from.
+
+Shared by the tests and the benchmarks, which run from a checkout without an installed src package.
+"""
+import os
+import sys
+import types
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Package -> directories searched for its modules
+PACKAGE_PATHS = {
+    'src': [os.path.join(BACKEND_DIR, 'src')],
+    'src.models': [os.path.join(BACKEND_DIR, 'src', 'models'), BACKEND_DIR],
+    'src.services': [BACKEND_DIR],
+    'src.routes': [BACKEND_DIR],
+}
+
+
+def install_src_packages():
+    """Register the src packages, so `import src.services.job_queue` loads backend/job_queue.py"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    for name, path in PACKAGE_PATHS.items():
+        if name in sys.modules:
+            continue
+        package = types.ModuleType(name)
+        package.__path__ = path
+        sys.modules[name] = package
+        parent, _, child = name.rpartition('.')
+        if parent:
+            setattr(sys.modules[parent], child, package)
+
+
+# Prepended to code run in a subprocess, so it sees the same packages
+BOOTSTRAP = (
+    f'import sys; sys.path.insert(0, {BACKEND_DIR!r}); '
+    'import src_layout; src_layout.install_src_packages()\n'
+)
@@ -0,0 +1,72 @@
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src_layout import install_src_packages  # noqa: E402
+
+install_src_packages()
+
+from flask import Flask  # noqa: E402
+
+
+def create_test_app(database_path, upload_folder, **config):
+    """An app with the contract routes on its own SQLite database, without processing threads"""
+    from src.services.database import init_database
+    from src.routes.contracts import contracts_bp
+
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite:///' + database_path,
+        UPLOAD_FOLDER=upload_folder,
+        # Jobs stay queued until a test runs them
+        PROCESSING_MODE='external',
+        **config
+    )
+    init_database(app)
+    app.register_blueprint(contracts_bp, url_prefix='/api')
+    return app
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return str(tmp_path / 'database.db')
+
+
+@pytest.fixture
+def app(tmp_path, database_path):
+    app = create_test_app(database_path, str(tmp_path / 'uploads'))
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def upload(client):
+    """Upload a text contract; returns the response JSON"""
+    def upload(text, filename='contract.txt'):
+        response = client.post('/api/contracts/upload', data={'file': (io.BytesIO(text.encode()), filename)},
+                               content_type='multipart/form-data')
+        assert response.status_code == 201, response.json
+        return response.json
+    return upload
+
+
+@pytest.fixture
+def run_jobs(app):
+    """Process every due job in this process, as an embedded worker would"""
+    from src.services.contract_processing import configure_processor
+    from src.services.job_queue import JobWorker, job_queue
+
+    configure_processor(app.config)
+
+    def run_jobs():
+        JobWorker(app, job_queue).drain()
+    return run_jobs
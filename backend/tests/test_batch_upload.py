@@ -0,0 +1,31 @@
+import io
+
+from src.routes.contracts import processing_executor
+
+
+def post_batch(client, texts):
+    files = [(io.BytesIO(text.encode()), f'contract-{index}.txt') for index, text in enumerate(texts)]
+    return client.post('/api/contracts/batch', data={'files': files}, content_type='multipart/form-data')
+
+
+def test_batch_larger_than_queue_is_accepted(client, monkeypatch):
+    monkeypatch.setattr(processing_executor, 'max_queue_size', 2)
+
+    response = post_batch(client, [f'CONTRATO DE LOCAÇÃO número {number}' for number in range(5)])
+    assert response.status_code == 201
+    assert response.json['accepted'] == 5
+    assert [file['status'] for file in response.json['files']] == ['processing'] * 5
+    assert client.get('/api/contracts/queue').json['jobs']['queued'] == 5
+
+    # Once the queue is past its limit, new work waits
+    response = post_batch(client, ['CONTRATO DE SEGURO, apólice 7'])
+    assert response.status_code == 503
+    assert response.headers['Retry-After']
+
+
+def test_batch_reports_rejected_files(client):
+    files = [(io.BytesIO(b'CONTRATO DE LOCACAO'), 'contract.txt'), (io.BytesIO(b'MZ\x90\x00'), 'tool.exe')]
+    response = client.post('/api/contracts/batch', data={'files': files}, content_type='multipart/form-data')
+    assert response.status_code == 201
+    assert (response.json['accepted'], response.json['rejected']) == (1, 1)
+    assert 'error' in response.json['files'][1]
@@ -0,0 +1,61 @@
+import pytest
+
+from src.services.payload_cache import PayloadCache, contract_payloads
+
+RENTAL_TEXT = 'CONTRATO DE LOCAÇÃO, aluguel mensal de R$ 1.500,00 do imóvel'
+
+
+@pytest.fixture(autouse=True)
+def empty_payload_cache():
+    contract_payloads.clear()
+
+
+@pytest.mark.parametrize('path', ['/api/contracts/{}', '/api/contracts/{}/data', '/api/contracts/{}/status'])
+def test_unchanged_contract_gets_304_until_it_changes(client, upload, run_jobs, path):
+    url = path.format(upload(RENTAL_TEXT)['contract_id'])
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+
+    for headers in ({'If-None-Match': etag}, {'If-None-Match': f'W/{etag}'},
+                    {'If-Modified-Since': first.headers['Last-Modified']}):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert not response.data
+
+    run_jobs()
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.json['status'] == 'completed'
+
+
+def test_data_body_is_cached_per_version(client, upload, run_jobs):
+    contract_id = upload(RENTAL_TEXT)['contract_id']
+    assert client.get(f'/api/contracts/{contract_id}/data').json['extracted_data'] == {}
+    run_jobs()
+
+    first = client.get(f'/api/contracts/{contract_id}/data')
+    assert first.json['extracted_data']['valor_aluguel'] == 'R$ 1.500,00'
+    assert client.get(f'/api/contracts/{contract_id}/data').data == first.data
+
+
+def test_missing_contract_is_404(client):
+    for path in ('/api/contracts/99', '/api/contracts/99/data', '/api/contracts/99/status'):
+        response = client.get(path, headers={'If-None-Match': '"99-x"'})
+        assert response.status_code == 404
+
+
+def test_payload_cache_evicts_least_recently_used():
+    cache = PayloadCache(max_entries=2)
+    cache.put(1, 'a', b'one')
+    cache.put(2, 'a', b'two')
+    assert cache.get(1, 'a') == b'one'
+    cache.put(3, 'a', b'three')
+    assert cache.get(2, 'a') is None
+    assert cache.get(1, 'a') == b'one'
+
+    cache.invalidate(1)
+    assert cache.get(1, 'a') is None
@@ -0,0 +1,63 @@
+import pytest
+
+from src.services.contract_classifier import KeywordClassifier, fold_text, plural_forms
+from src.services.document_processor import DocumentProcessor
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return DocumentProcessor().classifier
+
+
+def test_fold_text():
+    assert fold_text('LOCAÇÃO Prêmio') == 'locacao premio'
+
+
+@pytest.mark.parametrize('word, forms', [
+    ('locacao', ['locacao', 'locacoes']),
+    ('imovel', ['imovel', 'imoveis']),
+    ('locador', ['locador', 'locadores']),
+    ('parcela', ['parcela', 'parcelas']),
+    ('juros', ['juros']),
+    ('alienacao fiduciaria', ['alienacao fiduciaria']),
+])
+def test_plural_forms(word, forms):
+    assert plural_forms(word) == forms
+
+
+def test_keywords_ignore_case_and_accents_and_count_plurals(classifier):
+    hits = classifier.count_keywords('LOCAÇÃO, locacoes e Locações; dois imóveis')
+    assert (hits['locacao'], hits['imovel']) == (3, 1)
+
+
+def test_keywords_match_whole_words_only(classifier):
+    # 'price' inside 'apreciação', 'taxa' inside 'taxativo', 'dano' inside 'danoso'
+    assert not classifier.count_keywords('apreciação taxativo danoso')
+
+
+def test_multi_word_keyword_spans_line_breaks(classifier):
+    assert classifier.count_keywords('alienação\n   fiduciária')['alienacao fiduciaria'] == 1
+
+
+def test_keyword_in_several_categories_counts_for_each():
+    classifier = KeywordClassifier({'a': ['taxa'], 'b': ['taxa', 'multa']})
+    result = classifier.classify('taxa e multa')
+    assert result.scores == {'a': 1, 'b': 2}
+    assert (result.contract_type, result.confidence) == ('b', 2 / 3)
+
+
+def test_no_keywords_is_unknown(classifier):
+    assert classifier.classify('nada a declarar') == (
+        'unknown', {'financing': 0, 'rental': 0, 'insurance': 0}, 0.0
+    )
+
+
+def test_tally_settles_early_with_the_same_answer(classifier):
+    text = 'Contrato de locação do imóvel, aluguel pago ao locador pelo locatário.\n' * 20
+    tally = classifier.tally()
+    for line in text.splitlines(keepends=True):
+        tally.feed(line)
+        if tally.settled():
+            break
+    assert tally.chunks < 20
+    assert tally.result().contract_type == classifier.classify(text).contract_type == 'rental'
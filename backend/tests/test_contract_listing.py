@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from src.models.user import db
+from src.models.contract import Contract
+
+START = datetime(2025, 1, 1)
+
+
+def add_contracts(created_ats, status='completed'):
+    contracts = [
+        Contract(original_filename=f'{index}.txt', file_path=f'{index}.txt', file_type='txt', file_size=1,
+                 status=status, created_at=created_at)
+        for index, created_at in enumerate(created_ats)
+    ]
+    db.session.add_all(contracts)
+    db.session.commit()
+    return contracts
+
+
+def all_pages(client, **args):
+    ids, pages, cursor = [], 0, None
+    while True:
+        query = dict(args, cursor=cursor) if cursor else args
+        response = client.get('/api/contracts', query_string=query)
+        assert response.status_code == 200
+        ids.extend(contract['id'] for contract in response.json)
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return ids, pages
+
+
+def test_pages_cover_every_contract_once_newest_first(client):
+    # Ties on created_at are ordered by id
+    created_ats = [START + timedelta(minutes=minute) for minute in (0, 1, 1, 1, 2, 3, 3)]
+    contracts = add_contracts(created_ats)
+    expected = [contract.id for contract in sorted(contracts, key=lambda c: (c.created_at, c.id), reverse=True)]
+
+    ids, pages = all_pages(client, limit=2)
+    assert ids == expected
+    assert pages == 4
+
+
+def test_rows_added_while_paging_do_not_shift_pages(client):
+    add_contracts([START + timedelta(minutes=minute) for minute in range(4)])
+    first = client.get('/api/contracts?limit=2')
+    add_contracts([START + timedelta(minutes=10)])
+
+    second = client.get('/api/contracts', query_string={'limit': 2, 'cursor': first.headers['X-Next-Cursor']})
+    assert [contract['id'] for contract in first.json + second.json] == [4, 3, 2, 1]
+
+
+def test_next_link_keeps_the_filters(client):
+    add_contracts([START, START + timedelta(minutes=1), START + timedelta(minutes=2)])
+    add_contracts([START + timedelta(minutes=5)], status='error')
+
+    response = client.get('/api/contracts?status=completed&limit=2')
+    assert [contract['status'] for contract in response.json] == ['completed', 'completed']
+    assert 'status=completed' in response.headers['Link']
+    ids, _ = all_pages(client, status='completed', limit=2)
+    assert ids == [3, 2, 1]
+
+
+def test_invalid_cursor_and_limit(client):
+    assert client.get('/api/contracts?cursor=not-a-cursor').status_code == 400
+    assert client.get('/api/contracts?limit=0').status_code == 400
+    assert client.get('/api/contracts?created_after=yesterday').status_code == 400
@@ -0,0 +1,63 @@
+from src.models.user import db
+from src.models.contract import Contract, ContractCounter
+from src.services.contract_stats import get_contract_stats, rebuild_counters, record_bulk_insert, stats_cache
+
+
+def counters():
+    db.session.expire_all()
+    return {name: value for name, value in db.session.query(ContractCounter.name, ContractCounter.value) if value}
+
+
+def add_contract(status='processing', contract_type=None):
+    contract = Contract(original_filename='a.txt', file_path='a.txt', file_type='txt', file_size=1,
+                        status=status, contract_type=contract_type)
+    db.session.add(contract)
+    db.session.commit()
+    return contract
+
+
+def test_counters_follow_inserts_updates_and_deletes(app):
+    first = add_contract()
+    second = add_contract()
+    assert counters() == {'total': 2, 'status:processing': 2}
+
+    first.status, first.contract_type = 'completed', 'rental'
+    second.status = 'error'
+    db.session.commit()
+    assert counters() == {'total': 2, 'status:completed': 1, 'status:error': 1, 'type:rental': 1}
+
+    db.session.delete(first)
+    db.session.commit()
+    assert counters() == {'total': 1, 'status:error': 1}
+
+
+def test_bulk_inserts_are_counted(app):
+    rows = [{'status': 'processing'}, {'status': 'completed', 'contract_type': 'insurance'}]
+    record_bulk_insert(rows)
+    db.session.commit()
+    assert counters() == {'total': 2, 'status:processing': 1, 'status:completed': 1, 'type:insurance': 1}
+
+
+def test_rebuild_matches_incremental_counts(app):
+    add_contract('completed', 'financing')
+    add_contract('completed', 'rental')
+    contract = add_contract()
+    contract.status = 'error'
+    db.session.commit()
+
+    incremental = counters()
+    rebuild_counters()
+    assert counters() == incremental
+
+
+def test_stats_response(app):
+    add_contract('completed', 'financing')
+    add_contract()
+    stats_cache.invalidate()
+    assert get_contract_stats() == {
+        'total_contracts': 2,
+        'completed_contracts': 1,
+        'processing_contracts': 1,
+        'error_contracts': 0,
+        'contract_types': {'financing': 1, 'rental': 0, 'insurance': 0},
+    }
@@ -0,0 +1,110 @@
+import sqlite3
+import zlib
+
+import pytest
+
+from conftest import create_test_app
+from src.models.user import db
+from src.models.contract import Contract, ContractField, ProcessingJob
+from src.services.contract_stats import ensure_counters, get_contract_stats, stats_cache
+from src.services.database import LATEST_VERSION
+
+# contracts as created by the first prototype
+PROTOTYPE_SCHEMA = '''
+CREATE TABLE contracts (
+    id INTEGER NOT NULL, title VARCHAR(255) NOT NULL, contract_type VARCHAR(50) NOT NULL,
+    extracted_data TEXT, PRIMARY KEY (id)
+);
+INSERT INTO contracts (title, contract_type, extracted_data) VALUES ('Aluguel', 'rental', '{}');
+'''
+
+# contracts before any migration, with the text stored inline
+ORIGINAL_SCHEMA = '''
+CREATE TABLE contracts (
+    id INTEGER NOT NULL, original_filename VARCHAR(255) NOT NULL, file_path VARCHAR(500) NOT NULL,
+    file_type VARCHAR(10) NOT NULL, file_size INTEGER NOT NULL, status VARCHAR(20), extracted_text TEXT,
+    contract_type VARCHAR(50), extracted_data_json TEXT, created_at DATETIME, updated_at DATETIME,
+    PRIMARY KEY (id)
+);
+'''
+
+
+@pytest.fixture
+def open_app(tmp_path, database_path):
+    """Start an app on the test database, as a restarted server would"""
+    contexts = []
+
+    def open_app():
+        context = create_test_app(database_path, str(tmp_path / 'uploads')).app_context()
+        context.push()
+        contexts.append(context)
+    yield open_app
+    for context in reversed(contexts):
+        context.pop()
+
+
+def applied_versions(database_path):
+    with sqlite3.connect(database_path) as connection:
+        return [version for version, in connection.execute('SELECT version FROM schema_migrations ORDER BY version')]
+
+
+def test_prototype_contracts_table_is_set_aside(open_app, database_path):
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript(PROTOTYPE_SCHEMA)
+
+    open_app()
+    ensure_counters()
+
+    assert Contract.query.count() == 0
+    assert db.session.execute(db.text('SELECT title FROM contracts_legacy')).scalars().all() == ['Aluguel']
+    assert applied_versions(database_path) == list(range(1, LATEST_VERSION + 1))
+
+
+def test_original_schema_is_migrated(open_app, database_path):
+    text = 'CONTRATO DE LOCAÇÃO, aluguel mensal de R$ 1.500,00'
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript(ORIGINAL_SCHEMA)
+        connection.executemany(
+            'INSERT INTO contracts (original_filename, file_path, file_type, file_size, status, extracted_text, '
+            "contract_type, extracted_data_json, created_at) VALUES ('a.txt', 'a.txt', 'txt', 1, ?, ?, ?, ?, "
+            "'2025-01-01 00:00:00')",
+            [('completed', text, 'rental', '{"valor_aluguel": "R$ 1.500,00"}'), ('processing', None, None, None)]
+        )
+
+    open_app()
+    ensure_counters()
+    stats_cache.invalidate()
+
+    assert applied_versions(database_path) == list(range(1, LATEST_VERSION + 1))
+    contract = db.session.get(Contract, 1)
+    assert contract.extracted_text == text
+    assert zlib.decompress(contract.text_record.compressed_text).decode() == text
+    field = ContractField.query.filter_by(contract_id=1).one()
+    assert (field.key, field.kind, field.number) == ('valor_aluguel', 'money', 1500.0)
+    assert get_contract_stats()['completed_contracts'] == 1
+    assert get_contract_stats()['processing_contracts'] == 1
+    # Only stored jobs are claimed; the stuck contract gets one when processing starts
+    assert ProcessingJob.query.count() == 0
+
+
+def test_job_lanes_migration(open_app, database_path):
+    open_app()
+    db.session.remove()
+    with sqlite3.connect(database_path) as connection:
+        connection.executescript('''
+            DROP INDEX ix_processing_jobs_status_lane_rank;
+            ALTER TABLE processing_jobs DROP COLUMN lane;
+            ALTER TABLE processing_jobs DROP COLUMN cost;
+            ALTER TABLE processing_jobs DROP COLUMN rank_at;
+            DELETE FROM schema_migrations WHERE version = 9;
+            INSERT INTO contracts (original_filename, file_path, file_type, file_size, status)
+                VALUES ('a.txt', 'a.txt', 'txt', 1, 'processing');
+            INSERT INTO processing_jobs (contract_id, status, attempts, max_attempts, available_at)
+                VALUES (1, 'queued', 0, 3, '2025-01-01 00:00:00');
+        ''')
+
+    open_app()
+    job = ProcessingJob.query.one()
+    assert (job.lane, job.cost) == ('fast', None)
+    assert job.rank_at == job.available_at
+    assert applied_versions(database_path)[-1] == 9
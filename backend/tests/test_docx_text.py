@@ -0,0 +1,83 @@
+import zipfile
+
+import docx
+import pytest
+from lxml import etree
+
+from src.services.docx_text import iter_docx_lines
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+
+
+def write_docx(path, document_xml):
+    """A minimal package around a hand-written word/document.xml"""
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('_rels/.rels', PACKAGE_RELS)
+        archive.writestr('word/document.xml', document_xml)
+    return str(path)
+
+
+def test_paragraphs_tables_headers_and_footers(tmp_path):
+    document = docx.Document()
+    document.sections[0].header.paragraphs[0].text = 'CONTRATO 123'
+    document.sections[0].footer.paragraphs[0].text = 'Página final'
+    document.add_paragraph('Primeira cláusula')
+    table = document.add_table(rows=2, cols=2)
+    for row, values in zip(table.rows, (('Valor', 'R$ 1.500,00'), ('Prazo', '30 meses'))):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+    document.add_paragraph('Segunda\tcláusula')
+    path = str(tmp_path / 'contract.docx')
+    document.save(path)
+
+    assert ''.join(iter_docx_lines(path)) == (
+        'CONTRATO 123\n'
+        'Primeira cláusula\n'
+        'Valor\tR$ 1.500,00\n'
+        'Prazo\t30 meses\n'
+        'Segunda\tcláusula\n'
+        'Página final\n'
+    )
+
+
+def test_external_entities_are_not_resolved(tmp_path):
+    secret = tmp_path / 'secret.txt'
+    secret.write_text('SECRETXYZ')
+    path = write_docx(tmp_path / 'xxe.docx', (
+        f'<?xml version="1.0"?><!DOCTYPE d [<!ENTITY x SYSTEM "file://{secret}">]>'
+        f'<w:document xmlns:w="{W}"><w:body><w:p><w:r><w:t>a&x;b</w:t></w:r></w:p></w:body></w:document>'
+    ))
+    text = ''.join(iter_docx_lines(path))
+    assert 'SECRETXYZ' not in text
+    assert text.startswith('a')
+
+
+def test_entity_expansion_is_not_performed(tmp_path):
+    entities = '<!ENTITY a "AAAAAAAAAA">' + ''.join(
+        f'<!ENTITY {name} "{("&" + previous + ";") * 10}">'
+        for previous, name in zip('abcdefgh', 'bcdefghi')
+    )
+    path = write_docx(tmp_path / 'laughs.docx', (
+        f'<?xml version="1.0"?><!DOCTYPE d [{entities}]>'
+        f'<w:document xmlns:w="{W}"><w:body><w:p><w:r><w:t>&i;</w:t></w:r></w:p></w:body></w:document>'
+    ))
+    try:
+        text = ''.join(iter_docx_lines(path))
+    except etree.XMLSyntaxError:
+        # libxml2 refusing the document (amplification limit) is fine too; expanding it is not
+        return
+    assert len(text) < 1000
+
+
+def test_invalid_archive_raises(tmp_path):
+    path = tmp_path / 'broken.docx'
+    path.write_bytes(b'PK\x03\x04 not really a zip')
+    with pytest.raises(zipfile.BadZipFile):
+        list(iter_docx_lines(str(path)))
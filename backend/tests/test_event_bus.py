@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from src.services.event_bus import EventBus, event_bus
+
+
+def status(contract_id, batch_id=None):
+    return {'type': 'status', 'id': contract_id, 'status': 'completed', 'batch_id': batch_id}
+
+
+def drain(subscription):
+    events = []
+    while (event := subscription.get(timeout=0)) is not None:
+        events.append(event)
+    return events
+
+
+def test_ids_increase_and_do_not_restart_at_one():
+    bus = EventBus()
+    first, second = bus.publish(status(1)), bus.publish(status(2))
+    assert second['event_id'] == first['event_id'] + 1
+    assert first['event_id'] > 1000
+
+
+def test_subscribe_replays_matching_events_after_the_last_id():
+    bus = EventBus()
+    first = bus.publish(status(1, 'b1'))
+    bus.publish(status(2, 'b2'))
+    third = bus.publish(status(3, 'b1'))
+
+    subscription = bus.subscribe(batch_id='b1', last_event_id=first['event_id'])
+    assert [event['event_id'] for event in drain(subscription)] == [third['event_id']]
+    assert not subscription.lagged
+
+    bus.publish(status(4, 'b2'))
+    fifth = bus.publish(status(5, 'b1'))
+    assert drain(subscription) == [fifth]
+
+
+def test_subscribe_is_lagged_when_missed_events_were_dropped():
+    bus = EventBus(history_size=2)
+    first = bus.publish(status(1))
+    for contract_id in range(2, 5):
+        bus.publish(status(contract_id))
+    subscription = bus.subscribe(last_event_id=first['event_id'])
+    assert subscription.lagged
+
+    # The newest kept events are still replayed up to date
+    assert not bus.subscribe(last_event_id=first['event_id'] + 2).lagged
+
+
+@pytest.mark.parametrize('published', [0, 3])
+def test_subscribe_is_lagged_for_ids_from_another_process(published):
+    old = EventBus().publish(status(1))
+    bus = EventBus()
+    newest = None
+    for contract_id in range(published):
+        newest = bus.publish(status(contract_id))
+    assert bus.subscribe(last_event_id=old['event_id'] + 1000).lagged
+    if newest:
+        assert not bus.subscribe(last_event_id=newest['event_id']).lagged
+
+
+def test_slow_subscriber_is_lagged():
+    bus = EventBus(max_pending=2)
+    subscription = bus.subscribe()
+    for contract_id in range(3):
+        bus.publish(status(contract_id))
+    assert subscription.lagged
+    assert len(drain(subscription)) == 2
+
+
+def stream(client, **headers):
+    response = client.get('/api/contracts/events?contract_id=424242', headers=headers)
+    assert response.status_code == 200
+    return [
+        json.loads(line[len('data: '):])
+        for line in response.get_data(as_text=True).splitlines() if line.startswith('data: ')
+    ]
+
+
+@pytest.fixture
+def short_streams(app):
+    app.config.update(EVENTS_MAX_DURATION=0.2, EVENTS_KEEPALIVE=0.05)
+
+
+def test_stream_resumes_after_last_event_id(client, short_streams):
+    first = event_bus.publish(status(424242))
+    second = event_bus.publish(status(424242))
+    assert [event['event_id'] for event in stream(client, **{'Last-Event-ID': first['event_id']})] == [
+        second['event_id']
+    ]
+
+
+def test_stream_asks_for_resync_on_unknown_last_event_id(client, short_streams):
+    newest = event_bus.publish(status(424242))
+    assert stream(client, **{'Last-Event-ID': newest['event_id'] + 1}) == [{'type': 'resync'}]
+    assert stream(client, **{'Last-Event-ID': 5}) == [{'type': 'resync'}]
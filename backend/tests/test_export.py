@@ -0,0 +1,35 @@
+import json
+from datetime import datetime, timedelta
+
+from src.models.user import db
+from src.models.contract import Contract
+
+
+def export_ids(client, **args):
+    response = client.get('/api/contracts/export', query_string=args)
+    assert response.status_code == 200
+    ids = [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()]
+    return ids, response.headers['X-Export-Time']
+
+
+def test_incremental_export_catches_late_commits(client, upload):
+    first = upload('CONTRATO DE LOCAÇÃO um')['contract_id']
+    ids, export_time = export_ids(client)
+    assert ids == [first]
+
+    # Flushed (updated_at set) just before that export, committed only after it
+    late = upload('CONTRATO DE LOCAÇÃO dois')['contract_id']
+    contract = db.session.get(Contract, late)
+    contract.updated_at = datetime.utcnow() - timedelta(seconds=30)
+    db.session.commit()
+
+    ids, _ = export_ids(client, since=export_time)
+    assert late in ids
+
+
+def test_export_csv_has_header_and_rows(client, upload):
+    upload('CONTRATO DE SEGURO, apólice')
+    response = client.get('/api/contracts/export?format=csv')
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith('id,original_filename')
+    assert len(lines) == 2
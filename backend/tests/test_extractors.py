@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from src_layout import BACKEND_DIR, BOOTSTRAP
+from src.services.extractors import ExtractorRegistry, extractor_registry
+
+HEAVY_MODULES = ['fitz', 'PIL', 'pytesseract', 'lxml', 'docx']
+
+IMPORT_CODE = BOOTSTRAP + f'''
+import json, sys
+import src.routes.contracts
+from src.services.extractors import extractor_registry
+print(json.dumps({{
+    'loaded': extractor_registry.loaded(),
+    'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+'''
+
+
+def test_importing_the_routes_loads_no_extraction_library():
+    output = subprocess.run([sys.executable, '-c', IMPORT_CODE], cwd=BACKEND_DIR, capture_output=True,
+                            text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == {'loaded': [], 'heavy': []}
+
+
+def test_default_extensions():
+    assert extractor_registry.extensions == {'pdf', 'docx', 'doc', 'jpg', 'jpeg', 'png', 'tiff', 'bmp', 'txt'}
+
+
+def test_get_imports_the_backend_once():
+    registry = ExtractorRegistry()
+    registry.register('text', ['TXT', 'md'], 'textwrap:dedent')
+    assert registry.loaded() == []
+    assert registry.get('md') is textwrap.dedent
+    assert registry.get('Txt') is textwrap.dedent
+    assert registry.loaded() == ['text']
+
+
+def test_register_replaces_the_extensions_of_the_same_name():
+    registry = ExtractorRegistry()
+    registry.register('docx', ['docx', 'doc'], 'textwrap:dedent')
+    registry.get('doc')
+    registry.register('docx', ['docx'], 'textwrap:indent')
+
+    assert registry.extensions == {'docx'}
+    assert registry.get('docx') is textwrap.indent
+    with pytest.raises(ValueError, match='Unsupported file type: doc'):
+        registry.get('doc')
+
+
+def test_register_takes_over_an_extension_of_another_backend():
+    registry = ExtractorRegistry()
+    registry.register('txt', ['txt'], 'textwrap:dedent')
+    registry.register('markdown', ['txt', 'md'], 'textwrap:indent')
+    assert registry.get('txt') is textwrap.indent
+
+
+def test_get_rejects_unknown_types():
+    with pytest.raises(ValueError, match='Unsupported file type: exe'):
+        extractor_registry.get('exe')
+    with pytest.raises(ValueError, match='Unsupported file type'):
+        extractor_registry.get('')
+
+
+def test_register_rejects_targets_without_a_function():
+    with pytest.raises(ValueError, match="'module:function'"):
+        ExtractorRegistry().register('txt', ['txt'], 'textwrap')
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+from src.services.field_extractor import FieldRegistry, field_registry
+
+FINANCING_TEXT = (
+    'CONTRATO DE FINANCIAMENTO. Valor financiado de R$ 250.000,00 pago em 360 parcelas de R$ 2.100,50 cada\n'
+    'Juros de 1,5% a.m. e 19,56% a.a., sistema SAC. Primeiro vencimento em 10/05/2025.\n'
+)
+RENTAL_TEXT = (
+    'CONTRATO DE LOCAÇÃO pelo prazo de 30 meses. Aluguel de R$ 1.500,00 e caução de R$ 4.500,00 na assinatura\n'
+    'Multa rescisória de 3 aluguéis, ou seja 10% do contrato. Início em 01/02/2025.\n'
+)
+INSURANCE_TEXT = (
+    'APÓLICE DE SEGURO. Prêmio de R$ 900,00 ao ano\nCobertura por sinistro até R$ 80.000,00 por evento\n'
+    'Franquia de R$ 2.000,00 por ocorrência\n'
+)
+
+
+@pytest.fixture(scope='module')
+def extractor():
+    return field_registry.compile()
+
+
+def test_financing_fields(extractor):
+    assert extractor.extract(FINANCING_TEXT, 'financing') == {
+        'valores_monetarios': ['R$ 250.000,00', 'R$ 2.100,50'],
+        'valor_financiado': 'R$ 250.000,00',
+        'valor_parcela': 'R$ 2.100,50',
+        'taxas_juros': ['1,5% a.m.', '19,56% a.a.'],
+        'numero_parcelas': '360',
+        'datas': ['10/05/2025'],
+        'sistema_amortizacao': 'SAC',
+    }
+
+
+def test_rental_fields(extractor):
+    data = extractor.extract(RENTAL_TEXT, 'rental')
+    assert (data['valor_aluguel'], data['valor_caucao']) == ('R$ 1.500,00', 'R$ 4.500,00')
+    assert data['prazo_locacao'] == '30'
+    assert data['multa_rescisao'] == '10%'
+    assert data['datas'] == ['01/02/2025']
+
+
+def test_insurance_tails(extractor):
+    data = extractor.extract(INSURANCE_TEXT, 'insurance')
+    assert data['premio_seguro'] == 'R$ 900,00'
+    assert data['valor_cobertura'] == 'R$ 80.000,00'
+    assert data['franquia'] == 'R$ 2.000,00'
+
+
+@pytest.mark.parametrize('text, contract_type, key', [
+    ('R$ 1.500,00 meses', 'rental', 'prazo_locacao'),
+    ('10/12/2024 parcelas', 'financing', 'numero_parcelas'),
+    ('R$ 2% a.m.', 'financing', 'taxas_juros'),
+    ('R$ 10/12/2024', 'financing', 'datas'),
+])
+def test_tokens_do_not_overlap(extractor, text, contract_type, key):
+    """Text already taken by an earlier token match can't start another token"""
+    assert key not in extractor.extract(text, contract_type)
+
+
+def test_registry_scopes_flags_to_their_token():
+    registry = FieldRegistry()
+    registry.register_token('word', r'multa', re.IGNORECASE)
+    registry.register_token('code', r'ABC')
+    registry.register_field('general', 'words', 'word')
+    registry.register_field('general', 'codes', 'code')
+    assert registry.compile().extract('MULTA abc ABC', 'general') == {'words': ['MULTA'], 'codes': ['ABC']}
+
+
+def test_unknown_token_is_rejected():
+    with pytest.raises(ValueError):
+        FieldRegistry().register_field('general', 'key', 'missing')
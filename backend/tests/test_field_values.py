@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+import pytest
+
+from src.models.user import db
+from src.models.contract import Contract
+from src.services.field_values import field_histogram, field_values_query, normalize_value, set_contract_fields
+
+
+def add_contract(status='completed', contract_type='financing', **data):
+    contract = Contract(original_filename='a.pdf', file_path='a.pdf', file_type='pdf', file_size=1,
+                        status=status, contract_type=contract_type)
+    set_contract_fields(contract, data)
+    db.session.add(contract)
+    db.session.commit()
+    return contract
+
+
+@pytest.mark.parametrize('raw, kind, number', [
+    ('R$ 1.234,56', 'money', Decimal('1234.56')),
+    ('R$ 250.000', 'money', Decimal('250000')),
+    ('R$ 99.5', 'money', Decimal('99.5')),
+    ('1,5% a.m.', 'rate', Decimal('1.5')),
+    ('360', 'number', Decimal('360')),
+    ('Banco do Brasil', 'text', None),
+])
+def test_normalize_value(raw, kind, number):
+    values = normalize_value(raw)
+    assert (values['kind'], values['number']) == (kind, number)
+
+
+def test_normalize_rate_converts_periods():
+    values = normalize_value('12% a.a.')
+    assert values['rate_annual'] == 12.0
+    assert values['rate_monthly'] == pytest.approx(0.9489, abs=1e-4)
+
+
+def test_histogram_bins(app):
+    for amount in ('R$ 100,00', 'R$ 150,00', 'R$ 200,00', 'R$ 500,00'):
+        add_contract(valor_financiado=amount)
+
+    histogram = field_histogram(field_values_query('valor_financiado', 'number'), 'number', 4)
+    assert [(bin['lower'], bin['upper'], bin['count']) for bin in histogram] == [
+        (100.0, 200.0, 2), (200.0, 300.0, 1), (300.0, 400.0, 0), (400.0, 500.0, 1)
+    ]
+
+
+def test_histogram_of_equal_values_has_one_bin(app):
+    for _ in range(3):
+        add_contract(valor_financiado='R$ 1.000,00')
+
+    histogram = field_histogram(field_values_query('valor_financiado', 'number'), 'number', 10)
+    assert histogram == [{'lower': 1000.0, 'upper': 1000.0, 'count': 3}]
+
+
+def test_histogram_without_values(app):
+    assert field_histogram(field_values_query('valor_financiado', 'number'), 'number', 10) == []
+
+
+def test_aggregate_route_groups_by_type(client):
+    add_contract(valor_financiado='R$ 100,00')
+    add_contract(valor_financiado='R$ 300,00')
+    add_contract(contract_type='rental', valor_financiado='R$ 50,00')
+
+    response = client.get('/api/contracts/fields/aggregate?field=valor_financiado&group_by=contract_type')
+    groups = {group['group']: group for group in response.json['groups']}
+    assert (groups['financing']['count'], groups['financing']['avg']) == (2, 200.0)
+    assert groups['rental']['sum'] == 50.0
@@ -0,0 +1,243 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+from src_layout import BACKEND_DIR, BOOTSTRAP
+from src.models.user import db
+from src.models.contract import Contract, ContractCounter, ProcessingJob
+from src.services.job_cost import FAST_LANE, HEAVY_LANE, JobEstimate
+from src.services.event_bus import event_bus
+from src.services.job_queue import ContractStatusWatcher, JobQueue, job_queue
+
+RENTAL_TEXT = 'CONTRATO DE LOCAÇÃO entre LOCADOR e LOCATÁRIO, aluguel mensal de R$ 1.500,00 do imóvel, caução'
+
+# worker.py's setup, draining the queue instead of polling it
+WORKER_CODE = BOOTSTRAP + '''
+import worker
+from src.services.contract_processing import configure_processor
+from src.services.job_queue import JobWorker, job_queue
+app = worker.create_app()
+configure_processor(app.config)
+JobWorker(app, job_queue).drain()
+'''
+
+
+def counters():
+    db.session.expire_all()
+    return dict(db.session.query(ContractCounter.name, ContractCounter.value).all())
+
+
+def test_external_worker_updates_counters(app, upload, database_path):
+    contract_id = upload(RENTAL_TEXT)['contract_id']
+    assert counters() == {'total': 1, 'status:processing': 1}
+
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + database_path)
+    subprocess.run([sys.executable, '-c', WORKER_CODE], env=env, cwd=BACKEND_DIR, check=True)
+
+    assert db.session.get(Contract, contract_id).status == 'completed'
+    assert counters() == {'total': 1, 'status:processing': 0, 'status:completed': 1, 'type:rental': 1}
+
+
+def add_contracts(count):
+    contracts = [
+        Contract(original_filename=f'{number}.txt', file_path=f'/missing/{number}.txt', file_type='txt',
+                 file_size=1, status='processing')
+        for number in range(count)
+    ]
+    db.session.add_all(contracts)
+    db.session.flush()
+    return [contract.id for contract in contracts]
+
+
+def queued(ids, queue, estimates=None):
+    queue.enqueue(ids, estimates)
+    db.session.commit()
+
+
+def job_of(contract_id):
+    db.session.expire_all()
+    return ProcessingJob.query.filter_by(contract_id=contract_id).one()
+
+
+def test_claim_leases_a_job_once(app):
+    queue = JobQueue(lease_seconds=60)
+    contract_id, = add_contracts(1)
+    queued([contract_id], queue)
+
+    job = queue.claim('worker-a')
+    assert (job.contract_id, job.attempts, job.owner) == (contract_id, 1, 'worker-a')
+    assert queue.claim('worker-b') is None
+    stored = job_of(contract_id)
+    assert stored.status == 'running'
+    assert stored.lease_expires_at > datetime.utcnow() + timedelta(seconds=50)
+
+    assert queue.complete(job)
+    db.session.commit()
+    assert job_of(contract_id).status == 'done'
+
+
+def test_expired_lease_moves_the_job_to_another_worker(app):
+    queue = JobQueue(lease_seconds=60)
+    contract_id, = add_contracts(1)
+    queued([contract_id], queue)
+    first = queue.claim('worker-a')
+
+    assert queue.reclaim_expired() == (0, 0)
+    job = job_of(contract_id)
+    job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert queue.reclaim_expired() == (1, 0)
+
+    second = queue.claim('worker-b')
+    assert second.attempts == 2
+    # The first worker finds out when it renews or completes
+    assert not queue.heartbeat(first)
+    assert not queue.complete(first)
+    assert queue.heartbeat(second)
+
+
+def test_failed_job_is_retried_after_backoff_then_fails_its_contract(app):
+    queue = JobQueue(max_attempts=2, backoff_seconds=30)
+    contract_id, = add_contracts(1)
+    queued([contract_id], queue)
+
+    assert queue.fail(queue.claim('worker'), 'boom') is True
+    job = job_of(contract_id)
+    assert job.status == 'queued' and job.last_error == 'boom'
+    delay = (job.available_at - datetime.utcnow()).total_seconds()
+    assert 25 < delay <= 33
+    assert queue.claim('worker') is None
+
+    job.available_at = job.rank_at = datetime.utcnow()
+    db.session.commit()
+    assert queue.fail(queue.claim('worker'), 'boom again') is False
+    assert job_of(contract_id).status == 'failed'
+    assert db.session.get(Contract, contract_id).status == 'error'
+
+
+def test_lost_lease_on_last_attempt_fails_the_contract(app):
+    queue = JobQueue(max_attempts=1)
+    contract_id, = add_contracts(1)
+    queued([contract_id], queue)
+    queue.claim('worker')
+
+    assert queue.reclaim_expired(all_running=True) == (0, 1)
+    assert db.session.get(Contract, contract_id).status == 'error'
+
+
+def test_backoff_doubles_up_to_the_maximum():
+    queue = JobQueue(backoff_seconds=10, max_backoff_seconds=60)
+    for attempts, expected in ((1, 10), (2, 20), (3, 40), (4, 60), (10, 60)):
+        assert expected * 0.9 <= queue.backoff(attempts) <= expected * 1.1
+
+
+def test_cheap_jobs_go_first_but_old_jobs_are_not_starved(app):
+    queue = JobQueue(aging_factor=2.0)
+    heavy, light = add_contracts(2)
+    queued([heavy, light], queue, [JobEstimate(HEAVY_LANE, 100.0), JobEstimate(FAST_LANE, 0.1)])
+    assert queue.claim('worker').contract_id == light
+
+    # A heavy job due 300 seconds ago outranks a cheap one due now
+    job = job_of(heavy)
+    job.status = 'queued'
+    job.rank_at = queue.rank_at(datetime.utcnow() - timedelta(seconds=300), job.cost)
+    db.session.commit()
+    newer, = add_contracts(1)
+    queued([newer], queue, [JobEstimate(FAST_LANE, 0.1)])
+    assert queue.claim('worker').contract_id == heavy
+
+
+def test_lane_limits_keep_a_slot_for_the_other_lane(app):
+    queue = JobQueue(lane_limits={FAST_LANE: 2, HEAVY_LANE: 1})
+    ids = add_contracts(3)
+    queued(ids, queue, [JobEstimate(HEAVY_LANE, 10.0)] * 3)
+
+    first = queue.claim_next('worker')
+    assert first.lane == HEAVY_LANE
+    assert queue.claim_next('worker') is None
+
+    fast, = add_contracts(1)
+    queued([fast], queue, [JobEstimate(FAST_LANE, 0.1)])
+    assert queue.claim_next('worker').contract_id == fast
+
+    queue.release_lane(first.lane)
+    assert queue.claim_next('worker').lane == HEAVY_LANE
+    assert queue.lane_stats()[HEAVY_LANE]['running'] == 2
+
+
+def test_stuck_contracts_get_a_job(app):
+    queue = JobQueue()
+    contract_id, = add_contracts(1)
+    db.session.commit()
+    assert queue.recover_stuck_contracts() == 1
+    assert queue.recover_stuck_contracts() == 0
+    assert job_of(contract_id).status == 'queued'
+
+
+def test_worker_retries_a_job_that_raises(app, run_jobs):
+    contract_id, = add_contracts(1)
+    queued([contract_id], job_queue)
+    run_jobs()
+
+    job = job_of(contract_id)
+    assert (job.status, job.attempts) == ('queued', 1)
+    assert '/missing/0.txt' in job.last_error
+    assert job.available_at > datetime.utcnow()
+    assert db.session.get(Contract, contract_id).status == 'processing'
+
+
+def finished_contract(updated_at, status='completed'):
+    contract = Contract(original_filename='a.txt', file_path='a.txt', file_type='txt', file_size=1,
+                        status=status, contract_type='rental', updated_at=updated_at)
+    db.session.add(contract)
+    db.session.commit()
+    return contract.id
+
+
+def published_ids(subscription):
+    ids = []
+    while (event := subscription.get(0)) is not None:
+        ids.append(event['id'])
+    return ids
+
+
+@pytest.fixture
+def subscription():
+    subscription = event_bus.subscribe()
+    yield subscription
+    event_bus.unsubscribe(subscription)
+
+
+def test_status_watcher_publishes_late_commits_once(app, subscription):
+    now = datetime.utcnow()
+    finished_contract(now - timedelta(seconds=5))
+    watcher = ContractStatusWatcher(app)
+    assert watcher.poll() == 0
+
+    newer = finished_contract(now)
+    # Flushed before the previous poll, committed after it
+    late = finished_contract(now - timedelta(seconds=2))
+    assert watcher.poll() == 2
+    assert published_ids(subscription) == [late, newer]
+    assert watcher.poll() == 0
+
+    contract = db.session.get(Contract, late)
+    contract.status = 'error'
+    db.session.commit()
+    assert watcher.poll() == 1
+    assert published_ids(subscription) == [late]
+
+
+def test_status_watcher_reads_past_the_batch_size_on_ties(app, subscription):
+    watcher = ContractStatusWatcher(app, batch_size=2)
+    watcher.poll()
+    updated_at = datetime.utcnow()
+    ids = [finished_contract(updated_at) for _ in range(5)]
+    finished_contract(updated_at, status='processing')
+
+    assert watcher.poll() == 5
+    assert published_ids(subscription) == ids
+    assert watcher.poll() == 0
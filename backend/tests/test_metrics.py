@@ -0,0 +1,104 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.services.metrics import MetricsRegistry, serve_metrics
+
+
+def parse(text):
+    """Samples of a Prometheus text exposition, by series name with labels"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            samples[series] = float(value)
+    return samples
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter('uploads_total', 'Uploads', labelnames=('filename', 'status'))
+    counter.inc(filename='a "b"\\c\nd.txt', status='ok')
+    counter.inc(2, filename='plain.txt')
+    assert registry.render().splitlines() == [
+        '# HELP uploads_total Uploads',
+        '# TYPE uploads_total counter',
+        'uploads_total{filename="a \\"b\\"\\\\c\\nd.txt",status="ok"} 1',
+        'uploads_total{filename="plain.txt",status=""} 2',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('wait_seconds', 'Wait', buckets=(1, 0.1, 10), labelnames=('lane',))
+    for value in (0.1, 0.5, 2, 60):
+        histogram.observe(value, lane='fast')
+    histogram.observe(0.05, lane='heavy')
+
+    samples = parse(registry.render())
+    # Bounds are inclusive and sorted; +Inf counts every observation
+    assert [samples[f'wait_seconds_bucket{{lane="fast",le="{bound}"}}'] for bound in ('0.1', '1', '10', '+Inf')] \
+        == [1, 2, 3, 4]
+    assert samples['wait_seconds_sum{lane="fast"}'] == 62.6
+    assert samples['wait_seconds_count{lane="fast"}'] == 4
+    assert samples['wait_seconds_count{lane="heavy"}'] == 1
+    assert '# TYPE wait_seconds histogram' in registry.render()
+
+
+def test_callbacks_are_read_at_render_time():
+    registry = MetricsRegistry()
+    depth = [3]
+    registry.callback('queue_depth', 'Depth', lambda: depth[0])
+    assert parse(registry.render()) == {'queue_depth': 3}
+    depth[0] = 5
+    assert parse(registry.render()) == {'queue_depth': 5}
+
+    # Registering the name again replaces the callback, keeping one series
+    registry.callback('queue_depth', 'Depth', lambda: 7, kind='counter')
+    assert registry.render().splitlines()[1:] == ['# TYPE queue_depth counter', 'queue_depth 7']
+    assert registry.counter('jobs_total', 'Jobs') is registry.counter('jobs_total', 'Other help')
+
+
+def test_metrics_route_after_a_processed_contract(client, upload, run_jobs):
+    before = parse(client.get('/api/metrics').get_data(as_text=True))
+    upload('CONTRATO DE LOCAÇÃO, aluguel mensal do imóvel, locador e locatário')
+    run_jobs()
+
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    samples = parse(text)
+
+    def added(series):
+        return samples.get(series, 0) - before.get(series, 0)
+
+    assert added('contracts_processed_total{status="completed",contract_type="rental"}') == 1
+    assert added('contract_processing_seconds_count{file_type="txt"}') == 1
+    assert added('contract_processing_seconds_bucket{file_type="txt",le="+Inf"}') == 1
+    assert added('contract_file_bytes_count{file_type="txt"}') == 1
+    assert added('contract_text_chars_bucket{file_type="txt",le="1000.0"}') == 1
+    for stage in ('extract_text', 'classify', 'extract_fields'):
+        assert added(f'contract_stage_seconds_count{{stage="{stage}",file_type="txt"}}') == 1
+    assert added('processing_job_wait_seconds_count{lane="fast"}') == 1
+    for name in ('processing_queue_depth', 'processing_jobs_pending', 'event_stream_subscribers'):
+        assert name in samples
+    assert '# TYPE contract_stage_seconds histogram' in text
+
+
+def test_serve_metrics_renders_the_registry():
+    registry = MetricsRegistry()
+    registry.counter('jobs_total', 'Jobs').inc(3)
+    server = serve_metrics(0, host='127.0.0.1', registry=registry)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with urllib.request.urlopen(f'{base}/metrics', timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert response.read().decode() == registry.render()
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f'{base}/other', timeout=5)
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
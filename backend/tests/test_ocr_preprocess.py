@@ -0,0 +1,93 @@
+import os
+
+import pytest
+import pytesseract
+from PIL import Image, ImageDraw
+
+from src.services.ocr_preprocess import OCRCache, estimate_skew, ocr_image, otsu_threshold, preprocess
+from src.services.ocr_settings import OCRSettings
+
+
+def text_page(width=800, height=1000, color='L'):
+    """White page with dark bars where lines of text would be"""
+    page = Image.new(color, (width, height), 'white')
+    draw = ImageDraw.Draw(page)
+    for top in range(80, height - 80, 40):
+        draw.rectangle((80, top, width - 80, top + 12), fill='black')
+    return page
+
+
+def test_otsu_threshold_separates_two_levels():
+    gray = Image.new('L', (100, 100), 200)
+    gray.paste(40, (0, 0, 30, 100))
+    assert 40 <= otsu_threshold(gray) < 200
+
+
+def test_estimate_skew_finds_the_rotation():
+    page = text_page()
+    assert estimate_skew(page, 5.0) == 0.0
+    assert estimate_skew(page.rotate(3, fillcolor=255), 5.0) == pytest.approx(-3, abs=0.2)
+    assert estimate_skew(page.rotate(3, fillcolor=255), 0) == 0.0
+
+
+def test_preprocess_downscales_binarizes_and_straightens():
+    page = text_page(1600, 2000, 'RGB').rotate(-2, fillcolor='white')
+    page.info['dpi'] = (400, 400)
+
+    result = preprocess(page, OCRSettings(target_dpi=200))
+    assert result.mode == 'L'
+    # Half the resolution, plus the margin added by straightening
+    assert 800 <= result.width < 900
+    assert estimate_skew(result, 5.0) == 0.0
+
+    flat = preprocess(page, OCRSettings(target_dpi=200, deskew=False))
+    assert flat.size == (800, 1000)
+    assert set(flat.getdata()) == {0, 255}
+
+
+@pytest.fixture
+def tesseract_calls(monkeypatch):
+    calls = []
+
+    def image_to_string(image, lang=None, config=None):
+        calls.append(config)
+        return 'CONTRATO DE LOCAÇÃO'
+    monkeypatch.setattr(pytesseract, 'image_to_string', image_to_string)
+    return calls
+
+
+def test_ocr_image_uses_the_cache(tmp_path, tesseract_calls):
+    cache = OCRCache(str(tmp_path))
+    page = text_page()
+    settings = OCRSettings(deskew=False)
+
+    assert ocr_image(page, settings, cache) == ('CONTRATO DE LOCAÇÃO', False)
+    assert ocr_image(page, settings, cache) == ('CONTRATO DE LOCAÇÃO', True)
+    assert len(tesseract_calls) == 1
+    # Other settings may read the page differently
+    assert ocr_image(page, settings._replace(psm=6), cache) == ('CONTRATO DE LOCAÇÃO', False)
+    assert tesseract_calls == ['--psm 3', '--psm 6']
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = OCRCache(str(tmp_path), max_bytes=2000, prune_interval=3600)
+    for number, key in enumerate(['aa1', 'bb2', 'cc3']):
+        cache.put(key, 'x' * 1000)
+        os.utime(cache._path(key), (1000 + number, 1000 + number))
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get('aa1') == 'x' * 1000
+
+    assert cache.prune() == 2
+    assert cache.get('aa1') == 'x' * 1000
+    assert cache.get('bb2') is None and cache.get('cc3') is None
+
+
+def test_cache_prunes_at_most_once_per_interval(tmp_path):
+    cache = OCRCache(str(tmp_path), max_bytes=1500, prune_interval=3600)
+    cache.put('aa1', 'x' * 1000)
+    cache.put('bb2', 'x' * 1000)
+    assert cache.get('aa1') is not None and cache.get('bb2') is not None
+
+    cache.prune_interval = 0
+    cache.put('cc3', 'x' * 1000)
+    assert sum(cache.get(key) is not None for key in ['aa1', 'bb2', 'cc3']) == 1
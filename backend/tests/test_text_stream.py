@@ -0,0 +1,84 @@
+import os
+import random
+import re
+import sys
+
+import pytest
+
+from src.services.document_processor import DocumentProcessor
+from src.services.text_stream import StreamMatcher, batched_text
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from corpus import generate_corpus  # noqa: E402
+
+TEXT = (
+    'CONTRATO DE FINANCIAMENTO com garantia de alienação\n'
+    'fiduciária do imóvel, valor financiado de R$ 250.000,00 em 360 parcelas\n\n'
+    'Taxa de juros de 1,5% a.m. pelo sistema SAC.\n'
+    'Multa de 2% sobre o valor em atraso, vencimento em 10/05/2025.\n'
+)
+
+
+@pytest.fixture(scope='module')
+def processor():
+    return DocumentProcessor()
+
+
+def stream_matches(pattern, chunks):
+    matcher = StreamMatcher(pattern)
+    settled = [match for chunk in chunks for match in matcher.feed(chunk)] + matcher.finish()
+    return [(offset + match.start(), match.group()) for match, offset in settled]
+
+
+def test_keyword_split_across_line_break_and_chunks(processor):
+    split = TEXT.index('fiduci') + 6
+    tally = processor.classifier.tally()
+    tally.feed(TEXT[:split])
+    tally.feed(TEXT[split:])
+    assert tally.result() == processor.classify_contract(TEXT)
+
+
+@pytest.mark.parametrize('pattern', [
+    re.compile(r'alienação\s+fiduciária|garantia|imóvel'),
+    re.compile(r'R\$\s*[\d.,]+|\d+(?:,\d+)?%\s*(?:a\.m\.)?|\d{1,2}/\d{1,2}/\d{4}'),
+])
+def test_matches_do_not_depend_on_chunking(pattern):
+    expected = [(match.start(), match.group()) for match in pattern.finditer(TEXT)]
+    rng = random.Random(3)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(TEXT)), rng.randint(1, 8)))
+        chunks = [TEXT[start:end] for start, end in zip([0] + cuts, cuts + [len(TEXT)])]
+        assert stream_matches(pattern, chunks) == expected, chunks
+
+
+def test_fields_do_not_depend_on_chunking(processor):
+    contract_type = processor.classify_contract_type(TEXT)
+    expected = processor.extract_contract_data(TEXT, contract_type)
+    for size in (1, 7, 40, 64):
+        scan = processor.field_extractor.scanner()
+        for chunk in batched_text(TEXT[start:start + size] for start in range(0, len(TEXT), size)):
+            scan.feed(chunk)
+        assert processor.field_extractor.values(scan.finish(), contract_type) == expected
+
+
+def test_batched_text():
+    assert list(batched_text(['ab', 'c', 'de', 'f'], min_chars=3)) == ['abc', 'def']
+    assert list(batched_text(['ab', 'c', 'd'], min_chars=3)) == ['abc', 'd']
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    return generate_corpus(str(tmp_path_factory.mktemp('corpus')), page_counts=(1, 12),
+                           formats=('txt', 'docx', 'pdf_text'))
+
+
+def test_streamed_processing_matches_whole_text(processor, corpus):
+    """process_document reads chunk by chunk; the result is the same as from the whole text"""
+    for entry in corpus:
+        stats = {}
+        text, contract_type, data = processor.process_document(entry['path'], entry['file_type'], stats)
+        assert text == processor.extract_text_from_file(entry['path'], entry['file_type'])
+        assert contract_type == processor.classify_contract_type(text) == entry['contract_type']
+        assert data == processor.extract_contract_data(text, contract_type), entry['path']
+        if entry['pages'] > 1 and entry['file_type'] == 'pdf':
+            assert stats['text_chunks'] == entry['pages']
@@ -0,0 +1,76 @@
+import io
+import os
+
+import pytest
+
+PDF = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+
+
+@pytest.fixture
+def upload_folder(app):
+    app.config['UPLOAD_MAX_SIZES'] = {'txt': 100_000}
+    return app.config['UPLOAD_FOLDER']
+
+
+def stored_files(upload_folder):
+    return sorted(os.listdir(upload_folder)) if os.path.isdir(upload_folder) else []
+
+
+def post_upload(client, content, filename):
+    return client.post('/api/contracts/upload', data={'file': (io.BytesIO(content), filename)},
+                       content_type='multipart/form-data')
+
+
+def test_file_over_its_type_limit_is_rejected(client, upload_folder):
+    # Larger than a parser chunk, so part of it is on disk when the limit is hit
+    response = post_upload(client, b'CONTRATO DE LOCACAO ' * 15_000, 'contract.txt')
+    assert response.status_code == 413
+    assert response.json['error'] == 'File exceeds the 100000 bytes limit for txt files'
+    assert stored_files(upload_folder) == []
+
+
+def test_limit_only_applies_to_its_type(client, upload_folder):
+    response = post_upload(client, PDF + b'0' * 200_000, 'contract.pdf')
+    assert response.status_code == 201, response.json
+    assert len(stored_files(upload_folder)) == 1
+
+
+@pytest.mark.parametrize('content, filename', [
+    (b'CONTRATO DE LOCACAO', 'contract.pdf'),
+    (PDF, 'contract.png'),
+    (b'MZ\x90\x00\x03\x00\x00\x00', 'contract.txt'),
+])
+def test_content_not_matching_its_type_is_rejected(client, upload_folder, content, filename):
+    response = post_upload(client, content, filename)
+    assert response.status_code == 415
+    assert response.json['error'] == 'File content does not match its type'
+    assert stored_files(upload_folder) == []
+
+
+def test_batch_keeps_the_valid_files(client, upload_folder):
+    files = [
+        (io.BytesIO(b'CONTRATO DE LOCACAO, aluguel mensal'), 'rental.txt'),
+        (io.BytesIO(b'CONTRATO ' * 20_000), 'large.txt'),
+        (io.BytesIO(b'CONTRATO DE SEGURO'), 'insurance.pdf'),
+        (io.BytesIO(b'MZ\x90\x00'), 'tool.exe'),
+    ]
+    response = client.post('/api/contracts/batch', data={'files': files}, content_type='multipart/form-data')
+    assert response.status_code == 201
+    assert (response.json['accepted'], response.json['rejected']) == (1, 3)
+    assert [file.get('error') for file in response.json['files']] == [
+        None,
+        'File exceeds the 100000 bytes limit for txt files',
+        'File content does not match its type',
+        'File type not allowed',
+    ]
+    # Only the accepted file stays in the upload folder
+    assert len(stored_files(upload_folder)) == 1
+    assert stored_files(upload_folder)[0].endswith('_rental.txt')
+
+
+def test_batch_of_rejected_files_stores_nothing(client, upload_folder):
+    files = [(io.BytesIO(b'CONTRATO ' * 20_000), 'large.txt'), (io.BytesIO(b'texto'), 'scan.png')]
+    response = client.post('/api/contracts/batch', data={'files': files}, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.json['accepted'] == 0
+    assert stored_files(upload_folder) == []
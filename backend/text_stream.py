@@ -0,0 +1,94 @@
+import codecs
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Pieces (paragraphs, lines) are joined into chunks of about this many characters
+CHUNK_CHARS = 64 * 1024
+
+
+def batched_text(pieces: Iterable[str], min_chars: int = CHUNK_CHARS) -> Iterator[str]:
+    """Join small pieces of text into chunks of at least min_chars (the last may be shorter)"""
+    batch, size = [], 0
+    for piece in pieces:
+        batch.append(piece)
+        size += len(piece)
+        if size >= min_chars:
+            yield ''.join(batch)
+            batch, size = [], 0
+    if batch:
+        yield ''.join(batch)
+
+
+def is_utf8(file_path: str, block_size: int = 64 * 1024) -> bool:
+    """Whether a file decodes as UTF-8, checked a block at a time"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(block_size), b''):
+                decoder.decode(block)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def iter_txt_chunks(processor, file_path: str, stats: Optional[Dict] = None) -> Iterator[str]:
+    """Extractor backend: the lines of a TXT file, batched; read as Latin-1 if it is not valid UTF-8"""
+    encoding = 'utf-8' if is_utf8(file_path) else 'latin-1'
+    with open(file_path, 'r', encoding=encoding) as file:
+        yield from batched_text(file)
+
+
+def _line_start_before(text: str, end: int) -> int:
+    """Start of the last line holding non-whitespace text before `end`, 0 if there is none"""
+    while end and text[end - 1].isspace():
+        end -= 1
+    return text.rfind('\n', 0, end) + 1
+
+
+class StreamMatcher:
+    """finditer over text that arrives in chunks.
+
+    The last non-blank line fed so far may be incomplete, and the next chunk
+    may continue a match that starts on the line before it (a keyword split
+    by a line break). Matches are only reported up to the start of those two
+    lines; they are kept and scanned again with the next chunk, so a token
+    split across two chunks is still found whole. Patterns may span
+    whitespace, but a match must not reach past the line after its own.
+    """
+
+    def __init__(self, pattern: re.Pattern):
+        self.pattern = pattern
+        self._buffer = ''
+        # Offset of _buffer[0] in the whole text
+        self._offset = 0
+        # Where the next scan starts in _buffer; the character before stays for \b
+        self._position = 0
+
+    def feed(self, chunk: str) -> List[Tuple[re.Match, int]]:
+        """Add a chunk, returning the newly settled (match, offset of the match's string) pairs"""
+        self._buffer += chunk
+        last_line = _line_start_before(self._buffer, len(self._buffer))
+        return self._scan(_line_start_before(self._buffer, last_line))
+
+    def finish(self) -> List[Tuple[re.Match, int]]:
+        """Return the matches left in the kept text"""
+        return self._scan(len(self._buffer))
+
+    def _scan(self, limit: int) -> List[Tuple[re.Match, int]]:
+        settled = []
+        keep_from = limit
+        for match in self.pattern.finditer(self._buffer, self._position):
+            if match.end() > limit:
+                # May still grow with the next chunk; scan it again then
+                keep_from = min(match.start(), limit)
+                break
+            settled.append((match, self._offset))
+        keep_from = max(keep_from, self._position)
+
+        # Keep one character of context before the next scan position
+        context = min(keep_from, 1)
+        self._offset += keep_from - context
+        self._buffer = self._buffer[keep_from - context:]
+        self._position = context
+        return settled
@@ -0,0 +1,207 @@
+import io
+import os
+import uuid
+import hashlib
+from typing import Dict, Iterable, Optional, Set
+
+from werkzeug.formparser import parse_form_data
+from werkzeug.utils import secure_filename
+
+MB = 1024 * 1024
+
+# Leading bytes expected for each file type; None means plain text
+MAGIC_BYTES = {
+    'pdf': (b'%PDF-',),
+    'docx': (b'PK\x03\x04',),
+    'doc': (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'tiff': (b'II*\x00', b'MM\x00*'),
+    'bmp': (b'BM',),
+    'txt': None,
+}
+
+# Default per-type size limits, overridable with the UPLOAD_MAX_SIZES setting
+DEFAULT_MAX_SIZES = {
+    'pdf': 100 * MB,
+    'docx': 25 * MB,
+    'doc': 25 * MB,
+    'jpg': 25 * MB,
+    'jpeg': 25 * MB,
+    'png': 25 * MB,
+    'tiff': 100 * MB,
+    'bmp': 50 * MB,
+    'txt': 10 * MB,
+}
+
+# Bytes inspected to check the content matches the file type
+SNIFF_SIZE = 8192
+
+
+def format_size(size: int) -> str:
+    """Human readable size used in error messages"""
+    return f'{size / MB:g} MB' if size >= MB else f'{size} bytes'
+
+
+def size_limit_error(max_size: int, file_type: str) -> 'UploadRejected':
+    """Error raised when a file goes over the limit for its type"""
+    return UploadRejected(f'File exceeds the {format_size(max_size)} limit for {file_type} files', 413)
+
+
+class UploadRejected(Exception):
+    """Raised while streaming an upload that must not be stored"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class IngestedFile:
+    """Writable stream that stores an upload at its final path, hashing and measuring it.
+    
+    In strict mode a rejected file raises UploadRejected, aborting the whole
+    request; otherwise the error is kept in `error`, the partial file is
+    deleted and the rest of the part is ignored.
+    """
+
+    def __init__(self, path: Optional[str], filename: str, file_type: str, max_size: int, strict: bool = True):
+        self.path = path
+        self.filename = filename
+        self.file_type = file_type
+        self.max_size = max_size
+        self.strict = strict
+        self.size = 0
+        self.error = None
+        self._digest = hashlib.sha256()
+        self._head = b''
+        self._checked = False
+        self._file = open(path, 'w+b') if path else None
+
+    @property
+    def content_hash(self) -> str:
+        return self._digest.hexdigest()
+
+    def reject(self, error: UploadRejected):
+        """Raise in strict mode, otherwise record the error and drop the file"""
+        if self.strict:
+            raise error
+        self.error = error
+        self.discard()
+
+    def _check_content(self):
+        """Compare the first bytes with the signature of the declared file type"""
+        self._checked = True
+        signatures = MAGIC_BYTES.get(self.file_type)
+        if signatures is None:
+            matches = b'\x00' not in self._head
+        else:
+            matches = self._head.startswith(signatures)
+        if not matches:
+            self.reject(UploadRejected('File content does not match its type', 415))
+
+    def write(self, data: bytes) -> int:
+        if self.error:
+            return len(data)
+
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.reject(size_limit_error(self.max_size, self.file_type))
+            return len(data)
+
+        if not self._checked:
+            self._head += data[:SNIFF_SIZE - len(self._head)]
+            if len(self._head) >= SNIFF_SIZE:
+                self._check_content()
+                if self.error:
+                    return len(data)
+
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence) if self._file else 0
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size) if self._file else b''
+
+    def finish(self):
+        """Validate short files and close the stored file"""
+        if self.error:
+            return
+        if not self._checked:
+            self._check_content()
+        if self._file:
+            self._file.close()
+
+    def discard(self):
+        """Close and delete the stored file"""
+        if self._file:
+            self._file.close()
+            # The form parser still seeks the part once it ends; a closed file would
+            # raise ValueError there, which it swallows along with the remaining parts
+            self._file = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class UploadIngestor:
+    """Parses a multipart request, streaming each file part straight to the upload folder"""
+
+    def __init__(self, upload_folder: str, allowed_extensions: Set[str],
+                 max_sizes: Optional[Dict[str, int]] = None, strict: bool = True):
+        self.upload_folder = upload_folder
+        self.allowed_extensions = allowed_extensions
+        self.max_sizes = dict(DEFAULT_MAX_SIZES, **(max_sizes or {}))
+        # strict: one bad file rejects the request; otherwise errors are kept per file
+        self.strict = strict
+        self.files = []
+
+    def stream_factory(self, total_content_length, content_type, filename, content_length=None):
+        """Called by the form parser for each file part, before its data arrives"""
+        if not filename:
+            # Empty file input; reported as 'No file selected' by the caller
+            return io.BytesIO()
+
+        file_type = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        stored_name = secure_filename(filename) or f'upload.{file_type}'
+        max_size = self.max_sizes.get(file_type, max(self.max_sizes.values()))
+
+        error = None
+        if file_type not in self.allowed_extensions:
+            error = UploadRejected('File type not allowed')
+        elif content_length is not None and content_length > max_size:
+            error = size_limit_error(max_size, file_type)
+
+        if error:
+            # Nothing is written to disk for this part
+            ingested = IngestedFile(None, stored_name, file_type, max_size, self.strict)
+            ingested.reject(error)
+        else:
+            path = os.path.join(self.upload_folder, f"{uuid.uuid4()}_{stored_name}")
+            ingested = IngestedFile(path, stored_name, file_type, max_size, self.strict)
+        self.files.append(ingested)
+        return ingested
+
+    def parse(self, environ, max_content_length: Optional[int] = None):
+        """Parse the request body, returning (form, files) with every file already stored"""
+        try:
+            _, form, files = parse_form_data(
+                environ,
+                stream_factory=self.stream_factory,
+                max_content_length=max_content_length
+            )
+            for ingested in self.files:
+                ingested.finish()
+        except BaseException:
+            self.discard_all()
+            raise
+        return form, files
+
+    def discard_all(self, keep: Iterable[IngestedFile] = ()):
+        """Delete stored files, except those in `keep`"""
+        keep = list(keep)
+        for ingested in self.files:
+            if not any(ingested is kept for kept in keep):
+                ingested.discard()
@@ -0,0 +1,86 @@
+"""Standalone processing worker.
+
+Claims jobs from the processing_jobs table and processes their contracts,
+so processing can run on other machines than the API (PROCESSING_MODE=external).
+Any number of workers can share the same database.
+
+Processing metrics (stage timings, throughput, errors) are recorded in the
+process that runs the job, so each worker serves its own GET /metrics when
+given --metrics-port; the API's /api/metrics only covers in-process jobs.
+
+Usage: DATABASE_URL=... python worker.py [--threads 2] [--poll-interval 2] [--lanes fast=1,heavy=1]
+                                         [--metrics-port 9101]
+"""
+import os
+import argparse
+import signal
+import threading
+from flask import Flask
+from src.services.database import init_database
+from src.services.contract_processing import configure_processor
+from src.services.job_cost import default_lane_limits, parse_lane_limits
+from src.services.job_queue import JobWorker, job_queue
+from src.services.metrics import serve_metrics
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
+    app.config.update({key: value for key, value in os.environ.items() if key.startswith('OCR_')})
+    app.config.setdefault('OCR_CACHE_DIR', os.path.join(app.instance_path, 'ocr_cache'))
+    init_database(app)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process queued contracts')
+    parser.add_argument('--threads', type=int, default=2, help='jobs processed in parallel')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='seconds to wait when no job is due')
+    parser.add_argument('--lanes', help="jobs of each lane run at once, e.g. 'fast=3,heavy=1' "
+                                        "(default: neither lane takes every thread)")
+    parser.add_argument('--metrics-port', type=int,
+                        default=int(os.environ['WORKER_METRICS_PORT']) if os.environ.get('WORKER_METRICS_PORT') else None,
+                        help='serve Prometheus metrics on this port at /metrics (default: off)')
+    args = parser.parse_args()
+
+    app = create_app()
+    configure_processor(app.config)
+    job_queue.configure(
+        max_attempts=int(os.environ.get('JOB_MAX_ATTEMPTS', 0)),
+        lease_seconds=int(os.environ.get('JOB_LEASE_SECONDS', 0)),
+        backoff_seconds=int(os.environ.get('JOB_BACKOFF_SECONDS', 0)),
+        aging_factor=float(os.environ['JOB_AGING_FACTOR']) if os.environ.get('JOB_AGING_FACTOR') else None,
+        lane_limits=parse_lane_limits(args.lanes or os.environ.get('JOB_LANE_LIMITS'))
+                    or default_lane_limits(args.threads)
+    )
+    with app.app_context():
+        requeued, failed = job_queue.reclaim_expired()
+        if requeued or failed:
+            print(f"Reclaimed expired jobs: {requeued} requeued, {failed} failed")
+
+    if args.metrics_port is not None:
+        serve_metrics(args.metrics_port)
+        print(f"Serving metrics on port {args.metrics_port}")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    worker = JobWorker(app, job_queue, poll_interval=args.poll_interval)
+    threads = [
+        threading.Thread(target=worker.run_forever, args=(stop,), name=f'worker-{number}')
+        for number in range(args.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    print(f"Worker {worker.name} started with {args.threads} threads")
+
+    # Wait with a timeout so signals are handled; running jobs finish before exit
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+    print(f"Worker {worker.name} stopped")
+
+
+if __name__ == '__main__':
+    main()